@@ -6,7 +6,8 @@
 # 
 # 调度策略:
 #   - 热数据（最近7天发布的作品）: 每小时爬取一次（通常0-2个作品，开销极小）
-#   - 冷数据（7天前发布的作品）: 每天只在 00:00, 08:00, 16:00 爬取（历史积累作品）
+#   - 冷数据（7天前发布的作品）: 滚动模式（--rolling），按 work_id 分成 8 个桶，每小时爬取一个桶，
+#     每个作品每 8 小时爬取一次，负载均匀分布到全天
 #
 # 安装方法:
 #   1. 使用 systemd timer (推荐):
@@ -16,8 +17,9 @@
 #      0 * * * * /home/yifeianyi/Desktop/xxm_fans_home/scripts/bilibili_tiered_cron.sh
 #
 # 日志:
-#   - JSON日志: logs/bilibili_tiered_crawler.json
+#   - 运行台账: logs/crawl_runs.sqlite3（python spider/run_ledger.py recent --job tiered_views）
 #   - 详细日志: logs/spider/run_tiered_crawler_*.log
+#   - 运行指标: logs/metrics/tiered_crawler.json
 #
 # ============================================================================
 
@@ -27,14 +29,13 @@ PROJECT_ROOT="/home/yifeianyi/Desktop/xxm_fans_home"
 # 主控脚本路径
 CRAWLER_SCRIPT="${PROJECT_ROOT}/spider/run_tiered_crawler.py"
 
-# JSON日志文件路径
-JSON_LOG_FILE="${PROJECT_ROOT}/logs/bilibili_tiered_crawler.json"
+# 运行指标文件路径（阶段耗时、请求统计，由 run_tiered_crawler.py 写出）
+METRICS_FILE="${PROJECT_ROOT}/logs/metrics/tiered_crawler.json"
 
 # 虚拟环境路径（根据实际环境修改）
 VENV_PATH="${PROJECT_ROOT}/../myenv"
 
 # 创建日志目录
-mkdir -p "$(dirname "$JSON_LOG_FILE")"
 mkdir -p "${PROJECT_ROOT}/logs/spider"
 
 # 激活虚拟环境（如果存在）
@@ -52,15 +53,9 @@ CURRENT_HOUR=$(date +%H)
 CURRENT_TIME=$(date '+%Y-%m-%d %H:%M:%S')
 START_TIME=$CURRENT_TIME
 
-# 判断当前时段
-COLD_CRAWL_HOURS=("00" "08" "16")
-IS_COLD_HOUR=false
-for hour in "${COLD_CRAWL_HOURS[@]}"; do
-    if [ "$CURRENT_HOUR" == "$hour" ]; then
-        IS_COLD_HOUR=true
-        break
-    fi
-done
+# 冷数据滚动分桶数（传给 --rolling）；本小时的桶与 views_tiering.current_bucket 一致，按自纪元起的小时数取模
+COLD_BUCKETS=8
+COLD_BUCKET=$(( $(date +%s) / 3600 % COLD_BUCKETS + 1 ))
 
 # 输出开始信息
 echo "========================================"
@@ -73,11 +68,7 @@ echo "========================================"
 echo ""
 echo "调度策略:"
 echo "  🔥 热数据（7天内）: 每小时爬取"
-if [ "$IS_COLD_HOUR" = true ]; then
-    echo "  ❄️ 冷数据（7天前）: ✅ 本时段执行爬取"
-else
-    echo "  ❄️ 冷数据（7天前）: ⏸️ 跳过（只在 00:00, 08:00, 16:00 爬取）"
-fi
+echo "  ❄️ 冷数据（7天前）: 滚动爬取第 ${COLD_BUCKET}/${COLD_BUCKETS} 桶（每个作品每 ${COLD_BUCKETS} 小时一次）"
 echo ""
 
 # 检查主控脚本是否存在
@@ -89,93 +80,13 @@ fi
 # 执行爬虫脚本（使用调度模式）
 cd "$PROJECT_ROOT"
 
-OUTPUT=$($PYTHON_CMD "$CRAWLER_SCRIPT" --scheduled 2>&1)
+OUTPUT=$($PYTHON_CMD "$CRAWLER_SCRIPT" --scheduled --async --pipeline --rolling "$COLD_BUCKETS" --metrics-file "$METRICS_FILE" 2>&1)
 EXIT_CODE=$?
 
 END_TIME=$(date '+%Y-%m-%d %H:%M:%S')
 
-# 解析执行结果
-if [ $EXIT_CODE -eq 0 ]; then
-    STATUS="success"
-    ERROR_MESSAGE=""
-    
-    # 提取关键信息
-    SUMMARY=$(echo "$OUTPUT" | grep -E "✓|成功|导入完成|爬取完成|执行完成" | tail -10)
-    
-    # 提取统计信息
-    HOT_COUNT=$(echo "$OUTPUT" | grep -oE "热数据.*[0-9]+ 条" | grep -oE "[0-9]+" | tail -1)
-    COLD_STATUS=$(echo "$OUTPUT" | grep -E "冷数据.*执行|冷数据.*跳过" | tail -1)
-    
-    # 构建摘要
-    SUMMARY="${SUMMARY}
-执行时段: ${CURRENT_HOUR}:00"
-    
-    if [ -n "$HOT_COUNT" ]; then
-        SUMMARY="${SUMMARY}
-热数据: ${HOT_COUNT} 条"
-    fi
-    
-    if [ -n "$COLD_STATUS" ]; then
-        SUMMARY="${SUMMARY}
-${COLD_STATUS}"
-    fi
-    
-else
-    STATUS="failed"
-    ERROR_MESSAGE="Script execution failed with exit code $EXIT_CODE"
-    SUMMARY=$(echo "$OUTPUT" | grep -E "Error|错误|失败|✗" | tail -10)
-fi
-
-# 构建JSON日志条目
-LOG_ENTRY=$(cat <<EOF
-{
-  "start_time": "$START_TIME",
-  "end_time": "$END_TIME",
-  "exit_code": $EXIT_CODE,
-  "status": "$STATUS",
-  "current_hour": "$CURRENT_HOUR",
-  "is_cold_hour": $IS_COLD_HOUR,
-  "error_message": $(echo "$ERROR_MESSAGE" | jq -Rs .),
-  "summary": $(echo "$SUMMARY" | jq -Rs .)
-}
-EOF
-)
-
-# 如果日志文件不存在，创建一个空数组
-if [ ! -f "$JSON_LOG_FILE" ]; then
-    echo "[]" > "$JSON_LOG_FILE"
-fi
-
-# 追加新的日志条目到JSON数组
-if command -v jq &> /dev/null; then
-    jq ". += [$LOG_ENTRY]" "$JSON_LOG_FILE" > "${JSON_LOG_FILE}.tmp" && mv "${JSON_LOG_FILE}.tmp" "$JSON_FILE"
-else
-    # 如果没有jq，使用Python处理JSON
-    $PYTHON_CMD << PYEOF
-import json
-import sys
-
-try:
-    with open("$JSON_LOG_FILE", 'r', encoding='utf-8') as f:
-        logs = json.load(f)
-except:
-    logs = []
-
-logs.append({
-    "start_time": "$START_TIME",
-    "end_time": "$END_TIME",
-    "exit_code": $EXIT_CODE,
-    "status": "$STATUS",
-    "current_hour": "$CURRENT_HOUR",
-    "is_cold_hour": $IS_COLD_HOUR,
-    "error_message": "$ERROR_MESSAGE",
-    "summary": "$SUMMARY"
-})
-
-with open("$JSON_LOG_FILE", 'w', encoding='utf-8') as f:
-    json.dump(logs, f, ensure_ascii=False, indent=2)
-PYEOF
-fi
+# 运行结果（开始/结束时间、各分层计数、失败原因）由 run_tiered_crawler.py 写入运行台账
+HOT_COUNT=$($PYTHON_CMD -c "import json, sys; print(json.load(open(sys.argv[1]))['tiers'].get('hot', {}).get('success_count', ''))" "$METRICS_FILE" 2>/dev/null)
 
 # 输出结果
 echo ""
@@ -183,13 +94,16 @@ echo "========================================"
 if [ $EXIT_CODE -eq 0 ]; then
     echo "✓ 执行成功"
     echo "$OUTPUT" | grep -E "✓|成功|导入完成|爬取完成|执行完成" | tail -5
+    if [ -n "$HOT_COUNT" ]; then
+        echo "热数据: ${HOT_COUNT} 条"
+    fi
 else
     echo "✗ 执行失败"
     echo "错误信息:"
     echo "$OUTPUT" | tail -20
 fi
 echo "结束时间: $END_TIME"
-echo "日志文件: $JSON_LOG_FILE"
+echo "运行台账: python spider/run_ledger.py recent --job tiered_views"
 echo "========================================"
 
 exit $EXIT_CODE
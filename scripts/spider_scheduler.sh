@@ -0,0 +1,27 @@
+#!/bin/bash
+# ============================================================================
+# 爬虫常驻调度进程启动脚本
+# 由 spider-scheduler.service 调用，在一个进程中运行分层投稿、粉丝数、动态、大航海爬虫
+# 任务节奏见 spider/scheduler_daemon.py
+# ============================================================================
+
+# 项目根目录
+PROJECT_ROOT="/home/yifeianyi/Desktop/xxm_fans_home"
+
+# 虚拟环境路径（根据实际环境修改）
+VENV_PATH="${PROJECT_ROOT}/../myenv"
+
+mkdir -p "${PROJECT_ROOT}/logs/spider"
+
+# 激活虚拟环境（如果存在）
+if [ -d "$VENV_PATH" ]; then
+    source "$VENV_PATH/bin/activate"
+    PYTHON_CMD="python"
+else
+    echo "未找到虚拟环境，使用系统 python3"
+    PYTHON_CMD="python3"
+fi
+
+cd "$PROJECT_ROOT"
+# exec 让 systemd 直接管理 Python 进程（SIGTERM 直接送达，优雅退出）
+exec $PYTHON_CMD "${PROJECT_ROOT}/spider/scheduler_daemon.py" "$@"
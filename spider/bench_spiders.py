@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫流水线基准测试
+在本地模拟上游（spider/mock_upstream.py）上运行各爬虫入口，输出吞吐（记录/秒）、请求延迟 p50/p99 和峰值内存。
+每个基准在独立子进程中运行，峰值 RSS 互不影响；数据写入临时目录，不触碰生产数据与接口。
+
+路径: spider/bench_spiders.py
+
+基准:
+    fetcher         AsyncViewsFetcher 抓取（不依赖 Django）
+    parallel_crawl  run_tiered_crawler.run_parallel_crawl（热+冷，含合并与导入，作品来源替换为模拟数据）
+    moments         crawl_moments.main（Cookie 池与入库替换为模拟，只测抓取与解析）
+    guards          scrape_laplace_guards.scrape_all_guards
+    followers       FollowerSampler 粉丝数并发采样（账号数取 --works）
+
+用法:
+    python spider/bench_spiders.py                                  # 默认只运行 fetcher
+    python spider/bench_spiders.py --bench all --works 2000 --latency-ms 80
+    python spider/bench_spiders.py --bench fetcher --throttle-rps 20 --concurrency 8 --rps 30
+    python spider/bench_spiders.py --bench moments,guards --json logs/bench.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+from unittest.mock import patch
+
+SPIDER_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SPIDER_DIR)
+
+from mock_upstream import MockUpstreamServer
+
+BENCHMARKS = ('fetcher', 'parallel_crawl', 'moments', 'guards', 'followers')
+
+
+def make_works(count: int) -> List[Dict[str, Any]]:
+    return [
+        {'platform': 'bilibili', 'work_id': f'BV1mock{i:06d}', 'title': f'作品{i}', 'is_valid': True}
+        for i in range(count)
+    ]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _record_latencies(latencies: List[float]):
+    """包装 requests.Session.send，记录每个请求的往返耗时（包括读取响应体）"""
+    import requests
+
+    original_send = requests.Session.send
+
+    def timed_send(session, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original_send(session, request, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    return patch.object(requests.Session, 'send', timed_send)
+
+
+def bench_fetcher(base_url: str, options: Dict[str, Any], temp_dir: str) -> int:
+    import views_fetcher
+
+    fetcher = views_fetcher.AsyncViewsFetcher(
+        concurrency=options['concurrency'], rps=options['rps'], max_retries=options['retries']
+    )
+    fetcher.RATE_LIMIT_BACKOFF = options['backoff']
+    with patch.object(views_fetcher, 'STAT_API_URL', base_url + '/x/web-interface/archive/stat'):
+        result = fetcher.crawl(make_works(options['works']))
+    return result['success_count']
+
+
+def bench_parallel_crawl(base_url: str, options: Dict[str, Any], temp_dir: str) -> int:
+    from functools import partial
+    import run_tiered_crawler
+    import views_fetcher
+    import views_records
+    from views_store import MetricsStore
+
+    works = make_works(options['works'])
+    split = len(works) // 10
+    tier_works = {run_tiered_crawler.WorkTier.HOT: works[:split], run_tiered_crawler.WorkTier.COLD: works[split:]}
+
+    def fake_tier_works(tier, adaptive=False, rolling_buckets=0):
+        return len(tier_works[tier]), tier_works[tier]
+
+    with patch.object(views_fetcher, 'STAT_API_URL', base_url + '/x/web-interface/archive/stat'), \
+            patch.object(views_fetcher.AsyncViewsFetcher, 'RATE_LIMIT_BACKOFF', options['backoff']), \
+            patch.object(views_records, 'VIEWS_DATA_DIR', os.path.join(temp_dir, 'views')), \
+            patch.object(run_tiered_crawler, '_tier_works', fake_tier_works), \
+            patch.object(run_tiered_crawler, 'MetricsStore',
+                         partial(MetricsStore, db_path=os.path.join(temp_dir, 'view_data.sqlite3'))):
+        success, results, _ = run_tiered_crawler.run_parallel_crawl(
+            tiers=list(tier_works),
+            force=True,
+            max_retries=options['retries'],
+            async_mode=True,
+            concurrency=options['concurrency'],
+            rps=options['rps'],
+        )
+    return len(works) if success else 0
+
+
+def bench_moments(base_url: str, options: Dict[str, Any], temp_dir: str) -> int:
+    import crawl_moments
+    from cookie_pool import CookiePool
+
+    saved = []
+
+    def count_saved(source, dynamics):
+        saved.append(len(dynamics))
+        return len(dynamics), 0
+
+    patches = [
+        patch.object(crawl_moments.BilibiliDynamicCrawler, 'API_URL',
+                     base_url + '/x/polymer/web-dynamic/v1/feed/space'),
+        patch.object(crawl_moments.WeiboDynamicCrawler, 'API_URL', base_url + '/api/container/getIndex'),
+        patch.object(crawl_moments, 'load_pool', lambda platform: CookiePool(platform, [(None, 'SESSDATA=mock')])),
+        patch.object(crawl_moments.CookieService, 'mark_valid'),
+        patch.object(crawl_moments.CookieService, 'mark_expired'),
+        patch.object(crawl_moments.MomentSaver, 'save_dynamics', side_effect=count_saved),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        crawl_moments.main(['--full'])
+    finally:
+        for p in reversed(patches):
+            p.stop()
+    return sum(saved)
+
+
+def bench_guards(base_url: str, options: Dict[str, Any], temp_dir: str) -> int:
+    import scrape_laplace_guards as guards
+
+    with patch.object(guards, 'API_V1', base_url + '/xlive/app-room/v1/guardTab/topList'), \
+            patch.object(guards, 'API_V2', base_url + '/xlive/app-room/v2/guardTab/topList'), \
+            patch.object(guards, '_load_cookie_pool', return_value=None):
+        return len(guards.scrape_all_guards(8777, 37754047, temp_dir))
+
+
+def bench_followers(base_url: str, options: Dict[str, Any], temp_dir: str) -> int:
+    import follower_sampler
+
+    accounts = [{'uid': uid, 'name': str(uid)} for uid in range(1, options['works'] + 1)]
+    with patch.object(follower_sampler, 'RELATION_API_URL', base_url + '/x/relation/stat'):
+        sampler = follower_sampler.FollowerSampler(
+            concurrency=options['concurrency'], rps=options['rps'], max_retries=options['retries']
+        )
+        sampler.RATE_LIMIT_BACKOFF = options['backoff']
+        results = sampler.sample(accounts)
+    return sum(1 for result in results if result['status'] == 'success')
+
+
+BENCH_FUNCS: Dict[str, Callable[[str, Dict[str, Any], str], int]] = {
+    'fetcher': bench_fetcher,
+    'parallel_crawl': bench_parallel_crawl,
+    'moments': bench_moments,
+    'guards': bench_guards,
+    'followers': bench_followers,
+}
+
+
+def _child(name: str, base_url: str, options: Dict[str, Any], queue):
+    """子进程：运行一个基准并回传结果"""
+    sys.path.insert(0, SPIDER_DIR)
+    temp_dir = tempfile.mkdtemp()
+    latencies: List[float] = []
+    result = {'name': name}
+    try:
+        with _record_latencies(latencies):
+            started = time.perf_counter()
+            records = BENCH_FUNCS[name](base_url, options, temp_dir)
+            elapsed = time.perf_counter() - started
+        result.update({
+            'records': records,
+            'seconds': round(elapsed, 3),
+            'records_per_second': round(records / elapsed, 1) if elapsed > 0 else 0,
+            'requests': len(latencies),
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+        })
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    # Linux 下 ru_maxrss 单位为 KB
+    result['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    queue.put(result)
+
+
+def run_benchmark(name: str, server: MockUpstreamServer, options: Dict[str, Any]) -> Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    requests_before, throttled_before = server.request_count, server.throttled_count
+    process = context.Process(target=_child, args=(name, server.base_url, options, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    result['throttled'] = server.throttled_count - throttled_before
+    result['server_requests'] = server.request_count - requests_before
+    return result
+
+
+def print_result(result: Dict[str, Any]):
+    if 'error' in result:
+        print(f"{result['name']:<16} 失败: {result['error']}")
+        return
+    print(
+        f"{result['name']:<16} {result['records']:>8} 条 {result['seconds']:>8.2f}s "
+        f"{result['records_per_second']:>9.1f} 条/秒  p50 {result['p50_ms']:>7.1f}ms  "
+        f"p99 {result['p99_ms']:>7.1f}ms  限流 {result['throttled']:>4}  RSS {result['peak_rss_mb']:>6.1f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫流水线基准测试（本地模拟上游）')
+    parser.add_argument('--bench', default='fetcher', help=f"逗号分隔的基准名或 all（可选: {', '.join(BENCHMARKS)}）")
+    parser.add_argument('--works', type=int, default=500, help='模拟作品数（fetcher / parallel_crawl）或账号数（followers）')
+    parser.add_argument('--concurrency', type=int, default=4, help='抓取并发数')
+    parser.add_argument('--rps', type=float, default=50.0, help='抓取每秒请求预算')
+    parser.add_argument('--retries', type=int, default=2, help='最大重试次数')
+    parser.add_argument('--backoff', type=float, default=1.0, help='限流退避基数（秒，线上为 30）')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='模拟上游固定延迟')
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help='模拟上游随机延迟上限')
+    parser.add_argument('--throttle-rps', type=float, default=0.0, help='模拟上游限流阈值（每秒请求数，0 为不限）')
+    parser.add_argument('--throttle-mode', choices=['http412', 'code352'], default='http412')
+    parser.add_argument('--fixtures', help='录制响应目录')
+    parser.add_argument('--json', help='结果另存为 JSON 文件')
+    args = parser.parse_args()
+
+    names = list(BENCHMARKS) if args.bench == 'all' else args.bench.split(',')
+    unknown = [name for name in names if name not in BENCH_FUNCS]
+    if unknown:
+        parser.error(f"未知基准: {unknown}")
+
+    options = {
+        'works': args.works, 'concurrency': args.concurrency, 'rps': args.rps,
+        'retries': args.retries, 'backoff': args.backoff,
+    }
+    results = []
+    with MockUpstreamServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, throttle_rps=args.throttle_rps,
+        throttle_mode=args.throttle_mode, fixtures_dir=args.fixtures
+    ) as server:
+        print(f"模拟上游: {server.base_url}  延迟 {args.latency_ms}±{args.jitter_ms}ms  "
+              f"限流阈值 {args.throttle_rps or '无'}")
+        for name in names:
+            result = run_benchmark(name, server, options)
+            print_result(result)
+            results.append(result)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'options': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
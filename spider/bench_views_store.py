@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+work_metrics 写入性能基准
+对比 MetricsStore 的批量 upsert 与旧版 ViewsImporter 的逐条 INSERT OR REPLACE，输出每秒写入行数
+（bulk 每小时一个事务，与定时导入一致；replay 多小时合并为一个事务，用于历史回放；
+delta 为变化存储，各小时复用同一份记录即全部未变化，对应冷数据两次采样间计数不变的情况）
+
+路径: spider/bench_views_store.py
+
+场景:
+    cold  冷数据一次导入（500 个作品 × 1 小时）
+    year  一年数据回放（500 个作品 × 24 小时 × 365 天 ≈ 438 万行，分小时导入）
+
+用法:
+    python spider/bench_views_store.py                    # cold 场景
+    python spider/bench_views_store.py --scenario year    # 一年回放（耗时较长）
+    python spider/bench_views_store.py --works 200 --days 30 --baseline
+    python spider/bench_views_store.py --days 7 --hours 3 --delta
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from views_store import DEFAULT_BATCH_SIZE, MetricsStore, SCHEMA
+
+SCENARIOS = {
+    'cold': {'works': 500, 'days': 1, 'hours': 1},
+    'year': {'works': 500, 'days': 365, 'hours': 24},
+}
+
+LEGACY_INSERT_SQL = """
+INSERT OR REPLACE INTO work_metrics
+(platform, work_id, title, crawl_date, crawl_hour, crawl_time,
+ view_count, danmaku_count, comment_count, like_count,
+ coin_count, favorite_count, share_count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def make_records(works: int) -> List[Dict[str, Any]]:
+    """生成一个小时的作品记录"""
+    return [
+        {
+            'platform': 'bilibili',
+            'work_id': f'BV{i:010d}',
+            'title': f'作品{i}',
+            'crawl_time': '2026-01-01T00:00:05',
+            'view_count': 10000 + i,
+            'danmaku_count': i,
+            'comment_count': i,
+            'like_count': i * 2,
+            'coin_count': i,
+            'favorite_count': i,
+            'share_count': i,
+            'status': 'success',
+        }
+        for i in range(works)
+    ]
+
+
+def iter_sessions(works: int, days: int, hours: int) -> Iterator[Tuple[str, str, List[Dict[str, Any]]]]:
+    """
+    按小时产出 (日期, 小时, 记录列表)，模拟每小时一次的导入
+
+    各小时复用同一份记录（唯一键中的日期/小时不同），生成开销可忽略，
+    一年回放也不需要把数百万条记录同时放在内存中。
+    """
+    records = make_records(works)
+    start = date(2026, 1, 1)
+    for day in range(days):
+        date_str = (start + timedelta(days=day)).isoformat()
+        for hour in range(hours):
+            yield date_str, f"{hour:02d}", records
+
+
+def bench_bulk(db_path: str, sessions, batch_size: int, delta: bool = False) -> int:
+    """MetricsStore 批量 upsert"""
+    rows = 0
+    with MetricsStore(db_path, batch_size=batch_size, delta=delta) as store:
+        for date_str, hour_str, records in sessions:
+            rows += store.import_records(
+                records, {'session_id': f'bench_{date_str}_{hour_str}'}, date_str, hour_str
+            )
+        if delta:
+            stored = store.conn.execute('SELECT COUNT(*) FROM work_metrics').fetchone()[0]
+            print(f"{'':<10} 变化存储写入 work_metrics {stored:,} 行，跳过 {store.unchanged_count:,} 条未变化记录")
+    return rows
+
+
+def bench_replay(db_path: str, sessions, batch_size: int) -> int:
+    """MetricsStore 批量 upsert，所有会话在一个事务中提交"""
+    with MetricsStore(db_path, batch_size=batch_size) as store:
+        return store.import_sessions(
+            (records, {'session_id': f'bench_{date_str}_{hour_str}'}, date_str, hour_str)
+            for date_str, hour_str, records in sessions
+        )
+
+
+def bench_legacy(db_path: str, sessions) -> int:
+    """旧版 ViewsImporter.import_data 的写法：每条记录一次 execute"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    cursor = conn.cursor()
+    rows = 0
+    for date_str, hour_str, records in sessions:
+        conn.execute("BEGIN TRANSACTION")
+        for item in records:
+            cursor.execute(LEGACY_INSERT_SQL, (
+                item['platform'], item['work_id'], item['title'], date_str, hour_str,
+                item['crawl_time'][11:19], item['view_count'], item['danmaku_count'],
+                item['comment_count'], item['like_count'], item['coin_count'],
+                item['favorite_count'], item['share_count'],
+            ))
+            rows += 1
+        conn.commit()
+    conn.close()
+    return rows
+
+
+def run(name: str, func, *args) -> Dict[str, Any]:
+    """执行一次基准并打印结果"""
+    temp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(temp_dir, 'view_data.sqlite3')
+    try:
+        start = time.perf_counter()
+        rows = func(db_path, *args)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"{name:<10} {rows:>10,} 行  {elapsed:>8.2f} 秒  {rate:>12,.0f} 行/秒")
+    return {'name': name, 'rows': rows, 'seconds': elapsed, 'rows_per_second': rate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='work_metrics 写入性能基准')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='cold', help='预设场景（默认 cold）')
+    parser.add_argument('--works', type=int, help='覆盖场景的作品数')
+    parser.add_argument('--days', type=int, help='覆盖场景的天数')
+    parser.add_argument('--hours', type=int, help='覆盖场景的每天小时数')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'批量写入的每批行数（默认 {DEFAULT_BATCH_SIZE}）')
+    parser.add_argument('--delta', action='store_true', help='同时运行变化存储（未变化的记录不写入）')
+    parser.add_argument('--baseline', action='store_true', help='同时运行旧版逐条写入作为对照')
+    args = parser.parse_args()
+
+    config = dict(SCENARIOS[args.scenario])
+    for key in ('works', 'days', 'hours'):
+        if getattr(args, key):
+            config[key] = getattr(args, key)
+
+    print(f"场景 {args.scenario}: {config['works']} 作品 × {config['days']} 天 × {config['hours']} 小时, "
+          f"batch_size={args.batch_size}")
+    def sessions():
+        return iter_sessions(config['works'], config['days'], config['hours'])
+
+    run('bulk', bench_bulk, sessions(), args.batch_size)
+    if config['days'] * config['hours'] > 1:
+        run('replay', bench_replay, sessions(), args.batch_size)
+    if args.delta:
+        run('delta', bench_bulk, sessions(), args.batch_size, True)
+    if args.baseline:
+        run('legacy', bench_legacy, sessions())
+
+
+if __name__ == '__main__':
+    main()
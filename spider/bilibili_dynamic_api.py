@@ -14,22 +14,18 @@ import random
 from datetime import datetime
 import requests
 
+from http_client import PooledSession
+
 
 class BilibiliDynamicMonitorAPI:
     """B站动态监控类 - API版本"""
 
     def __init__(self):
         """初始化监控器"""
-        self.session = requests.Session()
-        # 设置完整的请求头模拟真实浏览器
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
+        # 设置完整的请求头模拟真实浏览器（UA、Accept、压缩编码由共享客户端提供）
+        self.session = PooledSession({
             'Referer': 'https://www.bilibili.com',
             'Origin': 'https://www.bilibili.com',
-            'Connection': 'keep-alive',
             'Sec-Fetch-Dest': 'empty',
             'Sec-Fetch-Mode': 'cors',
             'Sec-Fetch-Site': 'same-site',
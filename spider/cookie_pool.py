@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫 Cookie 池
+从 PlatformCookie 中读取同一平台的所有有效 Cookie，按 Cookie 轮换发请求，代替 CookieService.get_cookie 的单一身份：
+每个 Cookie 有自己的 AIMD 自适应令牌桶（身份级的请求预算）与健康状态，请求交给当前最快可用的 Cookie，
+吞吐随 Cookie 数量增加；某个 Cookie 返回 -101 只把这一条标记失效，全部失效时才按平台过期处理（发送通知）。
+
+主机级限速（rate_control 的主机令牌桶）仍然生效，保护同一出口 IP；Cookie 池只分摊身份级的限流。
+与 rate_control 的主机限速器一样，Cookie 池按平台在进程内注册共享：入口（爬虫脚本、常驻调度进程的任务）
+调用 load_pool 从数据库加载（重复加载时保留已有 Cookie 的健康状态），抓取器通过 get_pool 取用。
+
+路径: spider/cookie_pool.py
+
+用法:
+    pool = load_pool('bilibili')                 # 需要已执行 django.setup()
+    cookie = pool.acquire()                      # 阻塞到有 Cookie 可用；全部失效时返回 None
+    response = session.get(url, headers={'Cookie': cookie.cookie_string})
+    pool.report(cookie, rate_limited=is_rate_limited(response.status_code, response.content))
+    pool.report(cookie, expired=True)            # 返回 -101 时
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from rate_control import AdaptiveRateLimiter
+
+# 每个 Cookie 的自适应请求预算：(初始, 下限, 上限) 每秒请求数
+COOKIE_RATES: Dict[str, Tuple[float, float, float]] = {
+    'bilibili': (2.0, 0.2, 4.0),
+    'weibo': (0.5, 0.1, 1.0),
+}
+DEFAULT_COOKIE_RATE = (1.0, 0.1, 2.0)
+
+# B站未登录/登录失效返回码
+COOKIE_EXPIRED_CODE = -101
+
+
+class PooledCookie:
+    """池中的一个 Cookie：身份级令牌桶与健康统计"""
+
+    def __init__(self, cookie_id: Any, cookie_string: str, rates: Tuple[float, float, float]):
+        self.cookie_id = cookie_id
+        self.cookie_string = cookie_string
+        rate, min_rate, max_rate = rates
+        self.limiter = AdaptiveRateLimiter(rate, min_rate, max_rate)
+        self.expired = False
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.last_used = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'cookie_id': self.cookie_id,
+            'expired': self.expired,
+            'rate': round(self.limiter.rate, 3),
+            'request_count': self.request_count,
+            'rate_limited_count': self.rate_limited_count,
+        }
+
+
+class CookiePool:
+    """同一平台的 Cookie 池（线程安全）"""
+
+    def __init__(
+        self,
+        platform: str,
+        cookies: Iterable[Tuple[Any, str]] = (),
+        on_expired: Optional[Callable[[PooledCookie], None]] = None
+    ):
+        """
+        Args:
+            platform: 平台名（bilibili / weibo）
+            cookies: [(Cookie ID, Cookie 字符串)]
+            on_expired: Cookie 被标记失效时的回调（如更新数据库）
+        """
+        self.platform = platform
+        self.on_expired = on_expired
+        self.rates = COOKIE_RATES.get(platform, DEFAULT_COOKIE_RATE)
+        self._cookies: Dict[Any, PooledCookie] = {}
+        self._lock = threading.Lock()
+        self.update(cookies)
+
+    def __len__(self) -> int:
+        return len(self._cookies)
+
+    def update(self, cookies: Iterable[Tuple[Any, str]]):
+        """以数据库中的有效 Cookie 为准更新池：新增的加入，消失的移除，未变化的保留令牌桶与统计"""
+        with self._lock:
+            current = {}
+            for cookie_id, cookie_string in cookies:
+                existing = self._cookies.get(cookie_id)
+                if existing is not None and existing.cookie_string == cookie_string:
+                    current[cookie_id] = existing
+                else:
+                    current[cookie_id] = PooledCookie(cookie_id, cookie_string, self.rates)
+            self._cookies = current
+
+    def alive(self) -> List[PooledCookie]:
+        """未失效的 Cookie"""
+        with self._lock:
+            return [cookie for cookie in self._cookies.values() if not cookie.expired]
+
+    def reserve(self) -> Tuple[Optional[PooledCookie], float]:
+        """
+        选出等待时间最短的 Cookie（相同时取最久未用的）并预占一次请求（不阻塞）
+
+        asyncio 代码使用 `cookie, wait = pool.reserve(); await asyncio.sleep(wait)`。
+
+        Returns:
+            tuple: (Cookie, 需要等待的秒数)；没有可用 Cookie 时为 (None, 0)
+        """
+        with self._lock:
+            candidates = [cookie for cookie in self._cookies.values() if not cookie.expired]
+            if not candidates:
+                return None, 0.0
+            cookie = min(candidates, key=lambda c: (c.limiter.wait_time(), c.last_used))
+            cookie.last_used = time.monotonic()
+            cookie.request_count += 1
+            return cookie, cookie.limiter.reserve()
+
+    def acquire(self) -> Optional[PooledCookie]:
+        """阻塞直到有 Cookie 可用；全部失效时返回 None"""
+        cookie, wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return cookie
+
+    def report(self, cookie: Optional[PooledCookie], rate_limited: bool = False, expired: bool = False):
+        """
+        请求完成后反馈 Cookie 的健康状态
+
+        Args:
+            cookie: acquire/reserve 返回的 Cookie（为 None 时忽略）
+            rate_limited: 该身份触发限流（AIMD 降速）
+            expired: 登录失效（-101），从池中停用并调用 on_expired
+        """
+        if cookie is None:
+            return
+        if expired:
+            with self._lock:
+                if cookie.expired:
+                    return
+                cookie.expired = True
+            if self.on_expired:
+                self.on_expired(cookie)
+        elif rate_limited:
+            cookie.rate_limited_count += 1
+            cookie.limiter.record_throttled()
+        else:
+            cookie.limiter.record_success()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [cookie.as_dict() for cookie in self._cookies.values()]
+
+
+def _mark_cookie_invalid(cookie: PooledCookie):
+    """把单条 PlatformCookie 标记为无效（CookieService 的兜底 Cookie 没有 ID，不处理）"""
+    if cookie.cookie_id is None:
+        return
+    from moments.models import PlatformCookie
+    PlatformCookie.objects.filter(pk=cookie.cookie_id).update(is_valid=False)
+
+
+def _load_cookies(platform: str) -> List[Tuple[Any, str]]:
+    """读取平台的所有有效 PlatformCookie；没有记录时退回 CookieService.get_cookie 的单个 Cookie"""
+    from moments.models import PlatformCookie
+    from moments.services.cookie_service import CookieService
+
+    cookies = [
+        (cookie_id, cookie_string)
+        for cookie_id, cookie_string in PlatformCookie.objects.filter(platform=platform, is_valid=True)
+        .order_by('pk').values_list('pk', 'cookie_string')
+        if cookie_string
+    ]
+    if not cookies:
+        cookie_string = CookieService.get_cookie(platform)
+        if cookie_string:
+            cookies = [(None, cookie_string)]
+    return cookies
+
+
+# 按平台共享的 Cookie 池（由入口调用 load_pool 注册；未注册的平台 get_pool 返回 None，抓取器不带 Cookie）
+_pools: Dict[str, CookiePool] = {}
+_pools_lock = threading.Lock()
+
+
+def load_pool(platform: str) -> CookiePool:
+    """
+    从数据库加载平台的 Cookie 池并注册为进程内共享（已注册时刷新 Cookie 列表，保留健康状态）
+
+    需要已执行 django.setup()。
+    """
+    cookies = _load_cookies(platform)
+    with _pools_lock:
+        pool = _pools.get(platform)
+        if pool is None:
+            pool = _pools[platform] = CookiePool(platform, cookies, on_expired=_mark_cookie_invalid)
+        else:
+            pool.update(cookies)
+    return pool
+
+
+def get_pool(platform: str) -> Optional[CookiePool]:
+    """返回平台已注册的 Cookie 池，未注册时返回 None"""
+    return _pools.get(platform)
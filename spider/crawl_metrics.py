@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取运行指标
+记录一次分层爬取各阶段（查询作品 / 爬取 / 合并 / 导入）的耗时，以及请求数、重试数、限流次数、
+下载字节数（压缩后的传输大小）和每秒记录数，输出为 JSON 文件或 Prometheus textfile（node_exporter textfile collector）。
+
+路径: spider/crawl_metrics.py
+
+用法:
+    metrics = CrawlMetrics(mode='parallel')
+    with metrics.stage('crawl', tier='hot'):
+        summary = fetcher.crawl(works)
+    metrics.record_fetch('hot', summary)
+    metrics.finish(success=True)
+    metrics.write_json(DEFAULT_METRICS_PATH)
+    metrics.write_prometheus('/var/lib/node_exporter/textfile/spider.prom')
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_METRICS_PATH = os.path.join(PROJECT_ROOT, 'logs', 'metrics', 'tiered_crawler.json')
+
+# 从抓取 summary 中采集的计数字段
+FETCH_COUNTERS = (
+    'total_count', 'success_count', 'fail_count', 'skip_count',
+    'request_count', 'retry_count', 'rate_limited_count', 'bytes_downloaded',
+)
+
+PROM_PREFIX = 'spider_crawl'
+
+
+def _atomic_write(path: str, content: str):
+    """先写临时文件再替换，读取方（cron 脚本 / node_exporter）不会读到写了一半的文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+class CrawlMetrics:
+    """
+    单次爬取运行的指标（线程安全，各分层线程可同时记录）
+
+    阶段耗时按 (阶段, 分层) 累加，同一阶段多次计时（如流水线分批入库）会合计到一起
+    """
+
+    def __init__(self, job: str = 'tiered_views', mode: str = 'parallel'):
+        self.job = job
+        self.mode = mode
+        self.start_time = datetime.now()
+        self.end_time: Optional[datetime] = None
+        self.success: Optional[bool] = None
+        self._started_at = time.monotonic()
+        self._duration: Optional[float] = None
+        self._stages: Dict[tuple, float] = {}
+        self._tiers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, tier: Optional[str] = None) -> Iterator[None]:
+        """计时一个阶段（异常时同样记录已用时间）"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.monotonic() - started, tier)
+
+    def add_stage(self, name: str, seconds: float, tier: Optional[str] = None):
+        """累加阶段耗时"""
+        key = (name, tier or '')
+        with self._lock:
+            self._stages[key] = self._stages.get(key, 0.0) + seconds
+
+    def record_fetch(self, tier: str, summary: Dict[str, Any]):
+        """记录分层抓取 summary 中的计数与抓取耗时"""
+        with self._lock:
+            stats = self._tiers.setdefault(tier, {})
+            for key in FETCH_COUNTERS:
+                stats[key] = stats.get(key, 0) + (summary.get(key, 0) or 0)
+            stats['crawl_seconds'] = stats.get('crawl_seconds', 0.0) + (summary.get('duration_seconds', 0) or 0)
+
+    def finish(self, success: bool):
+        """结束计时"""
+        self.success = success
+        self.end_time = datetime.now()
+        self._duration = time.monotonic() - self._started_at
+
+    @staticmethod
+    def _rate(records: int, seconds: float) -> float:
+        return round(records / seconds, 2) if seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """导出为可序列化的字典"""
+        duration = self._duration if self._duration is not None else time.monotonic() - self._started_at
+        with self._lock:
+            stages = [
+                {'stage': name, 'tier': tier or None, 'seconds': round(seconds, 3)}
+                for (name, tier), seconds in sorted(self._stages.items())
+            ]
+            tiers = {}
+            totals = {key: 0 for key in FETCH_COUNTERS}
+            for tier, stats in sorted(self._tiers.items()):
+                tiers[tier] = dict(
+                    stats,
+                    crawl_seconds=round(stats['crawl_seconds'], 3),
+                    records_per_second=self._rate(stats['success_count'], stats['crawl_seconds']),
+                )
+                for key in FETCH_COUNTERS:
+                    totals[key] += stats[key]
+
+        totals['records_per_second'] = self._rate(totals['success_count'], duration)
+        return {
+            'job': self.job,
+            'mode': self.mode,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'success': self.success,
+            'duration_seconds': round(duration, 3),
+            'stages': stages,
+            'tiers': tiers,
+            'totals': totals,
+        }
+
+    def write_json(self, path: str = DEFAULT_METRICS_PATH) -> str:
+        """写出本次运行的指标 JSON（覆盖上一次）"""
+        _atomic_write(path, json.dumps(self.as_dict(), ensure_ascii=False, indent=2))
+        return path
+
+    def prometheus_lines(self) -> List[str]:
+        """Prometheus 文本格式"""
+        data = self.as_dict()
+        job = data['job']
+        lines = [
+            f'# HELP {PROM_PREFIX}_stage_seconds 各阶段耗时（秒）',
+            f'# TYPE {PROM_PREFIX}_stage_seconds gauge',
+        ]
+        for item in data['stages']:
+            tier = item['tier'] or 'all'
+            lines.append(
+                f'{PROM_PREFIX}_stage_seconds{{job="{job}",stage="{item["stage"]}",tier="{tier}"}} {item["seconds"]}'
+            )
+
+        for key in FETCH_COUNTERS + ('records_per_second',):
+            lines.append(f'# TYPE {PROM_PREFIX}_{key} gauge')
+            for tier, stats in data['tiers'].items():
+                lines.append(f'{PROM_PREFIX}_{key}{{job="{job}",tier="{tier}"}} {stats[key]}')
+
+        lines += [
+            f'# TYPE {PROM_PREFIX}_duration_seconds gauge',
+            f'{PROM_PREFIX}_duration_seconds{{job="{job}"}} {data["duration_seconds"]}',
+            f'# TYPE {PROM_PREFIX}_success gauge',
+            f'{PROM_PREFIX}_success{{job="{job}"}} {1 if data["success"] else 0}',
+            f'# TYPE {PROM_PREFIX}_last_run_timestamp_seconds gauge',
+            f'{PROM_PREFIX}_last_run_timestamp_seconds{{job="{job}"}} {int(self.start_time.timestamp())}',
+        ]
+        return lines
+
+    def write_prometheus(self, path: str) -> str:
+        """写出 Prometheus textfile（文件名需以 .prom 结尾才会被 node_exporter 采集）"""
+        _atomic_write(path, '\n'.join(self.prometheus_lines()) + '\n')
+        return path
@@ -2,12 +2,12 @@
 """
 满の动态爬虫脚本
 每5分钟爬取咻咻满的微博和B站动态增量内容，写入数据库
+Cookie 取自 Cookie 池（cookie_pool）：某个 Cookie 过期只停用这一条并换下一个，全部过期时才发送过期通知
+入库使用批量保存器（moment_saver）：每批一次 IN 查询去重，新动态在一个事务内 bulk_create
 """
 import sys
 import os
 import json
-import time
-import random
 from datetime import datetime
 
 import requests
@@ -20,11 +20,14 @@ sys.path.insert(0, BACKEND_PATH)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xxm_fans_home.settings')
 django.setup()
 
-from django.utils import timezone
-from django.db.utils import IntegrityError
-from moments.models import Moment, PlatformCookie
+from moments.models import PlatformCookie
 from moments.services.cookie_service import CookieService
-from moments.services.image_service import ImageService
+
+from cookie_pool import COOKIE_EXPIRED_CODE, load_pool
+from http_client import PooledSession
+from moment_images import wait_for_images
+from moment_saver import MomentSaver
+from rate_control import RATE_LIMIT_CODES, enable_adaptive_rates
 
 
 class BilibiliDynamicCrawler:
@@ -35,20 +38,14 @@ class BilibiliDynamicCrawler:
 
     def __init__(self):
         self.bilibili_uid = os.environ.get('BILIBILI_UID', '37754047')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
-                          '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        self.session = PooledSession({
             'Referer': 'https://space.bilibili.com/',
             'Origin': 'https://space.bilibili.com',
-        })
+        }, timeout=self.TIMEOUT)
 
     def fetch_dynamics(self, cookie_string=None):
-        """获取用户动态列表"""
-        if cookie_string:
-            self.session.cookies.set('Cookie', cookie_string, domain='.bilibili.com')
+        """获取用户动态列表（Cookie 按请求传入，同一爬取器可轮换 Cookie 池中的身份）"""
+        headers = {'Cookie': cookie_string} if cookie_string else None
 
         try:
             params = {
@@ -56,9 +53,7 @@ class BilibiliDynamicCrawler:
                 'offset': '',
                 'timezone_offset': '-480',
             }
-            response = self.session.get(
-                self.API_URL, params=params, timeout=self.TIMEOUT
-            )
+            response = self.session.get(self.API_URL, params=params, headers=headers)
             response.raise_for_status()
             data = response.json()
 
@@ -176,21 +171,20 @@ class WeiboDynamicCrawler:
 
     API_URL = 'https://m.weibo.cn/api/container/getIndex'
     TIMEOUT = 15
+    # 未登录/登录失效时接口返回 ok=-100（附跳转 passport.weibo.cn 的 url），只有它表示 Cookie 过期
+    LOGIN_REQUIRED_CODE = -100
 
     def __init__(self):
         self.weibo_uid = os.environ.get('WEIBO_UID', '5704967686')
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = PooledSession({
             'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) '
                           'AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1',
-            'Accept': 'application/json, text/plain, */*',
             'Referer': f'https://m.weibo.cn/u/{self.weibo_uid}',
-        })
+        }, timeout=self.TIMEOUT)
 
     def fetch_dynamics(self, cookie_string=None, max_pages=3):
-        """获取微博动态"""
-        if cookie_string:
-            self.session.cookies.set('Cookie', cookie_string, domain='.weibo.cn')
+        """获取微博动态（Cookie 按请求传入，同一爬取器可轮换 Cookie 池中的身份）"""
+        headers = {'Cookie': cookie_string} if cookie_string else None
 
         try:
             params = {
@@ -201,13 +195,14 @@ class WeiboDynamicCrawler:
 
             all_posts = []
             for page in range(max_pages):
-                response = self.session.get(
-                    self.API_URL, params=params, timeout=self.TIMEOUT
-                )
+                response = self.session.get(self.API_URL, params=params, headers=headers)
                 response.raise_for_status()
                 data = response.json()
 
                 ok = data.get('ok')
+                if ok == self.LOGIN_REQUIRED_CODE:
+                    print(f"  微博API要求登录: ok={ok}")
+                    return None, ok
                 if ok != 1:
                     print(f"  微博API返回异常: ok={ok}")
                     break
@@ -221,7 +216,6 @@ class WeiboDynamicCrawler:
                     break
 
                 params['since_id'] = since_id
-                time.sleep(random.uniform(1, 2))
 
             return all_posts, 1
 
@@ -301,67 +295,40 @@ class WeiboDynamicCrawler:
         return text.strip()
 
 
-class MomentSaver:
-    """动态保存器 - 去重 + 写入 DB + 下载图片"""
-
-    @classmethod
-    def save_dynamics(cls, source, dynamics):
-        """保存动态列表，去重并下载图片（每篇最多下载4张）"""
-        saved = 0
-        skipped = 0
-
-        for dyn in dynamics:
-            exists = Moment.objects.filter(
-                source=source,
-                source_id=dyn['source_id'],
-            ).exists()
-            if exists:
-                skipped += 1
-                continue
-
-            images = []
-            if dyn.get('image_urls'):
-                images = ImageService.download_and_generate_thumbnails(
-                    source, dyn['source_id'], dyn['image_urls'][:4]
-                )
-
-            try:
-                if isinstance(dyn['publish_time'], datetime):
-                    pub_time = dyn['publish_time']
-                else:
-                    pub_time = datetime.fromisoformat(str(dyn['publish_time']))
-                if timezone.is_naive(pub_time):
-                    pub_time = timezone.make_aware(pub_time)
-
-                Moment.objects.create(
-                    source=source,
-                    source_id=dyn['source_id'],
-                    content=dyn.get('content', ''),
-                    images=images,
-                    publish_time=pub_time,
-                    like_count=dyn.get('like_count', 0),
-                    comment_count=dyn.get('comment_count', 0),
-                    share_count=dyn.get('share_count', 0),
-                    source_url=dyn.get('source_url', ''),
-                    video_bvid=dyn.get('video_bvid', ''),
-                    video_url=dyn.get('video_url', ''),
-                )
-                saved += 1
-            except IntegrityError:
-                skipped += 1
-            except Exception as e:
-                print(f"  保存动态失败 [{source}]: {e}")
-
-        return saved, skipped
-
-
-def main():
+def fetch_with_pool(pool, fetch, is_expired):
+    """
+    依次使用 Cookie 池中的身份抓取：返回过期的 Cookie 标记失效后换下一个
+
+    Args:
+        pool: CookiePool
+        fetch: 以 Cookie 字符串调用，返回 (动态列表, 返回码)
+        is_expired: 判断返回码是否表示 Cookie 失效
+
+    Returns:
+        tuple: (动态列表, 返回码, 是否还有可用 Cookie)
+    """
+    while True:
+        cookie = pool.acquire()
+        if cookie is None:
+            return None, None, False
+        dynamics, code = fetch(cookie.cookie_string)
+        if is_expired(code):
+            print(f"  Cookie #{cookie.cookie_id} 已过期，换下一个")
+            pool.report(cookie, expired=True)
+            continue
+        pool.report(cookie, rate_limited=code in RATE_LIMIT_CODES)
+        return dynamics, code, True
+
+
+def main(argv=None, wait_images=True):
     import argparse
     parser = argparse.ArgumentParser(description='满の动态爬虫')
     parser.add_argument('--full', action='store_true', help='全量抓取（首次使用）')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     weibo_pages = 10 if args.full else 1
+    # 翻页间隔由主机自适应限速决定（B站/微博是不同主机，互不等待）
+    enable_adaptive_rates()
 
     print("=" * 60)
     print("满の动态爬虫")
@@ -373,16 +340,18 @@ def main():
 
     # --- B站 ---
     print("\n[B站动态]")
-    bili_cookie = CookieService.get_cookie('bilibili')
-    if not bili_cookie:
+    bili_pool = load_pool('bilibili')
+    if not bili_pool.alive():
         print("  未找到有效 Cookie，跳过")
         results['bilibili']['error'] = 'cookie_missing'
     else:
         crawler = BilibiliDynamicCrawler()
-        dynamics, code = crawler.fetch_dynamics(bili_cookie)
+        dynamics, code, has_cookie = fetch_with_pool(
+            bili_pool, crawler.fetch_dynamics, lambda code: code == COOKIE_EXPIRED_CODE
+        )
 
-        if code == -101:
-            print("  Cookie 已过期")
+        if not has_cookie:
+            print("  Cookie 已全部过期")
             CookieService.mark_expired('bilibili')
             results['bilibili']['error'] = 'cookie_expired'
         elif dynamics is not None and code == 0:
@@ -395,20 +364,22 @@ def main():
             results['bilibili']['error'] = f'api_error_code_{code}'
             print(f"  爬取失败 (code={code})")
 
-    time.sleep(random.uniform(1, 3))
-
     # --- 微博 ---
     print("\n[微博动态]")
-    weibo_cookie = CookieService.get_cookie('weibo')
-    if not weibo_cookie:
+    weibo_pool = load_pool('weibo')
+    if not weibo_pool.alive():
         print("  未找到有效 Cookie，跳过")
         results['weibo']['error'] = 'cookie_missing'
     else:
         crawler = WeiboDynamicCrawler()
-        dynamics, code = crawler.fetch_dynamics(weibo_cookie, max_pages=weibo_pages)
-
-        if code != 1 and code is not None:
-            print("  Cookie 可能已过期")
+        dynamics, code, has_cookie = fetch_with_pool(
+            weibo_pool,
+            lambda cookie_string: crawler.fetch_dynamics(cookie_string, max_pages=weibo_pages),
+            lambda code: code == WeiboDynamicCrawler.LOGIN_REQUIRED_CODE
+        )
+
+        if not has_cookie:
+            print("  Cookie 已全部过期")
             CookieService.mark_expired('weibo')
             results['weibo']['error'] = 'cookie_expired'
         elif dynamics is not None:
@@ -421,6 +392,10 @@ def main():
             results['weibo']['error'] = 'api_error'
             print(f"  爬取失败")
 
+    # 常驻调度进程不等待，图片在后台继续下载并回填
+    if wait_images:
+        wait_for_images()
+
     print(f"\n结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
 
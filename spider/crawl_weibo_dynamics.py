@@ -2,7 +2,8 @@
 """
 微博动态全量爬虫（桌面版 API）
 爬取咻咻满所有微博动态，写入数据库。支持分页遍历直到无更多数据。
-两条动态间的爬取间隔：0.3 - 2 秒（随机）
+翻页间隔由主机自适应限速（rate_control）决定：接口正常时逐步加快，触发限流时减半
+入库使用批量保存器（moment_saver）：每批一次 IN 查询去重，新动态在一个事务内 bulk_create
 
 用法:
     python spider/crawl_weibo_dynamics.py              # 增量爬取（最多 3 页）
@@ -12,8 +13,6 @@
 import sys
 import os
 import json
-import time
-import random
 import re
 from datetime import datetime
 from urllib.parse import quote
@@ -28,14 +27,13 @@ sys.path.insert(0, BACKEND_PATH)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xxm_fans_home.settings')
 django.setup()
 
-from django.utils import timezone
-from django.db.utils import IntegrityError
-from moments.models import Moment, PlatformCookie
+from moments.models import PlatformCookie
 from moments.services.cookie_service import CookieService
-from moments.services.image_service import ImageService
 
-MIN_INTERVAL = 0.3
-MAX_INTERVAL = 2.0
+from http_client import PooledSession
+from moment_images import wait_for_images
+from moment_saver import MomentSaver
+from rate_control import enable_adaptive_rates
 
 
 class WeiboCrawler:
@@ -47,17 +45,10 @@ class WeiboCrawler:
 
     def __init__(self):
         self.weibo_uid = os.environ.get('WEIBO_UID', '5704967686')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': (
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                'AppleWebKit/537.36 (KHTML, like Gecko) '
-                'Chrome/120.0.0.0 Safari/537.36'
-            ),
-            'Accept': 'application/json, text/plain, */*',
+        self.session = PooledSession({
             'X-Requested-With': 'XMLHttpRequest',
             'Referer': 'https://weibo.com/',
-        })
+        }, timeout=self.TIMEOUT)
 
     def fetch_all(self, cookie_string=None, max_pages=None):
         """
@@ -80,7 +71,7 @@ class WeiboCrawler:
                 if since_id:
                     url += f'&since_id={quote(since_id)}'
 
-                response = self.session.get(url, timeout=self.TIMEOUT)
+                response = self.session.get(url)
                 response.raise_for_status()
                 data = response.json()
 
@@ -109,8 +100,6 @@ class WeiboCrawler:
                     break
 
                 since_id = next_since_id
-                delay = random.uniform(MIN_INTERVAL, MAX_INTERVAL)
-                time.sleep(delay)
 
             return all_posts, code
 
@@ -122,12 +111,7 @@ class WeiboCrawler:
             return None, None
 
     def _apply_cookie(self, cookie_string, domain):
-        for part in cookie_string.split(';'):
-            part = part.strip()
-            if '=' not in part:
-                continue
-            key, _, value = part.partition('=')
-            self.session.cookies.set(key.strip(), value, domain=domain)
+        self.session.set_cookie_string(cookie_string, domain)
 
     def _parse_posts(self, posts_list):
         posts = []
@@ -199,58 +183,6 @@ class WeiboCrawler:
         return text.strip()
 
 
-class MomentSaver:
-
-    @classmethod
-    def save_dynamics(cls, source, dynamics):
-        saved = 0
-        skipped = 0
-
-        for dyn in dynamics:
-            exists = Moment.objects.filter(
-                source=source,
-                source_id=dyn['source_id'],
-            ).exists()
-            if exists:
-                skipped += 1
-                continue
-
-            images = []
-            if dyn.get('image_urls'):
-                images = ImageService.download_and_generate_thumbnails(
-                    source, dyn['source_id'], dyn['image_urls'][:4]
-                )
-
-            try:
-                if isinstance(dyn['publish_time'], datetime):
-                    pub_time = dyn['publish_time']
-                else:
-                    pub_time = datetime.fromisoformat(str(dyn['publish_time']))
-                if timezone.is_naive(pub_time):
-                    pub_time = timezone.make_aware(pub_time)
-
-                Moment.objects.create(
-                    source=source,
-                    source_id=dyn['source_id'],
-                    content=dyn.get('content', ''),
-                    images=images,
-                    publish_time=pub_time,
-                    like_count=dyn.get('like_count', 0),
-                    comment_count=dyn.get('comment_count', 0),
-                    share_count=dyn.get('share_count', 0),
-                    source_url=dyn.get('source_url', ''),
-                    video_bvid=dyn.get('video_bvid', ''),
-                    video_url=dyn.get('video_url', ''),
-                )
-                saved += 1
-            except IntegrityError:
-                skipped += 1
-            except Exception as e:
-                print(f"  保存动态失败 [{source}]: {e}")
-
-        return saved, skipped
-
-
 def main():
     import argparse
     parser = argparse.ArgumentParser(description='微博动态全量爬虫')
@@ -271,7 +203,8 @@ def main():
     print("=" * 60)
     print(f"微博动态爬虫 - {mode_label}模式")
     print(f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"间隔范围: {MIN_INTERVAL}s - {MAX_INTERVAL}s")
+    limiter = enable_adaptive_rates()['weibo.com']
+    print(f"请求速率: {limiter.rate:.2f} 次/秒（自适应，范围 {limiter.min_rate}-{limiter.max_rate}）")
     print("=" * 60)
 
     cookie = CookieService.get_cookie('weibo')
@@ -299,6 +232,8 @@ def main():
         CookieService.mark_expired('weibo')
         result['weibo']['error'] = 'cookie_expired'
 
+    wait_for_images()
+
     print(f"\n结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
     return result
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+粉丝数进程内入库
+采样结果直接写入 data_analytics 的 Account / FollowerMetrics，代替每次运行后
+在导入清单中查找最新文件、再启动一个 Python 进程执行 manage.py ingest_follower --file 的两段式流程：
+省去第二个解释器启动与 django.setup()，JSON 文件只作为可选的归档。
+
+- 账号：一次 uid__in 查询取出已有账号，配置中新增的账号自动创建
+- 指标：一次查询取出本采样时刻已有的 (account, crawl_time) 记录，已有的 bulk_update、其余 bulk_create，
+  整批在一个事务内写入；与原导入工具的 update_or_create 语义一致，同一时刻重跑不会产生重复记录
+  （(account, crawl_time) 只有索引没有唯一约束，不能用 bulk_create 的 update_conflicts）
+- 入库后调用 FollowerService.generate_all_caches() 预生成缓存（与原导入工具一致）
+- 入库失败时归档文件仍登记为未导入，可用 --pending 补导
+
+路径: spider/follower_ingest.py
+
+用法:
+    setup_django()                                   # 常驻调度进程中已初始化时不重复执行
+    ingest_samples(results, crawl_time)              # results 为 FollowerSampler.sample 的返回值
+
+    python spider/follower_ingest.py --pending       # 补导导入清单中未导入的粉丝数文件
+    python spider/follower_ingest.py data/spider/fans_count/2026/02/b_fans_count_2026-02-06-14.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from import_manifest import KIND_FANS, PROJECT_ROOT, ImportManifest, mark_file_imported
+
+BACKEND_PATH = os.path.join(PROJECT_ROOT, 'repo', 'xxm_fans_backend')
+
+PLATFORM = 'bilibili'
+
+
+def setup_django():
+    """按需初始化 Django（已初始化时直接返回）"""
+    if BACKEND_PATH not in sys.path:
+        sys.path.insert(0, BACKEND_PATH)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xxm_fans_home.settings')
+
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def ingest_samples(
+    results: Iterable[Dict[str, Any]],
+    crawl_time: datetime,
+    generate_caches: bool = True
+) -> Dict[str, Any]:
+    """
+    把一次采样的结果写入数据库
+
+    Args:
+        results: [{'uid', 'name', 'follower', 'status', ...}]，status 不为 success 的跳过
+        crawl_time: 采样时间（naive 时按当前时区处理）
+        generate_caches: 入库后预生成粉丝数据缓存
+
+    Returns:
+        dict: {'success': 入库条数, 'failed': 跳过条数, 'created_accounts': 新建账号数,
+               'updated': 覆盖同一采样时刻已有记录的条数}
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from data_analytics.models import Account, FollowerMetrics
+
+    results = list(results)
+    samples = {
+        str(r['uid']): r for r in results
+        if r.get('status') == 'success' and r.get('follower') is not None
+    }
+    summary = {'success': 0, 'failed': len(results) - len(samples), 'created_accounts': 0, 'updated': 0}
+    if not samples:
+        return summary
+
+    if timezone.is_naive(crawl_time):
+        crawl_time = timezone.make_aware(crawl_time)
+    ingest_time = timezone.now()
+
+    with transaction.atomic():
+        accounts = {account.uid: account for account in Account.objects.filter(uid__in=list(samples))}
+        for uid in samples.keys() - accounts.keys():
+            accounts[uid], created = Account.objects.get_or_create(
+                uid=uid, defaults={'name': samples[uid].get('name') or uid, 'platform': PLATFORM, 'is_active': True}
+            )
+            summary['created_accounts'] += int(created)
+
+        existing = {
+            metric.account_id: metric
+            for metric in FollowerMetrics.objects.filter(
+                account__in=[accounts[uid] for uid in samples], crawl_time=crawl_time
+            )
+        }
+        to_create, to_update = [], []
+        for uid, sample in samples.items():
+            account = accounts[uid]
+            metric = existing.get(account.pk)
+            if metric is None:
+                to_create.append(FollowerMetrics(
+                    account=account, follower_count=sample['follower'],
+                    crawl_time=crawl_time, ingest_time=ingest_time
+                ))
+            else:
+                metric.follower_count = sample['follower']
+                metric.ingest_time = ingest_time
+                to_update.append(metric)
+
+        if to_create:
+            FollowerMetrics.objects.bulk_create(to_create)
+        if to_update:
+            FollowerMetrics.objects.bulk_update(to_update, ['follower_count', 'ingest_time'])
+    summary['success'] = len(samples)
+    summary['updated'] = len(to_update)
+
+    if generate_caches:
+        from data_analytics.services.follower_service import FollowerService
+        try:
+            FollowerService.generate_all_caches()
+        except Exception as e:
+            # 数据已提交，缓存失效后由 API 重新生成
+            print(f"⚠ 预生成缓存失败: {e}")
+    return summary
+
+
+def ingest_file(path: str, generate_caches: bool = True) -> Dict[str, Any]:
+    """导入一个粉丝数 JSON 文件并在导入清单中标记为已导入"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    crawl_time = datetime.strptime(data['update_time'], '%Y-%m-%d %H:%M:%S')
+    summary = ingest_samples(data.get('accounts', []), crawl_time, generate_caches)
+    mark_file_imported(path, KIND_FANS, row_count=summary['success'])
+    return summary
+
+
+def ingest_pending(limit: int = 100, manifest: Optional[ImportManifest] = None) -> int:
+    """补导导入清单中未导入的粉丝数文件（按时段升序），最后统一预生成一次缓存；返回导入的文件数"""
+    manifest = manifest or ImportManifest()
+    entries = manifest.pending(KIND_FANS, limit)
+    for entry in entries:
+        path = os.path.join(PROJECT_ROOT, entry['path'])
+        summary = ingest_file(path, generate_caches=False)
+        print(f"✓ {entry['path']}: 入库 {summary['success']} 条")
+    if entries:
+        from data_analytics.services.follower_service import FollowerService
+        FollowerService.generate_all_caches()
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='粉丝数入库（补导归档文件）')
+    parser.add_argument('files', nargs='*', help='要导入的粉丝数 JSON 文件')
+    parser.add_argument('--pending', action='store_true', help='导入清单中所有未导入的粉丝数文件')
+    args = parser.parse_args()
+    if not args.files and not args.pending:
+        parser.error('需要指定文件或 --pending')
+
+    setup_django()
+    for path in args.files:
+        summary = ingest_file(path)
+        print(f"✓ {path}: 入库 {summary['success']} 条，跳过 {summary['failed']} 条，新建账号 {summary['created_accounts']} 个")
+    if args.pending:
+        print(f"补导 {ingest_pending()} 个文件")
+
+
+if __name__ == '__main__':
+    main()
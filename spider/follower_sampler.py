@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站粉丝数并发采样
+按配置文件（spider/follower_accounts.json）中的账号列表并发请求 x/relation/stat，
+代替 get_bilibili_fans_count 中写死两个 UID、逐个请求并 sleep(1) 的方式：
+账号数增加到几百个时，采样耗时由全局请求预算决定（数百账号数秒到数十秒），而不是 N 秒 + N 次请求延迟。
+
+- 账号配置：{"accounts": [{"uid", "name", "group"}]}，group 用于区分本人/模板歌单歌手/相关创作者，按 uid 去重；
+  仓库中的配置只有本人的两个账号，artist/related 分组需按实际 B站 UID 手动添加
+- 并发：线程池 + 共享令牌桶；常驻调度进程或入口注册了 api.bilibili.com 的自适应限速器时共用该预算并反馈限流
+- 输出结果与原 get_fans_count 一致：{'uid', 'name', 'follower', 'status', 'timestamp'[, 'message']}，顺序与配置一致
+
+路径: spider/follower_sampler.py
+
+用法:
+    accounts = load_accounts()                               # 默认 spider/follower_accounts.json
+    results = FollowerSampler(concurrency=8).sample(accounts)
+
+    python spider/follower_sampler.py --group artist         # 只采样模板歌单歌手，结果打印到终端
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from http_client import PooledSession
+from rate_control import RATE_LIMIT_CODES, TokenBucket, get_host_limiter
+
+DEFAULT_ACCOUNTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'follower_accounts.json')
+
+RELATION_API_URL = 'https://api.bilibili.com/x/relation/stat'
+RELATION_API_HOST = 'api.bilibili.com'
+
+# 默认并发参数：8 个在途请求，未注册主机限速器时每秒 8 次
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RPS = 8.0
+
+HEADERS = {
+    'Referer': 'https://www.bilibili.com',
+}
+
+
+def load_accounts(path: str = DEFAULT_ACCOUNTS_PATH, groups: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    读取账号配置，按 uid 去重（保留第一次出现的名称与分组）
+
+    Args:
+        path: 配置文件路径
+        groups: 只保留这些分组，为空时保留全部
+
+    Returns:
+        list: [{'uid': int, 'name': str, 'group': str}]
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    groups = set(groups) if groups else None
+    accounts, seen = [], set()
+    for entry in config.get('accounts', []):
+        uid = int(entry['uid'])
+        group = entry.get('group', 'default')
+        if uid in seen or (groups and group not in groups):
+            continue
+        seen.add(uid)
+        accounts.append({'uid': uid, 'name': entry.get('name') or str(uid), 'group': group})
+    return accounts
+
+
+class FollowerSampler:
+    """B站粉丝数并发采样器"""
+
+    TIMEOUT = 10
+    RATE_LIMIT_BACKOFF = 5.0
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rps: float = DEFAULT_RPS, max_retries: int = 2):
+        """
+        Args:
+            concurrency: 最大在途请求数
+            rps: 未注册主机限速器时的每秒请求预算
+            max_retries: 单个账号的最大重试次数（限流或网络错误）
+        """
+        self.concurrency = max(1, int(concurrency))
+        self.limiter = get_host_limiter(RELATION_API_HOST) or TokenBucket(rps, burst=self.concurrency)
+        self.max_retries = max_retries
+        self.session = PooledSession(
+            HEADERS, timeout=self.TIMEOUT, throttled=False, pool_maxsize=self.concurrency, max_retries=0
+        )
+
+    def sample(self, accounts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """并发采样所有账号，结果顺序与输入一致"""
+        accounts = list(accounts)
+        if not accounts:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(accounts))) as executor:
+            return list(executor.map(self.sample_account, accounts))
+
+    def sample_account(self, account: Dict[str, Any]) -> Dict[str, Any]:
+        """采样单个账号（失败时返回 status=error 与错误信息，不抛出）"""
+        uid = account['uid']
+        message = ''
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(RELATION_API_URL, params={'vmid': uid})
+                if response.status_code == 412:
+                    raise _RateLimited('HTTP 412')
+                response.raise_for_status()
+                data = response.json()
+                code = data.get('code')
+                if code in RATE_LIMIT_CODES:
+                    raise _RateLimited(f"code={code}, message={data.get('message')}")
+                self.limiter.record_success()
+                if code == 0:
+                    return self._result(account, data['data']['follower'])
+                # 账号不存在等业务错误不重试
+                return self._result(account, None, data.get('message', 'Unknown error'))
+            except _RateLimited as e:
+                message = str(e)
+                self.limiter.record_throttled()
+                time.sleep(self.RATE_LIMIT_BACKOFF * (attempt + 1))
+            except (requests.RequestException, ValueError, KeyError) as e:
+                message = str(e)
+                time.sleep(min(2 ** attempt, 5))
+        return self._result(account, None, message)
+
+    @staticmethod
+    def _result(account: Dict[str, Any], follower: Optional[int], message: Optional[str] = None) -> Dict[str, Any]:
+        result = {
+            'uid': account['uid'],
+            'name': account.get('name', str(account['uid'])),
+            'follower': follower,
+            'status': 'success' if follower is not None else 'error',
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if message is not None:
+            result['message'] = message
+        return result
+
+
+class _RateLimited(Exception):
+    """relation/stat 触发限流"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='B站粉丝数并发采样')
+    parser.add_argument('--accounts', default=DEFAULT_ACCOUNTS_PATH, help='账号配置文件')
+    parser.add_argument('--group', action='append', help='只采样指定分组（可重复）')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='最大在途请求数')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS, help='每秒请求预算')
+    args = parser.parse_args()
+
+    accounts = load_accounts(args.accounts, args.group)
+    if not accounts:
+        print(f"✗ {args.accounts} 中没有{'分组 ' + '/'.join(args.group) + ' 的' if args.group else ''}账号")
+        return
+    started = time.monotonic()
+    results = FollowerSampler(args.concurrency, args.rps).sample(accounts)
+    for result in results:
+        if result['status'] == 'success':
+            print(f"✓ {result['name']:<16} {result['follower']:>12,}")
+        else:
+            print(f"✗ {result['name']:<16} {result.get('message', '')}")
+    failed = sum(1 for result in results if result['status'] != 'success')
+    print(f"\n共 {len(results)} 个账号，失败 {failed} 个，耗时 {time.monotonic() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
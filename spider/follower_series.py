@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+粉丝数高频时间序列存储（follower_series.sqlite3）
+接收任意间隔（小时内多次）的粉丝数采样，每个账号每天一行，采样点以差分编码的整数数组保存，
+读取时按任意分辨率重采样并对缺失区间线性插值：采样频率提高到每 10 分钟，行数仍是 账号数 × 天数，
+某次采样失败只在序列中留下一个被插值补齐的点，而不是图表上的空洞。
+
+编码（每个账号每天一个 BLOB）:
+    依次存放 (距当天 00:00 的秒数, 粉丝数) 对；第一对为绝对值，之后为与前一对的差值，
+    每个整数先 zigzag（粉丝数可能减少）再按 varint 写入。10 分钟一次的采样每个点约 3 字节。
+    按时间顺序追加时不解码已有数据，只把新点编码后拼接在末尾；乱序或重复时刻的采样解码后合并再重新编码。
+
+重采样（load_series）:
+    时间轴为 start 起每 step 一个点，只覆盖第一次到最后一次采样之间。
+    每个点取 (t - step, t] 内最后一次采样（interpolated=False）；
+    区间内没有采样时按前后两次采样线性插值（interpolated=True）。delta 为与上一个点的差值（净增长图用）。
+
+路径: spider/follower_series.py
+
+用法:
+    with FollowerSeriesStore() as store:
+        store.add_results(sampler.sample(accounts), datetime.now())
+        points = store.load_series('37754047', start, end, timedelta(minutes=10))
+
+    python spider/follower_series.py show 37754047 --hours 24 --step 10       # 最近 24 小时，每 10 分钟一个点
+    python spider/follower_series.py backfill                                  # 从 data/spider/fans_count 归档导入每小时数据
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'follower_series.sqlite3')
+DEFAULT_ARCHIVE_ROOT = os.path.join(PROJECT_ROOT, 'data', 'spider', 'fans_count')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS follower_series (
+    uid TEXT NOT NULL,
+    day TEXT NOT NULL,
+    points BLOB NOT NULL,
+    sample_count INTEGER NOT NULL,
+    last_offset INTEGER NOT NULL,
+    last_count INTEGER NOT NULL,
+    PRIMARY KEY (uid, day)
+) WITHOUT ROWID;
+"""
+
+# (距当天 00:00 的秒数, 粉丝数)
+Point = Tuple[int, int]
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def _write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def encode_points(points: Iterable[Point], previous: Point = (0, 0)) -> bytes:
+    """
+    把按时间升序的采样点差分编码为字节串
+
+    Args:
+        points: [(秒数, 粉丝数)]
+        previous: 差分的起点（追加到已有 BLOB 末尾时传入已有的最后一个点）
+    """
+    buffer = bytearray()
+    last_offset, last_count = previous
+    for offset, count in points:
+        _write_varint(buffer, _zigzag(offset - last_offset))
+        _write_varint(buffer, _zigzag(count - last_count))
+        last_offset, last_count = offset, count
+    return bytes(buffer)
+
+
+def decode_points(blob: bytes) -> List[Point]:
+    """encode_points 的逆过程"""
+    values = []
+    value = shift = 0
+    for byte in blob:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(_unzigzag(value))
+        value = shift = 0
+
+    points = []
+    offset = count = 0
+    for i in range(0, len(values) - 1, 2):
+        offset += values[i]
+        count += values[i + 1]
+        points.append((offset, count))
+    return points
+
+
+def _day_start(day: str) -> datetime:
+    return datetime.strptime(day, '%Y-%m-%d')
+
+
+class FollowerSeriesStore:
+    """粉丝数时间序列存储"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        return self
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def add_samples(self, samples: Iterable[Tuple[Any, datetime, int]]) -> int:
+        """
+        写入采样（同一账号同一秒的重复采样以后写入的为准）
+
+        Args:
+            samples: [(uid, 采样时间, 粉丝数)]
+
+        Returns:
+            int: 写入的采样数
+        """
+        grouped: Dict[Tuple[str, str], Dict[int, int]] = {}
+        for uid, sample_time, count in samples:
+            day = sample_time.strftime('%Y-%m-%d')
+            offset = int((sample_time - _day_start(day)).total_seconds())
+            grouped.setdefault((str(uid), day), {})[offset] = int(count)
+
+        with self.conn:
+            for (uid, day), points in grouped.items():
+                self._merge_day(uid, day, sorted(points.items()))
+        return sum(len(points) for points in grouped.values())
+
+    def add_results(self, results: Iterable[Dict[str, Any]], sample_time: datetime) -> int:
+        """写入 FollowerSampler.sample 的结果（失败的账号跳过）"""
+        return self.add_samples(
+            (r['uid'], sample_time, r['follower'])
+            for r in results if r.get('status') == 'success' and r.get('follower') is not None
+        )
+
+    def _merge_day(self, uid: str, day: str, points: List[Point]):
+        row = self.conn.execute(
+            'SELECT points, last_offset, last_count FROM follower_series WHERE uid = ? AND day = ?', (uid, day)
+        ).fetchone()
+        if row is None:
+            merged = points
+            blob = encode_points(merged)
+        elif points[0][0] > row[1]:
+            # 常见情况：新采样晚于已有的最后一个点，不解码已有数据，直接拼接在 BLOB 末尾
+            self.conn.execute(
+                """UPDATE follower_series
+                   SET points = ?, sample_count = sample_count + ?, last_offset = ?, last_count = ?
+                   WHERE uid = ? AND day = ?""",
+                (row[0] + encode_points(points, (row[1], row[2])), len(points),
+                 points[-1][0], points[-1][1], uid, day)
+            )
+            return
+        else:
+            existing = dict(decode_points(row[0]))
+            existing.update(points)
+            merged = sorted(existing.items())
+            blob = encode_points(merged)
+        self.conn.execute(
+            """INSERT OR REPLACE INTO follower_series (uid, day, points, sample_count, last_offset, last_count)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (uid, day, blob, len(merged), merged[-1][0], merged[-1][1])
+        )
+
+    def load_samples(self, uid: Any, start: datetime, end: datetime) -> List[Tuple[datetime, int]]:
+        """读取 [start, end] 内的原始采样（按时间升序）"""
+        rows = self.conn.execute(
+            'SELECT day, points FROM follower_series WHERE uid = ? AND day BETWEEN ? AND ? ORDER BY day',
+            (str(uid), start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        ).fetchall()
+        samples = []
+        for day, blob in rows:
+            base = _day_start(day)
+            for offset, count in decode_points(blob):
+                sample_time = base + timedelta(seconds=offset)
+                if start <= sample_time <= end:
+                    samples.append((sample_time, count))
+        return samples
+
+    def load_series(
+        self,
+        uid: Any,
+        start: datetime,
+        end: datetime,
+        step: timedelta = timedelta(hours=1)
+    ) -> List[Dict[str, Any]]:
+        """
+        按 step 重采样 [start, end] 内的粉丝数，缺失区间线性插值
+
+        Returns:
+            list: [{'time': datetime, 'follower_count': int, 'delta': int 或 None, 'interpolated': bool}]
+        """
+        # 往前多读（至少一天），第一个点所在区间的采样与跨越 start 的缺失区间的前一次采样都能读到
+        samples = self.load_samples(uid, start - max(step, timedelta(days=1)), end)
+        if not samples:
+            return []
+
+        series = []
+        index = -1
+        point = start
+        while point <= end and point <= samples[-1][0]:
+            while index + 1 < len(samples) and samples[index + 1][0] <= point:
+                index += 1
+            if index >= 0 and samples[index][0] > point - step:
+                count, interpolated = samples[index][1], False
+            elif index >= 0:
+                (before_time, before), (after_time, after) = samples[index], samples[index + 1]
+                ratio = (point - before_time) / (after_time - before_time)
+                count, interpolated = round(before + (after - before) * ratio), True
+            else:
+                # 第一次采样之前的点不返回
+                point += step
+                continue
+            delta = count - series[-1]['follower_count'] if series else None
+            series.append({'time': point, 'follower_count': count, 'delta': delta, 'interpolated': interpolated})
+            point += step
+        return series
+
+    def storage_stats(self) -> Dict[str, int]:
+        """行数、采样数与编码后的总字节数"""
+        rows, samples, size = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(sample_count), 0), COALESCE(SUM(LENGTH(points)), 0) FROM follower_series'
+        ).fetchone()
+        return {'rows': rows, 'samples': samples, 'bytes': size}
+
+
+def backfill(store: FollowerSeriesStore, root: str = DEFAULT_ARCHIVE_ROOT) -> int:
+    """从粉丝数 JSON 归档（get_bilibili_fans_count 的输出）导入历史采样，返回导入的采样数"""
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(dirpath, name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            sample_time = datetime.strptime(data['update_time'], '%Y-%m-%d %H:%M:%S')
+            total += store.add_results(data.get('accounts', []), sample_time)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='粉丝数时间序列')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='时间序列数据库路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show = subparsers.add_parser('show', help='按分辨率输出账号的粉丝数序列')
+    show.add_argument('uid')
+    show.add_argument('--hours', type=int, default=24, help='最近多少小时')
+    show.add_argument('--step', type=int, default=60, help='分辨率（分钟）')
+
+    fill = subparsers.add_parser('backfill', help='从粉丝数 JSON 归档导入历史采样')
+    fill.add_argument('root', nargs='?', default=DEFAULT_ARCHIVE_ROOT)
+
+    subparsers.add_parser('stats', help='存储统计')
+    args = parser.parse_args()
+
+    with FollowerSeriesStore(args.db) as store:
+        if args.command == 'show':
+            end = datetime.now().replace(second=0, microsecond=0)
+            step = timedelta(minutes=args.step)
+            for point in store.load_series(args.uid, end - timedelta(hours=args.hours), end, step):
+                delta = '' if point['delta'] is None else f"{point['delta']:+,}"
+                mark = '~' if point['interpolated'] else ' '
+                print(f"{point['time'].strftime('%Y-%m-%d %H:%M')} {mark} {point['follower_count']:>12,} {delta:>8}")
+        elif args.command == 'backfill':
+            print(f"导入 {backfill(store, args.root)} 个采样")
+        else:
+            print(json.dumps(store.storage_stats(), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,25 @@
 # -*- coding: utf-8 -*-
 """
 B站粉丝数爬虫脚本
-获取指定B站账号的粉丝数并保存为JSON文件
+按账号配置（follower_accounts.json）并发获取B站账号的粉丝数（follower_sampler）
+命令行运行时结果追加到运行台账（run_ledger，任务名 fans_count）
+采样结果在本进程内写入数据库（follower_ingest），JSON 文件作为可选归档登记到导入清单（import_manifest，类型 fans_count）
+请求经共享 HTTP 客户端（http_client）发出，在 api.bilibili.com 的请求预算内并发
 """
 
+import argparse
 import json
-import time
-import requests
 import os
+import sqlite3
 from datetime import datetime
 
+from follower_ingest import ingest_samples, setup_django
+from follower_sampler import DEFAULT_ACCOUNTS_PATH, FollowerSampler, load_accounts
+from follower_series import FollowerSeriesStore
+from import_manifest import KIND_FANS, mark_file_imported, register_file
+from rate_control import enable_adaptive_rates
+from run_ledger import record_run
+
 
 def get_fans_count(uid):
     """
@@ -22,94 +32,128 @@ def get_fans_count(uid):
     Returns:
         dict: 包含账号信息和粉丝数的字典
     """
-    url = f"https://api.bilibili.com/x/relation/stat?vmid={uid}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Referer': 'https://www.bilibili.com'
+    return FollowerSampler(concurrency=1).sample_account({'uid': uid, 'name': str(uid)})
+
+
+def write_archive(results, now):
+    """
+    把采样结果写入按小时命名的 JSON 归档文件并登记到导入清单
+
+    Returns:
+        str: 输出文件路径
+    """
+    # 创建输出目录（相对路径）
+    output_dir = f"data/spider/fans_count/{now.strftime('%Y')}/{now.strftime('%m')}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    output_file = f"{output_dir}/b_fans_count_{now.strftime('%Y-%m-%d-%H')}.json"
+    output_data = {
+        'update_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+        'accounts': results
     }
 
+    # 账号多时不缩进，文件体积与写入耗时随账号数线性增长
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, ensure_ascii=False, separators=(',', ':'))
+
+    register_file(output_file, KIND_FANS)
+    return output_file
+
+
+def write_series(results, now):
+    """把采样追加到粉丝数时间序列（写入失败只打印警告，不影响入库与归档）"""
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get('code') == 0:
-            follower = data['data']['follower']
-            return {
-                'uid': uid,
-                'follower': follower,
-                'status': 'success',
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-        else:
-            return {
-                'uid': uid,
-                'follower': None,
-                'status': 'error',
-                'message': data.get('message', 'Unknown error'),
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-    except requests.RequestException as e:
-        return {
-            'uid': uid,
-            'follower': None,
-            'status': 'error',
-            'message': str(e),
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-
-
-def main():
-    """主函数"""
-    # 定义要查询的B站账号
-    accounts = [
-        {'uid': 37754047, 'name': '咻咻满'},
-        {'uid': 480116537, 'name': '咻小满'}
-    ]
-
-    results = []
-
-    print("开始获取B站粉丝数...")
-    print("-" * 50)
+        with FollowerSeriesStore() as store:
+            return store.add_results(results, now)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠ 写入粉丝数时间序列失败: {e}")
+        return 0
 
-    for account in accounts:
-        print(f"正在获取 {account['name']} (UID: {account['uid']}) 的粉丝数...")
-        result = get_fans_count(account['uid'])
-        result['name'] = account['name']
-        results.append(result)
 
+def main(accounts_path=DEFAULT_ACCOUNTS_PATH, ingest=False, archive=True, series=True):
+    """
+    主函数
+
+    Args:
+        accounts_path (str): 账号配置文件
+        ingest (bool): 在本进程内写入数据库（需要能初始化 Django）
+        archive (bool): 写出 JSON 归档文件
+        series (bool): 追加到粉丝数时间序列（follower_series，支持小时内多次采样）
+
+    Returns:
+        dict: {'results': 采样结果, 'file': 归档文件路径或 None, 'ingest': 入库统计或 None}
+    """
+    if ingest:
+        # 先初始化 Django，配置错误时不必等采样完成才失败
+        setup_django()
+
+    accounts = load_accounts(accounts_path)
+
+    print(f"开始获取B站粉丝数（{len(accounts)} 个账号）...")
+    print("-" * 50)
+
+    started = datetime.now()
+    results = FollowerSampler().sample(accounts)
+    for result in results:
         if result['status'] == 'success':
-            print(f"✓ {account['name']}: {result['follower']:,} 粉丝")
+            print(f"✓ {result['name']}: {result['follower']:,} 粉丝")
         else:
-            print(f"✗ {account['name']}: 获取失败 - {result.get('message', 'Unknown error')}")
-
-        # 避免请求过快
-        time.sleep(1)
+            print(f"✗ {result['name']}: 获取失败 - {result.get('message', 'Unknown error')}")
 
     print("-" * 50)
+    print(f"耗时 {(datetime.now() - started).total_seconds():.2f}s")
 
-    # 保存为JSON文件，文件名包含日期时间戳
-    now = datetime.now()
-    timestamp = now.strftime('%Y-%m-%d-%H')
-    year = now.strftime('%Y')
-    month = now.strftime('%m')
+    # 入库、归档与时间序列使用同一个采样时间
+    now = datetime.now().replace(microsecond=0)
+    output = {'results': results, 'file': None, 'ingest': None}
 
-    # 创建输出目录（相对路径）
-    output_dir = f'data/spider/fans_count/{year}/{month}'
-    os.makedirs(output_dir, exist_ok=True)
+    if series:
+        write_series(results, now)
 
-    output_file = f'{output_dir}/b_fans_count_{timestamp}.json'
-    output_data = {
-        'update_time': now.strftime('%Y-%m-%d %H:%M:%S'),
-        'accounts': results
-    }
+    # 先写归档：入库失败时文件在清单中保持未导入，可用 follower_ingest.py --pending 补导
+    if archive:
+        output['file'] = write_archive(results, now)
+        print(f"\n数据已保存到: {output['file']}")
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    if ingest:
+        output['ingest'] = ingest_samples(results, now)
+        if output['file']:
+            mark_file_imported(output['file'], KIND_FANS, row_count=output['ingest']['success'])
+        print(f"入库 {output['ingest']['success']} 条，新建账号 {output['ingest']['created_accounts']} 个")
 
-    print(f"\n数据已保存到: {output_file}")
     print(f"共获取 {len(results)} 个账号的信息")
+    return output
+
+
+def run_cli():
+    """命令行入口：执行爬取并记录运行台账（常驻调度进程直接调用 main，由调度进程记录）"""
+    parser = argparse.ArgumentParser(description='B站粉丝数爬虫')
+    parser.add_argument('--accounts', default=DEFAULT_ACCOUNTS_PATH, help='账号配置文件')
+    parser.add_argument('--no-ingest', action='store_true', help='只写 JSON 文件，不写入数据库')
+    parser.add_argument('--no-archive', action='store_true', help='只写入数据库，不写 JSON 文件')
+    args = parser.parse_args()
+    if args.no_ingest and args.no_archive:
+        parser.error('--no-ingest 与 --no-archive 不能同时使用')
+
+    started = datetime.now()
+    enable_adaptive_rates()
+    try:
+        output = main(args.accounts, ingest=not args.no_ingest, archive=not args.no_archive)
+    except Exception as e:
+        record_run('fans_count', started, False, error_message=str(e))
+        raise
+
+    results = output['results']
+    failed = [r['name'] for r in results if r['status'] != 'success']
+    record_run(
+        'fans_count',
+        started,
+        not failed,
+        error_message=f"获取失败: {', '.join(failed)}" if failed else None,
+        summary=f"成功 {len(results) - len(failed)}/{len(results)} 个账号",
+        details={'file': output['file'], 'ingest': output['ingest']},
+    )
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    run_cli()
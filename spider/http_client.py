@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫共享 HTTP 客户端
+所有爬虫通过 PooledSession 发请求：同一进程内挂载同一个连接池（按主机保持 keep-alive 长连接），
+统一的重试与退避、默认超时、压缩响应解码和公共请求头，请求前按上游主机限速（rate_control.throttle），
+响应后把是否限流反馈给主机的自适应限速器（rate_control.report）。
+小接口（粉丝数、大航海分页、动态列表）不再为每次调用重新建立 TCP/TLS 连接。
+
+- 重试：连接失败、读超时和 5xx 由连接池按指数退避重试（只重试 GET/HEAD）；
+  412/风控返回码属于限流，不在这里重试，由各爬虫自己的退避逻辑处理
+- 压缩：Accept-Encoding 取 urllib3 支持的全部编码（安装 brotli / zstandard 后自动包含 br / zstd）
+- 会话之间不共享 Cookie 和请求头，只共享连接池；close() 不会关闭共享连接池
+
+路径: spider/http_client.py
+
+用法:
+    from http_client import PooledSession
+
+    session = PooledSession({'Referer': 'https://space.bilibili.com/'})
+    response = session.get(url, params=params)          # 自动限速、默认超时、失败重试
+
+    # 并发抓取器使用独占连接池（连接数与并发数一致），限速与重试由抓取器自己负责
+    session = PooledSession(HEADERS, pool_maxsize=8, max_retries=0, throttled=False)
+"""
+
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from rate_control import is_rate_limited, report, throttle
+
+# 默认超时：(连接, 读取) 秒
+DEFAULT_TIMEOUT: Tuple[float, float] = (5.0, 15.0)
+
+# 连接失败/读超时/5xx 的默认重试次数与退避基数（第 n 次重试前等待 backoff × 2^(n-1) 秒）
+DEFAULT_RETRIES = 2
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS = (500, 502, 503, 504)
+
+# 共享连接池：最多缓存的主机数、每个主机保持的长连接数
+POOL_HOSTS = 16
+POOL_MAXSIZE = 10
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+_shared_adapter: Optional[HTTPAdapter] = None
+_shared_adapter_lock = threading.Lock()
+
+
+def make_retry(retries: int = DEFAULT_RETRIES) -> Retry:
+    """统一的重试策略：只重试幂等请求，失败时返回最后一次响应而不是抛出 MaxRetryError"""
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        raise_on_status=False,
+    )
+
+
+def shared_adapter() -> HTTPAdapter:
+    """进程内共享的连接池（首次调用时创建）"""
+    global _shared_adapter
+    with _shared_adapter_lock:
+        if _shared_adapter is None:
+            _shared_adapter = HTTPAdapter(
+                pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=make_retry()
+            )
+        return _shared_adapter
+
+
+class PooledSession(requests.Session):
+    """挂载共享连接池的 requests 会话：默认超时、请求前按主机限速、响应后反馈限流结果"""
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Union[float, Tuple[float, float], None] = DEFAULT_TIMEOUT,
+        throttled: bool = True,
+        pool_maxsize: Optional[int] = None,
+        max_retries: Optional[int] = None
+    ):
+        """
+        Args:
+            headers: 覆盖公共请求头的字段（Referer、移动端 User-Agent 等）
+            timeout: 调用方未指定 timeout 时使用的超时
+            throttled: 请求前调用 rate_control.throttle、响应后反馈限流结果（自行限速的抓取器传 False）
+            pool_maxsize: 给出时使用独占连接池，每个主机保持的连接数
+            max_retries: 给出时使用独占连接池，按此次数重试（0 为不重试）
+        """
+        super().__init__()
+        self.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+        self.timeout = timeout
+        self.throttled = throttled
+
+        self._owns_adapter = pool_maxsize is not None or max_retries is not None
+        if self._owns_adapter:
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=pool_maxsize or POOL_MAXSIZE,
+                max_retries=make_retry(DEFAULT_RETRIES if max_retries is None else max_retries),
+            )
+        else:
+            adapter = shared_adapter()
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def set_cookie_string(self, cookie_string: str, domain: str):
+        """把 "k1=v1; k2=v2" 形式的 Cookie 字符串逐项写入会话"""
+        for part in cookie_string.split(';'):
+            key, sep, value = part.strip().partition('=')
+            if sep:
+                self.cookies.set(key.strip(), value, domain=domain)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if not self.throttled:
+            return super().request(method, url, **kwargs)
+        throttle(url)
+        response = super().request(method, url, **kwargs)
+        # 流式下载不读取响应体，只按状态码判断
+        body = b'' if kwargs.get('stream') else response.content
+        report(url, is_rate_limited(response.status_code, body))
+        return response
+
+    def close(self):
+        """只关闭独占连接池；共享连接池随进程存在"""
+        if self._owns_adapter:
+            super().close()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取结果文件导入清单
+记录每个爬取结果文件（投稿数据 / 粉丝数）的写入与导入状态（路径、所属时段、大小、内容哈希、导入行数、导入时间），
+代替遍历 data/spider 目录树查找最新文件（find | sort | tail -1）和按文件内容判断是否已导入：
+查找最新文件走 (kind, data_slot) 索引，是否已导入为主键查询 + 一次 stat，都与历史文件数量无关。
+
+路径: spider/import_manifest.py
+
+状态:
+    written   爬虫已写出，尚未导入
+    imported  已导入（文件内容变化后视为未导入）
+
+用法:
+    python spider/import_manifest.py latest --kind fans_count --pending   # 最新且未导入的文件路径（没有时无输出）
+    python spider/import_manifest.py mark-imported data/spider/fans_count/2026/02/b_fans_count_2026-02-06-14.json --kind fans_count
+    python spider/import_manifest.py status data/spider/views/2026/02/06/2026-02-06-14_views_data_merged.ndjson
+    python spider/import_manifest.py pending --kind views
+    python spider/import_manifest.py scan --kind views          # 升级后登记已有文件（只需执行一次）
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MANIFEST_PATH = os.path.join(PROJECT_ROOT, 'data', 'spider', 'import_manifest.sqlite3')
+
+KIND_VIEWS = 'views'
+KIND_FANS = 'fans_count'
+
+STATUS_WRITTEN = 'written'
+STATUS_IMPORTED = 'imported'
+
+# 各类文件的目录与文件名格式（scan 登记已有文件用），第一个分组为所属日期，第二个为小时
+KIND_PATTERNS = {
+    KIND_VIEWS: (
+        os.path.join('data', 'spider', 'views'),
+        re.compile(r'^(\d{4}-\d{2}-\d{2})-(\d{2})_views_data(?:_[A-Za-z0-9]+)?\.(?:ndjson|json)$'),
+    ),
+    KIND_FANS: (
+        os.path.join('data', 'spider', 'fans_count'),
+        re.compile(r'^b_fans_count_(\d{4}-\d{2}-\d{2})-(\d{2})\.json$'),
+    ),
+}
+
+HASH_CHUNK_SIZE = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    data_slot TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    content_hash TEXT,
+    row_count INTEGER,
+    status TEXT NOT NULL DEFAULT 'written',
+    written_at TEXT,
+    imported_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_imported_files_kind_slot ON imported_files(kind, data_slot);
+CREATE INDEX IF NOT EXISTS idx_imported_files_kind_status ON imported_files(kind, status, data_slot);
+"""
+
+# 重新写出同一路径时，文件有变化则回到 written 状态
+REGISTER_SQL = """
+INSERT INTO imported_files (path, kind, data_slot, size, mtime_ns, status, written_at)
+VALUES (?, ?, ?, ?, ?, 'written', ?)
+ON CONFLICT(path) DO UPDATE SET
+    kind = excluded.kind,
+    data_slot = excluded.data_slot,
+    status = CASE WHEN size IS excluded.size AND mtime_ns IS excluded.mtime_ns THEN status ELSE 'written' END,
+    size = excluded.size,
+    mtime_ns = excluded.mtime_ns,
+    written_at = excluded.written_at
+"""
+
+MARK_IMPORTED_SQL = """
+INSERT INTO imported_files (
+    path, kind, data_slot, size, mtime_ns, content_hash, row_count, status, written_at, imported_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, 'imported', ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    kind = excluded.kind,
+    data_slot = excluded.data_slot,
+    size = excluded.size,
+    mtime_ns = excluded.mtime_ns,
+    content_hash = excluded.content_hash,
+    row_count = excluded.row_count,
+    status = 'imported',
+    imported_at = excluded.imported_at
+"""
+
+
+def manifest_key(path: str) -> str:
+    """清单中的路径：项目内文件存相对路径，cron 的绝对路径与爬虫的相对路径指向同一条记录"""
+    absolute = os.path.abspath(path)
+    if absolute.startswith(PROJECT_ROOT + os.sep):
+        return os.path.relpath(absolute, PROJECT_ROOT)
+    return absolute
+
+
+def file_hash(path: str) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def slot_from_path(path: str, kind: str) -> Optional[str]:
+    """从文件名取所属时段 'YYYY-MM-DD HH'，文件名不符合格式时返回 None"""
+    match = KIND_PATTERNS[kind][1].match(os.path.basename(path))
+    return f"{match.group(1)} {match.group(2)}" if match else None
+
+
+class ImportManifest:
+    """
+    导入清单
+
+    与运行台账一样每次写入/查询单独打开连接，调度进程的多个任务线程可以同时使用
+    """
+
+    def __init__(self, db_path: str = DEFAULT_MANIFEST_PATH):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def register(self, path: str, kind: str, data_slot: Optional[str] = None):
+        """
+        登记爬虫写出的文件（状态 written）
+
+        Args:
+            path: 文件路径
+            kind: 文件类型（views / fans_count）
+            data_slot: 所属时段 'YYYY-MM-DD HH'，为空时从文件名解析
+        """
+        stat = os.stat(path)
+        slot = data_slot or slot_from_path(path, kind) or self._now()[:13]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(REGISTER_SQL, (
+                    manifest_key(path), kind, slot, stat.st_size, stat.st_mtime_ns, self._now()
+                ))
+        finally:
+            conn.close()
+
+    def mark_imported(
+        self,
+        path: str,
+        kind: str,
+        row_count: Optional[int] = None,
+        data_slot: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ):
+        """
+        标记文件已导入（未登记的文件同时登记）
+
+        Args:
+            row_count: 导入的记录数
+            content_hash: 内容哈希，为空时计算
+        """
+        stat = os.stat(path)
+        slot = data_slot or slot_from_path(path, kind) or self._now()[:13]
+        now = self._now()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(MARK_IMPORTED_SQL, (
+                    manifest_key(path), kind, slot, stat.st_size, stat.st_mtime_ns,
+                    content_hash or file_hash(path), row_count, now, now
+                ))
+        finally:
+            conn.close()
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """按路径查询清单记录"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM imported_files WHERE path = ?', (manifest_key(path),)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def is_imported(self, path: str) -> bool:
+        """
+        文件是否已导入
+
+        大小与修改时间都未变时只需一次主键查询 + 一次 stat；大小相同而修改时间变化（复制、touch、
+        以相同内容重写）时比较内容哈希，内容未变则视为已导入并更新清单中的修改时间，下次不再计算哈希
+        """
+        entry = self.get(path)
+        if not entry or entry['status'] != STATUS_IMPORTED:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # 原文件已归档删除，以清单为准
+            return True
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if not entry['content_hash'] or file_hash(path) != entry['content_hash']:
+            return False
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('UPDATE imported_files SET mtime_ns = ? WHERE path = ?',
+                             (stat.st_mtime_ns, entry['path']))
+        finally:
+            conn.close()
+        return True
+
+    def latest(self, kind: str, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        所属时段最新的文件（同一时段有多个文件时取最后写出的）
+
+        Args:
+            kind: 文件类型
+            status: 只查询该状态的文件，为空时不限
+        """
+        sql = 'SELECT * FROM imported_files WHERE kind = ?'
+        params: List[Any] = [kind]
+        if status:
+            sql += ' AND status = ?'
+            params.append(status)
+        sql += ' ORDER BY data_slot DESC, written_at DESC LIMIT 1'
+        conn = self._connect()
+        try:
+            row = conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def pending(self, kind: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """已写出但未导入的文件（按时段升序）"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT * FROM imported_files WHERE kind = ? AND status = ? ORDER BY data_slot LIMIT ?',
+                (kind, STATUS_WRITTEN, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def scan(self, kind: str, root: Optional[str] = None) -> int:
+        """
+        遍历目录登记已有文件（升级后执行一次；已在清单中的文件保持原状态）
+
+        Returns:
+            int: 新登记的文件数
+        """
+        directory, pattern = KIND_PATTERNS[kind]
+        root = root or os.path.join(PROJECT_ROOT, directory)
+        rows = []
+        now = self._now()
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                match = pattern.match(name)
+                if not match:
+                    continue
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                rows.append((
+                    manifest_key(path), kind, f"{match.group(1)} {match.group(2)}",
+                    stat.st_size, stat.st_mtime_ns, now
+                ))
+        conn = self._connect()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    """INSERT OR IGNORE INTO imported_files (path, kind, data_slot, size, mtime_ns, status, written_at)
+                       VALUES (?, ?, ?, ?, ?, 'written', ?)""",
+                    rows
+                )
+                return conn.total_changes - before
+        finally:
+            conn.close()
+
+
+def file_imported(path: str, db_path: str = DEFAULT_MANIFEST_PATH) -> bool:
+    """文件是否已导入（清单不可用时返回 False，由调用方按原有方式判断）"""
+    try:
+        return ImportManifest(db_path).is_imported(path)
+    except sqlite3.Error as e:
+        print(f"⚠ 读取导入清单失败: {e}")
+        return False
+
+
+def register_file(path: str, kind: str, data_slot: Optional[str] = None, db_path: str = DEFAULT_MANIFEST_PATH):
+    """登记写出的文件（供各爬虫调用；清单写入失败只打印警告，不影响爬虫结果）"""
+    try:
+        ImportManifest(db_path).register(path, kind, data_slot)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠ 写入导入清单失败: {e}")
+
+
+def mark_file_imported(
+    path: str,
+    kind: str,
+    row_count: Optional[int] = None,
+    data_slot: Optional[str] = None,
+    db_path: str = DEFAULT_MANIFEST_PATH
+):
+    """标记文件已导入（清单写入失败只打印警告，下次导入时由会话表兜底判断）"""
+    try:
+        ImportManifest(db_path).mark_imported(path, kind, row_count, data_slot)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠ 写入导入清单失败: {e}")
+
+
+def _print_entry(entry: Dict[str, Any]):
+    rows = '-' if entry['row_count'] is None else entry['row_count']
+    print(f"{entry['data_slot']}  {entry['status']:<8}  {rows:>6}  {entry['imported_at'] or '-':<19}  {entry['path']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬取结果文件导入清单')
+    parser.add_argument('--db', default=DEFAULT_MANIFEST_PATH, help='清单数据库路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    latest = subparsers.add_parser('latest', help='输出所属时段最新的文件路径')
+    latest.add_argument('--kind', choices=sorted(KIND_PATTERNS), required=True)
+    latest.add_argument('--pending', action='store_true', help='最新文件已导入时不输出')
+
+    mark = subparsers.add_parser('mark-imported', help='标记文件已导入')
+    mark.add_argument('path')
+    mark.add_argument('--kind', choices=sorted(KIND_PATTERNS), required=True)
+    mark.add_argument('--rows', type=int, help='导入的记录数')
+
+    status = subparsers.add_parser('status', help='查看文件的清单记录')
+    status.add_argument('path')
+
+    pending = subparsers.add_parser('pending', help='已写出未导入的文件')
+    pending.add_argument('--kind', choices=sorted(KIND_PATTERNS), required=True)
+    pending.add_argument('--limit', type=int, default=100)
+
+    scan = subparsers.add_parser('scan', help='遍历目录登记已有文件')
+    scan.add_argument('--kind', choices=sorted(KIND_PATTERNS), required=True)
+    scan.add_argument('--root', help='目录（默认按类型取 data/spider 下的目录）')
+
+    args = parser.parse_args()
+    manifest = ImportManifest(args.db)
+
+    if args.command == 'latest':
+        entry = manifest.latest(args.kind)
+        if entry and not (args.pending and manifest.is_imported(os.path.join(PROJECT_ROOT, entry['path']))):
+            print(os.path.join(PROJECT_ROOT, entry['path']))
+    elif args.command == 'mark-imported':
+        manifest.mark_imported(args.path, args.kind, args.rows)
+    elif args.command == 'status':
+        entry = manifest.get(args.path)
+        if entry is None:
+            print("（未登记）")
+            return
+        _print_entry(entry)
+        print(f"已导入: {'是' if manifest.is_imported(args.path) else '否'}")
+    elif args.command == 'pending':
+        for entry in manifest.pending(args.kind, args.limit):
+            _print_entry(entry)
+    elif args.command == 'scan':
+        print(f"✓ 新登记 {manifest.scan(args.kind, args.root)} 个文件")
+
+
+if __name__ == '__main__':
+    main()
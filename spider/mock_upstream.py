@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟上游服务（B站 / 微博）
+在本机提供与线上接口同路径、同结构的响应，用于压测和联调爬虫，不访问生产接口。
+
+路径: spider/mock_upstream.py
+
+模拟的接口:
+    /x/web-interface/archive/stat             投稿统计（views_fetcher）
+    /x/relation/stat                          粉丝数（follower_sampler）
+    /x/polymer/web-dynamic/v1/feed/space      B站动态（crawl_moments）
+    /api/container/getIndex                   微博（crawl_moments）
+    /xlive/app-room/v1|v2/guardTab/topList    大航海（scrape_laplace_guards）
+
+录制的响应可放在 --fixtures 目录下，文件名为接口名（stat.json / relation.json / dynamics.json /
+weibo.json / guards_v1.json / guards_v2.json），存在时原样返回，否则按线上结构生成。
+
+压缩:
+    gzip           客户端声明 Accept-Encoding: gzip 时压缩响应体（与线上接口一致）
+
+限流模拟:
+    throttle_rps   每秒请求超过该值时触发限流（0 为不限）
+    throttle_mode  http412（HTTP 412）或 code352（HTTP 200 + code=-352）
+
+用法:
+    python spider/mock_upstream.py --port 8765 --latency-ms 80 --jitter-ms 40 --throttle-rps 20
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# 路径 -> 接口名
+ROUTES = {
+    '/x/web-interface/archive/stat': 'stat',
+    '/x/relation/stat': 'relation',
+    '/x/polymer/web-dynamic/v1/feed/space': 'dynamics',
+    '/api/container/getIndex': 'weibo',
+    '/xlive/app-room/v1/guardTab/topList': 'guards_v1',
+    '/xlive/app-room/v2/guardTab/topList': 'guards_v2',
+}
+
+# 大航海模拟总人数与每页人数
+GUARD_TOTAL = 300
+GUARD_PAGE_SIZE = 29
+
+
+def _stat_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    seed = sum(ord(c) for c in params.get('bvid', ''))
+    return {
+        'code': 0,
+        'message': '0',
+        'data': {
+            'bvid': params.get('bvid', ''),
+            'view': 10000 + seed * 7, 'danmaku': seed, 'reply': seed // 2, 'like': seed * 3,
+            'coin': seed, 'favorite': seed * 2, 'share': seed // 3,
+        },
+    }
+
+
+def _relation_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    mid = int(params.get('vmid', 0) or 0)
+    return {'code': 0, 'message': '0', 'data': {'mid': mid, 'follower': 1000000 + mid % 1000000}}
+
+
+def _dynamics_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    now = int(time.time())
+    items = []
+    for i in range(12):
+        items.append({
+            'id_str': str(900000000000000000 + i),
+            'modules': {
+                'module_author': {'pub_ts': now - i * 3600},
+                'module_dynamic': {
+                    'desc': {'text': f'模拟动态 {i}'},
+                    'major': {'draw': {'items': [{'src': f'https://i0.hdslb.com/bfs/mock/{i}.jpg'}]}},
+                },
+                'module_stat': {'like': {'count': i * 10}, 'comment': {'count': i}, 'forward': {'count': i // 2}},
+            },
+        })
+    return {'code': 0, 'message': '0', 'data': {'items': items, 'has_more': False}}
+
+
+def _weibo_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    page = int(params.get('since_id', 0) or 0)
+    cards = []
+    for i in range(10):
+        weibo_id = 5000000000000000 + page * 10 + i
+        cards.append({
+            'card_type': 9,
+            'mblog': {
+                'id': str(weibo_id),
+                'created_at': time.strftime('%a %b %d %H:%M:%S +0800 %Y'),
+                'text': f'模拟微博 <span>{weibo_id}</span>',
+                'pics': [{'large': {'url': f'https://wx1.sinaimg.cn/large/mock{weibo_id}.jpg'}}],
+                'attitudes_count': i, 'comments_count': i, 'reposts_count': i,
+            },
+        })
+    since_id = page + 1 if page < 9 else None
+    return {'ok': 1, 'data': {'cards': cards, 'cardlistInfo': {'since_id': since_id}}}
+
+
+def _guard_item(uid: int, level: int) -> Dict[str, Any]:
+    return {
+        'uid': uid, 'username': f'舰长{uid}', 'face': f'https://i0.hdslb.com/bfs/face/{uid}.jpg',
+        'guard_level': level, 'accompany': uid % 365,
+        'medal_info': {'medal_name': '咻咻', 'medal_level': 20 + uid % 20},
+    }
+
+
+def _guards_payload(params: Dict[str, str], version: str) -> Dict[str, Any]:
+    page = int(params.get('page', 1) or 1)
+    page_size = int(params.get('page_size', GUARD_PAGE_SIZE) or GUARD_PAGE_SIZE)
+    pages = (GUARD_TOTAL + page_size - 1) // page_size
+    start = (page - 1) * page_size
+    data = {
+        'info': {'num': GUARD_TOTAL, 'page': pages, 'now': page},
+        'list': [_guard_item(10000 + uid, 3) for uid in range(start, min(start + page_size, GUARD_TOTAL))],
+    }
+    if version == 'v1':
+        data['top3'] = [_guard_item(uid, 1) for uid in (1, 2, 3)]
+    return {'code': 0, 'message': '0', 'data': data}
+
+
+GENERATORS = {
+    'stat': _stat_payload,
+    'relation': _relation_payload,
+    'dynamics': _dynamics_payload,
+    'weibo': _weibo_payload,
+    'guards_v1': lambda params: _guards_payload(params, 'v1'),
+    'guards_v2': lambda params: _guards_payload(params, 'v2'),
+}
+
+
+class MockUpstreamServer:
+    """
+    模拟上游服务（后台线程运行）
+
+    用法:
+        with MockUpstreamServer(latency_ms=50, throttle_rps=10) as server:
+            url = server.url('/x/web-interface/archive/stat')
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        throttle_rps: float = 0.0,
+        throttle_mode: str = 'http412',
+        fixtures_dir: Optional[str] = None,
+        gzip: bool = False
+    ):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0 为随机端口
+            latency_ms: 每个响应的固定延迟（毫秒）
+            jitter_ms: 在固定延迟上叠加的随机延迟上限（毫秒）
+            throttle_rps: 最近 1 秒请求数超过该值时返回限流响应，0 为不限流
+            throttle_mode: http412 或 code352
+            fixtures_dir: 录制响应目录
+            gzip: 客户端接受 gzip 时压缩响应体
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rps = throttle_rps
+        self.throttle_mode = throttle_mode
+        self.fixtures = self._load_fixtures(fixtures_dir)
+        self.gzip = gzip
+        self.request_count = 0
+        self.throttled_count = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _load_fixtures(fixtures_dir: Optional[str]) -> Dict[str, Any]:
+        fixtures = {}
+        if not fixtures_dir:
+            return fixtures
+        for name in GENERATORS:
+            path = os.path.join(fixtures_dir, f'{name}.json')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    fixtures[name] = json.load(f)
+        return fixtures
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def _should_throttle(self) -> bool:
+        """记录一次请求，返回是否超过每秒请求阈值"""
+        with self._lock:
+            now = time.monotonic()
+            self.request_count += 1
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if self.throttle_rps and len(self._recent) > self.throttle_rps:
+                self.throttled_count += 1
+                return True
+            return False
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头与响应体分两次写出，关闭 Nagle 避免与客户端延迟 ACK 叠加出 40ms 额外延迟
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                name = ROUTES.get(parts.path)
+                if name is None:
+                    self._send(404, {'code': -404, 'message': 'not found'})
+                    return
+
+                delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+                if delay > 0:
+                    time.sleep(delay / 1000)
+
+                if server._should_throttle():
+                    if server.throttle_mode == 'code352':
+                        self._send(200, {'code': -352, 'message': '风控校验失败'})
+                    else:
+                        self._send(412, {'code': -412, 'message': '请求被拦截'})
+                    return
+
+                params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                payload = server.fixtures.get(name) or GENERATORS[name](params)
+                self._send(200, payload)
+
+            def _send(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                compress = server.gzip and 'gzip' in self.headers.get('Accept-Encoding', '')
+                if compress:
+                    body = gzip.compress(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                if compress:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'MockUpstreamServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 B站/微博 上游服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='固定响应延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help='随机附加延迟上限（毫秒）')
+    parser.add_argument('--throttle-rps', type=float, default=0.0, help='超过该每秒请求数时限流（0 为不限）')
+    parser.add_argument('--throttle-mode', choices=['http412', 'code352'], default='http412')
+    parser.add_argument('--fixtures', help='录制响应目录')
+    parser.add_argument('--gzip', action='store_true', help='客户端接受 gzip 时压缩响应体')
+    args = parser.parse_args()
+
+    server = MockUpstreamServer(
+        args.host, args.port, args.latency_ms, args.jitter_ms,
+        args.throttle_rps, args.throttle_mode, args.fixtures, args.gzip
+    )
+    print(f"模拟上游服务: {server.base_url}（Ctrl+C 退出）")
+    for path in ROUTES:
+        print(f"  {server.url(path)}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+动态图片并发下载管线
+MomentSaver 写入新动态时不再逐条同步调用 ImageService.download_and_generate_thumbnails：
+动态先以空 images 写入数据库（页面立即可见），图片交给本管线在线程池中并发下载并生成缩略图，
+完成后回填该动态的 images 字段。新动态集中出现时，图片下载不再串行阻塞 5 分钟一次的爬取。
+
+- 并发：线程池最多 max_workers 个动态同时下载；同一图片主机（hdslb.com / sinaimg.cn）最多 per_host 个动态同时下载，
+  避免触发图床限流。ImageService 按动态整体下载，限额以动态为单位：一条动态在下载期间占用其所有图片主机各一个名额
+- 去重：同一 (source, source_id) 在下载中时不会重复提交（常驻进程中下一轮爬取重新提交缺图动态时）
+- 回填：下载完成后在工作线程中按 (source, source_id) 更新 images，并关闭该线程的数据库连接
+- 失败：下载或回填失败只打印并计数，动态保留空 images（与原来下载失败时一致）
+- 进程内共享一个管线（get_pipeline）；单次运行的爬虫在退出前调用 wait() 等待回填完成，
+  常驻调度进程不等待，下载在后台继续
+
+需要已执行 django.setup()。
+
+路径: spider/moment_images.py
+
+用法:
+    pipeline = get_pipeline()
+    pipeline.submit('weibo', source_id, image_urls)    # 动态行已写入后提交
+    stats = pipeline.wait()                             # {'done': ..., 'failed': ..., 'pending': ...}
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.db import connection
+from moments.models import Moment
+from moments.services.image_service import ImageService
+
+# 同时下载的动态数、同一图片主机的并发上限
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+
+
+class MomentImagePipeline:
+    """动态图片下载管线（线程安全）"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, per_host: int = DEFAULT_PER_HOST):
+        self.per_host = per_host
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='moment-images')
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        # 下载中的 future -> (source, source_id)，以及正在下载的动态
+        self._pending: Dict[Future, Tuple[str, str]] = {}
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+        self.done_count = 0
+        self.failed_count = 0
+
+    def _host_slots_for(self, image_urls: List[str]) -> List[threading.BoundedSemaphore]:
+        """动态涉及的所有图片主机的名额（按主机名排序，多个线程按相同顺序获取，不会互相死锁）"""
+        hosts = sorted({urlsplit(url).hostname or '' for url in image_urls})
+        with self._lock:
+            for host in hosts:
+                if host not in self._host_slots:
+                    self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return [self._host_slots[host] for host in hosts]
+
+    def submit(self, source: str, source_id: str, image_urls: List[str]) -> Optional[Future]:
+        """提交一条动态的图片（动态行需已提交到数据库）；没有图片或该动态正在下载时返回 None"""
+        if not image_urls:
+            return None
+        key = (source, source_id)
+        with self._lock:
+            if key in self._inflight:
+                return None
+            self._inflight.add(key)
+            future = self._executor.submit(self._download, source, source_id, list(image_urls))
+            self._pending[future] = key
+        future.add_done_callback(self._finished)
+        return future
+
+    def _download(self, source: str, source_id: str, image_urls: List[str]) -> int:
+        try:
+            with ExitStack() as stack:
+                for slot in self._host_slots_for(image_urls):
+                    stack.enter_context(slot)
+                images = ImageService.download_and_generate_thumbnails(source, source_id, image_urls)
+            return Moment.objects.filter(source=source, source_id=source_id).update(images=images)
+        finally:
+            # 工作线程的数据库连接不会被请求周期清理，用完即关
+            connection.close()
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._inflight.discard(self._pending.pop(future))
+            if future.exception() is None:
+                self.done_count += 1
+                return
+            self.failed_count += 1
+        print(f"  图片下载失败: {future.exception()}")
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """等待已提交的下载完成（timeout 秒后不再等待），返回累计统计"""
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            wait_futures(pending, timeout=timeout)
+        return self.stats()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'done': self.done_count, 'failed': self.failed_count, 'pending': len(self._pending)}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_pipeline: Optional[MomentImagePipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> MomentImagePipeline:
+    """进程内共享的图片下载管线（首次调用时创建）"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = MomentImagePipeline()
+        return _pipeline
+
+
+def wait_for_images(timeout: Optional[float] = None) -> Optional[Dict[str, int]]:
+    """单次运行的爬虫退出前等待图片回填并打印统计（本进程没有提交过下载时直接返回 None）"""
+    if _pipeline is None:
+        return None
+    stats = _pipeline.wait(timeout)
+    print(f"图片回填: 完成 {stats['done']}，失败 {stats['failed']}，未完成 {stats['pending']}")
+    return stats
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+动态批量保存器（crawl_moments / crawl_bilibili_dynamics / crawl_weibo_dynamics 共用）
+代替每条动态一次 Moment.objects.filter(...).exists() 加一次 Moment.objects.create 的逐条写入：
+--full 回填微博 500 页时数据库往返从数千次降到 每 BATCH_SIZE 条一次 IN 查询 + 一次批量插入。
+
+- 去重：每批动态用一次 source_id__in 查询取出已存在的 source_id；同一批内重复的 source_id 只保留第一条
+- 图片：新动态先以空 images 写入，写入提交后把图片（每篇最多 MAX_IMAGES 张）交给下载管线（moment_images）
+  并发下载，完成后回填 images；下载期间不持有数据库事务，也不阻塞本次爬取。
+  已存在但 images 仍为空、本次抓取带图片的动态（上次进程在回填前退出或下载失败）重新提交下载
+- 写入：所有新动态在一个事务内 bulk_create(ignore_conflicts=True)，按 BATCH_SIZE 分块提交给数据库；
+  与其他进程并发写入同一条动态时由唯一约束忽略冲突，不再逐条捕获 IntegrityError
+
+需要已执行 django.setup()。
+
+路径: spider/moment_saver.py
+
+用法:
+    from moment_saver import MomentSaver
+    saved, skipped = MomentSaver.save_dynamics('weibo', dynamics)
+"""
+
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from moments.models import Moment
+
+from moment_images import get_pipeline
+
+# 每批去重查询与批量插入的动态数
+BATCH_SIZE = 200
+
+# 每篇动态最多下载的图片数
+MAX_IMAGES = 4
+
+
+def chunked(items, size):
+    """按 size 切分列表"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class MomentSaver:
+    """动态保存器 - 批量去重 + 批量写入 DB + 提交图片下载"""
+
+    @staticmethod
+    def _publish_time(value):
+        if isinstance(value, datetime):
+            pub_time = value
+        else:
+            pub_time = datetime.fromisoformat(str(value))
+        if timezone.is_naive(pub_time):
+            pub_time = timezone.make_aware(pub_time)
+        return pub_time
+
+    @classmethod
+    def _build_moment(cls, source, dyn, images):
+        return Moment(
+            source=source,
+            source_id=dyn['source_id'],
+            content=dyn.get('content', ''),
+            images=images,
+            publish_time=cls._publish_time(dyn['publish_time']),
+            like_count=dyn.get('like_count', 0),
+            comment_count=dyn.get('comment_count', 0),
+            share_count=dyn.get('share_count', 0),
+            source_url=dyn.get('source_url', ''),
+            video_bvid=dyn.get('video_bvid', ''),
+            video_url=dyn.get('video_url', ''),
+        )
+
+    @classmethod
+    def _split_dynamics(cls, source, dynamics, batch_size=BATCH_SIZE):
+        """
+        按数据库现状拆分动态（每批一次 IN 查询）
+
+        Returns:
+            tuple: (新动态, 已存在但 images 为空且本次带图片的动态)；保持原顺序，同一 source_id 只保留第一条
+        """
+        fresh, missing_images = [], []
+        seen = set()
+        for batch in chunked(dynamics, batch_size):
+            existing = dict(
+                Moment.objects.filter(
+                    source=source,
+                    source_id__in=[dyn['source_id'] for dyn in batch],
+                ).values_list('source_id', 'images')
+            )
+            for dyn in batch:
+                source_id = dyn['source_id']
+                if source_id in seen:
+                    continue
+                seen.add(source_id)
+                if source_id not in existing:
+                    fresh.append(dyn)
+                elif not existing[source_id] and dyn.get('image_urls'):
+                    missing_images.append(dyn)
+        return fresh, missing_images
+
+    @classmethod
+    def new_dynamics(cls, source, dynamics, batch_size=BATCH_SIZE):
+        """
+        过滤出数据库中不存在的动态（每批一次 IN 查询）
+
+        Returns:
+            list: 新动态（保持原顺序，同一 source_id 只保留第一条）
+        """
+        return cls._split_dynamics(source, dynamics, batch_size)[0]
+
+    @classmethod
+    def save_dynamics(cls, source, dynamics, batch_size=BATCH_SIZE, pipeline=None):
+        """
+        保存动态列表，去重后立即写入，图片（每篇最多4张）交给下载管线异步下载并回填；
+        已存在但还没有图片的动态重新提交下载
+
+        Args:
+            pipeline: 图片下载管线，为空时使用进程内共享的管线
+
+        Returns:
+            tuple: (新写入条数, 跳过条数)；并发写入被唯一约束忽略的动态也计入新写入
+        """
+        dynamics = list(dynamics)
+        fresh, with_images = cls._split_dynamics(source, dynamics, batch_size)
+        skipped = len(dynamics) - len(fresh)
+        if with_images:
+            print(f"  重新下载图片 [{source}]: {len(with_images)} 条已入库动态缺少图片")
+
+        moments = []
+        for dyn in fresh:
+            try:
+                moments.append(cls._build_moment(source, dyn, []))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"  保存动态失败 [{source}]: {e}")
+                continue
+            if dyn.get('image_urls'):
+                with_images.append(dyn)
+
+        if moments:
+            with transaction.atomic():
+                Moment.objects.bulk_create(moments, batch_size=batch_size, ignore_conflicts=True)
+
+        # 动态行已提交，下载完成后按 source_id 回填 images
+        if with_images:
+            pipeline = pipeline or get_pipeline()
+            for dyn in with_images:
+                pipeline.submit(source, dyn['source_id'], dyn['image_urls'][:MAX_IMAGES])
+        return len(moments), skipped
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫请求限速工具
+使用令牌桶代替每次请求后的随机 sleep，为同一上游提供全局的每秒请求预算；
+按上游主机注册共享限速器，同一进程内所有爬虫任务共用同一份预算
+
+自适应限速（AIMD）：响应正常时速率线性上升，遇到 HTTP 412 或风控返回码（-412/-352/-799）时速率减半，
+学到的速率保存在 data/spider/rate_state.json，下次运行（含单次运行的脚本）从该速率开始
+
+路径: spider/rate_control.py
+
+用法:
+    python spider/rate_control.py            # 查看各主机学到的速率
+    python spider/rate_control.py --reset    # 清除学习记录，下次从初始速率开始
+"""
+
+import argparse
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATE_PATH = os.path.join(PROJECT_ROOT, 'data', 'spider', 'rate_state.json')
+
+# 各上游主机的自适应限速参数：(初始, 下限, 上限) 每秒请求数
+ADAPTIVE_HOST_RATES: Dict[str, Tuple[float, float, float]] = {
+    'api.bilibili.com': (4.0, 0.5, 12.0),
+    'api.live.bilibili.com': (2.0, 0.5, 6.0),
+    'm.weibo.cn': (1.0, 0.2, 3.0),
+    'weibo.com': (1.0, 0.2, 3.0),
+}
+
+# AIMD 参数：满速运行时每秒约加 AIMD_INCREASE 次/秒；限流时乘以 AIMD_DECREASE；
+# AIMD_COOLDOWN 秒内的多次限流只降一次（在途请求的限流响应来自同一次超速）
+AIMD_INCREASE = 0.1
+AIMD_DECREASE = 0.5
+AIMD_COOLDOWN = 5.0
+
+# 限流信号：HTTP 状态码与 B站风控返回码（412 请求被拦截，-352 风控校验失败，-799 请求过于频繁）
+RATE_LIMIT_STATUS = {412, 429}
+RATE_LIMIT_CODES = {-412, -352, -799}
+
+# B站接口响应以 {"code":N 开头，只看响应体开头判断风控返回码，不解析整个 JSON
+_CODE_PREFIX_RE = re.compile(rb'^\s*\{\s*"code"\s*:\s*(-?\d+)')
+
+
+class TokenBucket:
+    """
+    令牌桶限速器（线程安全）
+
+    rate 为每秒补充的令牌数（即稳定状态下的每秒请求数），
+    burst 为桶容量，允许短时间内的突发请求。
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"rate 必须大于 0: {rate}")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst is not None else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def reserve(self) -> float:
+        """
+        预占一个令牌，返回调用方需要等待的秒数（不阻塞）
+
+        asyncio 代码使用 `await asyncio.sleep(bucket.reserve())`，
+        线程代码直接调用 acquire()。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def wait_time(self) -> float:
+        """现在预占一个令牌需要等待的秒数（只查看，不预占）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1.0 - self._tokens) / self.rate)
+
+    def record_success(self):
+        """正常响应的反馈（固定速率的令牌桶忽略）"""
+
+    def record_throttled(self) -> bool:
+        """限流响应的反馈（固定速率的令牌桶忽略），返回是否降低了速率"""
+        return False
+
+    def acquire(self) -> float:
+        """
+        阻塞直到获得一个令牌
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    AIMD 自适应令牌桶（线程安全）
+
+    每次正常响应速率加 increase / rate（满速运行时约每秒加 increase），不超过 max_rate；
+    触发限流时速率乘以 decrease，不低于 min_rate，并清空桶中的令牌，cooldown 秒内不重复降速。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: float = 1.0,
+        increase: float = AIMD_INCREASE,
+        decrease: float = AIMD_DECREASE,
+        cooldown: float = AIMD_COOLDOWN
+    ):
+        if not 0 < min_rate <= max_rate:
+            raise ValueError(f"速率范围无效: {min_rate} - {max_rate}")
+        super().__init__(min(max(rate, min_rate), max_rate), burst)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.changed = False
+        self._last_decrease = -math.inf
+
+    def record_success(self):
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self.changed = True
+
+    def cap(self, max_rate: float):
+        """把速率上限降到 max_rate（如命令行显式指定的预算）；当前速率超过时立即降低，不改变学习记录"""
+        with self._lock:
+            self.max_rate = min(self.max_rate, float(max_rate))
+            self.min_rate = min(self.min_rate, self.max_rate)
+            if self.rate > self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = self.max_rate
+
+    def record_throttled(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return False
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            self._last_decrease = now
+            self.changed = True
+            return True
+
+
+# 按上游主机共享的限速器（常驻调度进程与各爬虫入口通过 enable_adaptive_rates 注册；未注册的主机 throttle 不做限制）
+_host_limiters: Dict[str, TokenBucket] = {}
+_host_limiters_lock = threading.Lock()
+
+
+def register_host_limiter(host: str, rate: float, burst: Optional[float] = None) -> TokenBucket:
+    """
+    为上游主机注册进程内共享的令牌桶，已注册时返回已有的令牌桶
+
+    Args:
+        host: 主机名（如 api.bilibili.com）
+        rate: 每秒请求数
+        burst: 桶容量
+
+    Returns:
+        TokenBucket: 该主机的共享令牌桶
+    """
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = TokenBucket(rate, burst)
+        return _host_limiters[host]
+
+
+def get_host_limiter(host: str) -> Optional[TokenBucket]:
+    """返回主机的共享令牌桶，未注册时返回 None"""
+    return _host_limiters.get(host)
+
+
+def throttle(url: str) -> float:
+    """
+    请求前调用：URL 所在主机注册了共享令牌桶时阻塞等待令牌
+
+    Returns:
+        float: 实际等待的秒数
+    """
+    limiter = get_host_limiter(urlsplit(url).hostname or '')
+    return limiter.acquire() if limiter else 0.0
+
+
+def is_rate_limited(status_code: int, content: bytes = b'') -> bool:
+    """响应是否为限流：HTTP 412/429，或响应体开头的 B站返回码属于风控返回码"""
+    if status_code in RATE_LIMIT_STATUS:
+        return True
+    match = _CODE_PREFIX_RE.match(content[:64])
+    return bool(match) and int(match.group(1)) in RATE_LIMIT_CODES
+
+
+def report(url: str, rate_limited: bool) -> bool:
+    """
+    请求完成后调用：把响应结果反馈给 URL 所在主机的限速器
+
+    Returns:
+        bool: 是否因本次限流降低了速率
+    """
+    limiter = get_host_limiter(urlsplit(url).hostname or '')
+    if limiter is None:
+        return False
+    if rate_limited:
+        return limiter.record_throttled()
+    limiter.record_success()
+    return False
+
+
+def load_rate_state(path: str = DEFAULT_STATE_PATH) -> Dict[str, Dict[str, Any]]:
+    """读取学到的速率 {主机: {'rate', 'updated_at'}}，文件不存在或损坏时返回空字典"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+_state_path = DEFAULT_STATE_PATH
+
+
+def save_rate_state(path: Optional[str] = None) -> int:
+    """
+    保存速率有变化的自适应限速器（与文件中其他主机的记录合并，原子替换）；写入失败时不抛出
+
+    Returns:
+        int: 写入的主机数
+    """
+    path = path or _state_path
+    with _host_limiters_lock:
+        changed = {
+            host: limiter for host, limiter in _host_limiters.items()
+            if isinstance(limiter, AdaptiveRateLimiter) and limiter.changed
+        }
+    if not changed:
+        return 0
+
+    state = load_rate_state(path)
+    now = datetime.now().isoformat(timespec='seconds')
+    for host, limiter in changed.items():
+        state[host] = {'rate': round(limiter.rate, 3), 'updated_at': now}
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        return 0
+    for limiter in changed.values():
+        limiter.changed = False
+    return len(changed)
+
+
+_atexit_registered = False
+
+
+def enable_adaptive_rates(
+    initial_rates: Optional[Dict[str, float]] = None,
+    state_path: Optional[str] = None,
+    max_rates: Optional[Dict[str, float]] = None
+) -> Dict[str, TokenBucket]:
+    """
+    为 ADAPTIVE_HOST_RATES 中的主机注册自适应限速器（已注册的主机沿用原限速器），进程退出时保存学到的速率
+
+    速率优先取上次运行学到的值，没有记录时取 initial_rates 中的值或默认初始速率；
+    max_rates 中的主机无论学到多少都不超过给定上限（已注册的限速器同样降低上限）。
+
+    Args:
+        initial_rates: 覆盖默认初始速率 {主机: 每秒请求数}
+        state_path: 速率记录文件（默认 data/spider/rate_state.json）
+        max_rates: 速率上限 {主机: 每秒请求数}，如命令行显式指定的 --rps
+
+    Returns:
+        dict: {主机: 限速器}
+    """
+    global _state_path, _atexit_registered
+    if state_path:
+        _state_path = state_path
+    state = load_rate_state(_state_path)
+    initial_rates = initial_rates or {}
+    max_rates = max_rates or {}
+
+    limiters = {}
+    with _host_limiters_lock:
+        for host, (default_rate, min_rate, max_rate) in ADAPTIVE_HOST_RATES.items():
+            if host not in _host_limiters:
+                learned = state.get(host, {}).get('rate')
+                rate = learned if isinstance(learned, (int, float)) and learned > 0 else initial_rates.get(host, default_rate)
+                _host_limiters[host] = AdaptiveRateLimiter(rate, min_rate, max_rate)
+            limiter = limiters[host] = _host_limiters[host]
+            if host in max_rates and isinstance(limiter, AdaptiveRateLimiter):
+                limiter.cap(max_rates[host])
+        if not _atexit_registered:
+            atexit.register(save_rate_state)
+            _atexit_registered = True
+    return limiters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫自适应限速记录')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help='速率记录文件')
+    parser.add_argument('--reset', action='store_true', help='清除学习记录')
+    args = parser.parse_args()
+
+    if args.reset:
+        if os.path.exists(args.state):
+            os.remove(args.state)
+        print("✓ 已清除学习记录")
+        return
+
+    state = load_rate_state(args.state)
+    for host, (default_rate, min_rate, max_rate) in ADAPTIVE_HOST_RATES.items():
+        entry = state.get(host)
+        learned = f"{entry['rate']:>6.2f} 次/秒（{entry['updated_at']}）" if entry else '   无记录'
+        print(f"{host:<24} 学到 {learned}  初始 {default_rate}  范围 {min_rate}-{max_rate}")
+
+
+if __name__ == '__main__':
+    main()
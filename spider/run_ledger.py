@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫运行台账
+每次运行追加一行到 SQLite（logs/crawl_runs.sqlite3），代替 cron 脚本用 jq 整体重写的 logs/*.json 数组：
+写入只有一次 INSERT，与历史运行次数无关；分层爬取的各分层计数单独成表，便于按分层查询。
+
+路径: spider/run_ledger.py
+
+用法:
+    python spider/run_ledger.py recent                       # 最近 20 次运行
+    python spider/run_ledger.py recent --job fans_count --limit 50
+    python spider/run_ledger.py failures --days 3            # 最近 3 天的失败记录
+    python spider/run_ledger.py durations --days 7           # 各任务耗时统计
+    python spider/run_ledger.py tiers --limit 24             # 分层爬取最近 24 次的各分层计数
+    python spider/run_ledger.py record --job fans_ingest --status failed --message "导入失败"
+    python spider/run_ledger.py import-json logs/bilibili_fans_count.json --job fans_count
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LEDGER_PATH = os.path.join(PROJECT_ROOT, 'logs', 'crawl_runs.sqlite3')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 分层计数字段（与 crawl_metrics.FETCH_COUNTERS 对应）
+TIER_COUNTERS = (
+    'total_count', 'success_count', 'fail_count', 'request_count',
+    'retry_count', 'rate_limited_count', 'bytes_downloaded',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    duration_seconds REAL,
+    success INTEGER NOT NULL,
+    error_message TEXT,
+    summary TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_runs_job_time ON crawl_runs(job, start_time);
+CREATE INDEX IF NOT EXISTS idx_crawl_runs_time ON crawl_runs(start_time);
+
+CREATE TABLE IF NOT EXISTS crawl_run_tiers (
+    run_id INTEGER NOT NULL,
+    tier TEXT NOT NULL,
+    total_count INTEGER DEFAULT 0,
+    success_count INTEGER DEFAULT 0,
+    fail_count INTEGER DEFAULT 0,
+    request_count INTEGER DEFAULT 0,
+    retry_count INTEGER DEFAULT 0,
+    rate_limited_count INTEGER DEFAULT 0,
+    bytes_downloaded INTEGER DEFAULT 0,
+    crawl_seconds REAL DEFAULT 0,
+    PRIMARY KEY (run_id, tier)
+);
+"""
+
+
+def _format_time(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    return str(value)
+
+
+class RunLedger:
+    """
+    运行台账（追加写入）
+
+    每次写入/查询单独打开连接，常驻调度进程的多个任务线程可以同时写入
+    """
+
+    def __init__(self, db_path: str = DEFAULT_LEDGER_PATH):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record(
+        self,
+        job: str,
+        start_time,
+        end_time,
+        success: bool,
+        error_message: Optional[str] = None,
+        summary: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        tiers: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> int:
+        """
+        追加一次运行记录
+
+        Args:
+            job: 任务名（tiered_views / fans_count / moments / guards ...）
+            start_time: 开始时间（datetime 或 'YYYY-MM-DD HH:MM:SS'）
+            end_time: 结束时间
+            success: 是否成功
+            error_message: 失败原因
+            summary: 一句话摘要
+            details: 附加信息，以 JSON 保存
+            tiers: 各分层计数 {tier: {success_count: ..., ...}}（crawl_metrics 的 tiers）
+
+        Returns:
+            int: 运行记录 ID
+        """
+        start_str, end_str = _format_time(start_time), _format_time(end_time)
+        try:
+            duration = (datetime.strptime(end_str, TIME_FORMAT) - datetime.strptime(start_str, TIME_FORMAT)).total_seconds()
+        except ValueError:
+            duration = None
+
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    """INSERT INTO crawl_runs
+                       (job, start_time, end_time, duration_seconds, success, error_message, summary, details)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        job, start_str, end_str, duration, int(bool(success)), error_message or None, summary or None,
+                        json.dumps(details, ensure_ascii=False, default=str) if details else None,
+                    )
+                )
+                run_id = cursor.lastrowid
+                for tier, stats in (tiers or {}).items():
+                    conn.execute(
+                        f"""INSERT INTO crawl_run_tiers (run_id, tier, {', '.join(TIER_COUNTERS)}, crawl_seconds)
+                            VALUES (?, ?, {', '.join('?' for _ in TIER_COUNTERS)}, ?)""",
+                        (run_id, tier, *(stats.get(key, 0) or 0 for key in TIER_COUNTERS),
+                         stats.get('crawl_seconds', 0) or 0)
+                    )
+            return run_id
+        finally:
+            conn.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def recent(self, job: Optional[str] = None, limit: int = 20, failures_only: bool = False,
+               since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """最近的运行记录（新的在前）"""
+        conditions, params = [], []
+        if job:
+            conditions.append("job = ?")
+            params.append(job)
+        if failures_only:
+            conditions.append("success = 0")
+        if since:
+            conditions.append("start_time >= ?")
+            params.append(_format_time(since))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(
+            f"""SELECT id, job, start_time, end_time, duration_seconds, success, error_message, summary
+                FROM crawl_runs {where} ORDER BY start_time DESC, id DESC LIMIT ?""",
+            (*params, limit)
+        )
+
+    def duration_stats(self, since: datetime, job: Optional[str] = None) -> List[Dict[str, Any]]:
+        """各任务运行次数、失败次数与耗时统计"""
+        params: List[Any] = [_format_time(since)]
+        job_filter = ""
+        if job:
+            job_filter = "AND job = ?"
+            params.append(job)
+        return self._query(
+            f"""SELECT job, COUNT(*) AS runs, SUM(success = 0) AS failures,
+                       ROUND(AVG(duration_seconds), 1) AS avg_seconds,
+                       ROUND(MAX(duration_seconds), 1) AS max_seconds,
+                       MAX(start_time) AS last_run
+                FROM crawl_runs WHERE start_time >= ? {job_filter}
+                GROUP BY job ORDER BY job""",
+            tuple(params)
+        )
+
+    def tier_counts(self, job: str = 'tiered_views', limit: int = 24) -> List[Dict[str, Any]]:
+        """分层爬取最近若干次运行的各分层计数"""
+        return self._query(
+            f"""SELECT r.id, r.start_time, r.success, t.tier, {', '.join('t.' + key for key in TIER_COUNTERS)},
+                       t.crawl_seconds
+                FROM (SELECT id, start_time, success FROM crawl_runs WHERE job = ?
+                      ORDER BY start_time DESC, id DESC LIMIT ?) r
+                JOIN crawl_run_tiers t ON t.run_id = r.id
+                ORDER BY r.start_time DESC, r.id DESC, t.tier""",
+            (job, limit)
+        )
+
+
+def record_run(
+    job: str,
+    start_time,
+    success: bool,
+    error_message: Optional[str] = None,
+    summary: Optional[str] = None,
+    details: Optional[Dict[str, Any]] = None,
+    tiers: Optional[Dict[str, Dict[str, Any]]] = None,
+    db_path: str = DEFAULT_LEDGER_PATH
+) -> Optional[int]:
+    """
+    记录一次运行（供各爬虫入口调用）
+
+    台账写入失败只打印警告，不影响爬虫本身的结果与退出码
+    """
+    try:
+        return RunLedger(db_path).record(
+            job, start_time, datetime.now(), success, error_message, summary, details, tiers
+        )
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠ 写入运行台账失败: {e}")
+        return None
+
+
+def import_json_log(ledger: RunLedger, path: str, job: str) -> int:
+    """导入旧版 cron 脚本的 JSON 数组日志"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    for entry in entries:
+        ledger.record(
+            job,
+            entry.get('start_time', ''),
+            entry.get('end_time', ''),
+            entry.get('status') == 'success',
+            entry.get('error_message'),
+            (entry.get('summary') or '').strip(),
+            {key: entry[key] for key in ('exit_code', 'current_hour', 'is_cold_hour') if key in entry},
+        )
+    return len(entries)
+
+
+def _print_rows(rows: List[Dict[str, Any]], columns: List[str]):
+    if not rows:
+        print("（无记录）")
+        return
+    widths = {col: max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(str(row.get(col, '') if row.get(col) is not None else '').ljust(widths[col]) for col in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫运行台账查询')
+    parser.add_argument('--db', default=DEFAULT_LEDGER_PATH, help='台账数据库路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    recent = subparsers.add_parser('recent', help='最近的运行记录')
+    recent.add_argument('--job')
+    recent.add_argument('--limit', type=int, default=20)
+
+    failures = subparsers.add_parser('failures', help='失败记录')
+    failures.add_argument('--job')
+    failures.add_argument('--days', type=int, default=7)
+    failures.add_argument('--limit', type=int, default=50)
+
+    durations = subparsers.add_parser('durations', help='各任务耗时统计')
+    durations.add_argument('--job')
+    durations.add_argument('--days', type=int, default=7)
+
+    tiers = subparsers.add_parser('tiers', help='分层爬取的各分层计数')
+    tiers.add_argument('--job', default='tiered_views')
+    tiers.add_argument('--limit', type=int, default=24)
+
+    record = subparsers.add_parser('record', help='追加一条运行记录（供 shell 脚本调用）')
+    record.add_argument('--job', required=True)
+    record.add_argument('--status', choices=['success', 'failed'], required=True)
+    record.add_argument('--start-time', help="开始时间 'YYYY-MM-DD HH:MM:SS'，默认当前时间")
+    record.add_argument('--message', help='失败原因')
+    record.add_argument('--summary')
+
+    import_json = subparsers.add_parser('import-json', help='导入旧版 logs/*.json 数组日志')
+    import_json.add_argument('path')
+    import_json.add_argument('--job', required=True)
+
+    args = parser.parse_args()
+    ledger = RunLedger(args.db)
+    row_columns = ['id', 'job', 'start_time', 'duration_seconds', 'success', 'error_message']
+
+    if args.command == 'recent':
+        _print_rows(ledger.recent(args.job, args.limit), row_columns)
+    elif args.command == 'failures':
+        since = datetime.now() - timedelta(days=args.days)
+        _print_rows(ledger.recent(args.job, args.limit, failures_only=True, since=since), row_columns)
+    elif args.command == 'durations':
+        since = datetime.now() - timedelta(days=args.days)
+        _print_rows(ledger.duration_stats(since, args.job),
+                    ['job', 'runs', 'failures', 'avg_seconds', 'max_seconds', 'last_run'])
+    elif args.command == 'tiers':
+        _print_rows(ledger.tier_counts(args.job, args.limit),
+                    ['id', 'start_time', 'tier', 'success_count', 'fail_count', 'request_count',
+                     'retry_count', 'rate_limited_count', 'crawl_seconds'])
+    elif args.command == 'record':
+        now = datetime.now()
+        run_id = ledger.record(
+            args.job, args.start_time or now, now, args.status == 'success', args.message, args.summary
+        )
+        print(f"✓ 已记录运行 #{run_id}")
+    elif args.command == 'import-json':
+        count = import_json_log(ledger, args.path, args.job)
+        print(f"✓ 已导入 {count} 条记录: {args.path}")
+
+
+if __name__ == '__main__':
+    main()
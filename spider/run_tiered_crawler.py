@@ -13,15 +13,21 @@
     python spider/run_tiered_crawler.py --all              # 爬取全部数据
     python spider/run_tiered_crawler.py --scheduled        # 根据当前时间自动选择
     python spider/run_tiered_crawler.py --stats            # 显示分层统计
+    python spider/run_tiered_crawler.py --scheduled --async # 异步并发抓取（令牌桶限速）
+
+每次运行的阶段耗时与请求统计写入 logs/metrics/tiered_crawler.json（见 crawl_metrics），
+--prom-file 可同时输出 Prometheus textfile；运行结果与各分层计数追加到运行台账（见 run_ledger）
 """
 
 import argparse
+import json
 import sys
 import os
+import queue
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Iterable, Tuple, List
 
 # 项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -39,15 +45,45 @@ from django.utils import timezone
 
 # 导入分层导出模块
 from tools.spider.export_tiered import TieredViewsExporter, WorkTier, DEFAULT_HOT_DAYS
-from tools.spider.crawl_views import ViewsCrawler, VIEWS_FILE
-from tools.spider.import_views import ViewsImporter
-from tools.spider.utils.logger import setup_views_logger, get_project_root
+from tools.spider.utils.logger import setup_views_logger
+
+from crawl_metrics import CrawlMetrics, DEFAULT_METRICS_PATH
+from import_manifest import KIND_VIEWS, file_imported, mark_file_imported, register_file
+from cookie_pool import load_pool
+from rate_control import enable_adaptive_rates
+from run_ledger import record_run
+from views_fetcher import AsyncViewsFetcher, DEFAULT_CONCURRENCY, DEFAULT_RPS
+from views_tiering import (
+    DEFAULT_COLD_BUCKETS, current_bucket, iter_bucket_works, load_tier_works
+)
+from views_velocity import iter_due_works
+from views_records import (
+    CHECKPOINT_SUFFIX, CrawlCheckpoint, NdjsonWriter, NDJSON_SUFFIX, SUMMARY_COUNTERS, iter_records,
+    merge_ndjson, read_summary, views_output_path
+)
+from views_store import MetricsStore
 
 logger = setup_views_logger("run_tiered_crawler")
 
 # 冷数据爬取时段（24小时制）
 COLD_CRAWL_HOURS = [0, 8, 16]  # 00:00, 08:00, 16:00
 
+# 流水线模式：队列容量、每批入库条数、队列空闲多久提交一次已到达的记录
+PIPELINE_QUEUE_SIZE = 1000
+PIPELINE_BATCH_SIZE = 200
+PIPELINE_FLUSH_SECONDS = 2.0
+PIPELINE_DONE = "done"
+
+# 运行指标输出路径（命令行 --metrics-file / --prom-file 可覆盖）
+METRICS_PATH = DEFAULT_METRICS_PATH
+METRICS_PROM_PATH: Optional[str] = None
+
+# 变化存储：计数未变化的采样不写入 work_metrics（命令行 --delta 开启，见 views_store）
+METRICS_DELTA = False
+
+# 同步模式的令牌桶速率：节奏由请求后的随机延迟决定，令牌桶不构成额外限制
+SYNC_MODE_RPS = 100.0
+
 # 线程锁，用于日志同步
 log_lock = threading.Lock()
 
@@ -69,12 +105,93 @@ def should_crawl_cold_now() -> bool:
     return current_hour in COLD_CRAWL_HOURS
 
 
+def _build_fetcher(
+    tier: WorkTier,
+    max_retries: int,
+    async_mode: bool,
+    concurrency: int,
+    rps: float,
+    request_delay_min: float,
+    request_delay_max: float
+) -> AsyncViewsFetcher:
+    """
+    创建分层抓取器
+    
+    同步模式等价于单并发 + 每次请求后随机延迟；作品记录在内存中直接交给抓取器，
+    各分层使用各自的抓取器实例，不再替换 crawl_views.VIEWS_FILE 全局变量
+    """
+    if async_mode:
+        with log_lock:
+            logger.info(f"异步抓取模式: 并发 {concurrency}, 限速 {rps} 次/秒")
+        return AsyncViewsFetcher(
+            concurrency=concurrency,
+            rps=rps,
+            max_retries=max_retries,
+            tier=tier.value,
+            logger=logger
+        )
+    return AsyncViewsFetcher(
+        concurrency=1,
+        rps=SYNC_MODE_RPS,
+        max_retries=max_retries,
+        tier=tier.value,
+        logger=logger,
+        request_delay_min=request_delay_min,
+        request_delay_max=request_delay_max
+    )
+
+
+def _tier_checkpoint(tier: WorkTier, date_str: str, hour_str: str) -> CrawlCheckpoint:
+    """
+    分层爬取断点（与分层结果文件同目录）
+    
+    断点按小时区分：同一小时内重启会跳过已完成的作品，进入下一小时则重新完整爬取
+    """
+    return CrawlCheckpoint(views_output_path(date_str, hour_str, tier.value) + CHECKPOINT_SUFFIX)
+
+
+def _tier_works(
+    tier: WorkTier,
+    adaptive: bool = False,
+    rolling_buckets: int = 0
+) -> Tuple[int, Iterable[Dict[str, Any]]]:
+    """
+    返回分层待爬取作品数与作品记录
+    
+    普通模式载入整个分层（values() 字典）；自适应模式只取本小时到期的作品，
+    滚动模式只取冷数据中本小时轮到的桶。
+    记录都在进入抓取引擎的事件循环之前载入列表：Django 的数据库访问不能在协程中进行
+    """
+    if adaptive:
+        levels: Dict[str, int] = {}
+        works = list(iter_due_works(tier, stats=levels))
+        with log_lock:
+            logger.info(f"{tier.value.upper()}作品增速分级: {levels}，本小时到期 {len(works)} 条")
+        return len(works), works
+    
+    if rolling_buckets > 0 and tier == WorkTier.COLD:
+        bucket = current_bucket(datetime.now(), rolling_buckets)
+        works = list(iter_bucket_works(tier, rolling_buckets))
+        with log_lock:
+            logger.info(f"冷数据滚动爬取: 第 {bucket + 1}/{rolling_buckets} 桶，{len(works)} 条")
+        return len(works), works
+    
+    works = load_tier_works(tier)
+    return len(works), works
+
+
 def export_and_crawl_tier(
     tier: WorkTier,
     force: bool = False,
     request_delay_min: float = 1.0,
     request_delay_max: float = 3.0,
-    max_retries: int = 2
+    max_retries: int = 2,
+    async_mode: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rps: float = DEFAULT_RPS,
+    adaptive: bool = False,
+    rolling_buckets: int = 0,
+    metrics: Optional[CrawlMetrics] = None
 ) -> Tuple[bool, Dict[str, Any], Optional[str]]:
     """
     执行指定分层的导出和爬取流程（不包含导入）
@@ -82,12 +199,21 @@ def export_and_crawl_tier(
     Args:
         tier: 分层类型 (HOT/COLD)
         force: 是否强制重新导入
-        request_delay_min: 最小请求延迟
-        request_delay_max: 最大请求延迟
+        request_delay_min: 最小请求延迟（仅同步模式）
+        request_delay_max: 最大请求延迟（仅同步模式）
         max_retries: 最大重试次数
+        async_mode: 是否使用异步并发抓取引擎
+        concurrency: 异步模式下的最大在途请求数
+        rps: 异步模式下的全局每秒请求预算
+        adaptive: 是否按播放增速只爬取本小时到期的作品（见 views_velocity）
+        rolling_buckets: 冷数据滚动分桶数，大于 0 时每小时只爬取轮到的一个桶
+        metrics: 运行指标，记录查询/爬取阶段耗时与请求统计
         
     Returns:
         Tuple[bool, dict, Optional[str]]: (是否成功, 执行信息, 输出文件路径)
+        
+    Note:
+        各分层的作品记录在内存中直接交给各自的抓取器，可安全地在多个线程中并行调用
     """
     result_info = {
         "tier": tier.value,
@@ -95,35 +221,29 @@ def export_and_crawl_tier(
         "steps": {}
     }
     output_path = None
+    metrics = metrics or CrawlMetrics()
     
     with log_lock:
         logger.info("=" * 60)
         logger.info(f"开始执行{tier.value.upper()}数据爬取流程")
         logger.info("=" * 60)
 
-    # 1. 导出数据
+    # 1. 统计待爬取作品（直接查询 WorkStatic，不再导出 views_hot.json / views_cold.json）
     with log_lock:
-        logger.info(f"\n[1/2] 导出{tier.value.upper()}数据...")
-    exporter = TieredViewsExporter()
+        logger.info(f"\n[1/2] 查询{tier.value.upper()}作品...")
     
-    if tier == WorkTier.HOT:
-        success, filepath, info = exporter.export_hot()
-    elif tier == WorkTier.COLD:
-        success, filepath, info = exporter.export_cold()
-    else:
-        success, filepath, info = exporter.export_all()
-    
-    if not success:
-        error_msg = info.get('error', '导出失败')
+    try:
+        with metrics.stage("export", tier.value):
+            export_count, works = _tier_works(tier, adaptive, rolling_buckets)
+    except Exception as e:
         with log_lock:
-            logger.error(f"导出失败: {error_msg}")
-        result_info["steps"]["export"] = {"success": False, "error": error_msg}
+            logger.error(f"查询作品失败: {e}")
+        result_info["steps"]["export"] = {"success": False, "error": str(e)}
         return False, result_info, None
     
-    export_count = info.get('total_count', 0)
     with log_lock:
-        logger.info(f"✓ 导出成功: {export_count} 条记录 -> {filepath}")
-    result_info["steps"]["export"] = {"success": True, "count": export_count, "file": filepath}
+        logger.info(f"✓ 待爬取: {export_count} 条记录")
+    result_info["steps"]["export"] = {"success": True, "count": export_count}
     
     if export_count == 0:
         with log_lock:
@@ -136,35 +256,42 @@ def export_and_crawl_tier(
     with log_lock:
         logger.info(f"\n[2/2] 爬取B站{tier.value.upper()}数据...")
     
-    # 备份原始文件路径
-    original_views_file = VIEWS_FILE
+    fetcher = _build_fetcher(
+        tier, max_retries, async_mode, concurrency, rps, request_delay_min, request_delay_max
+    )
     
     try:
-        # 临时替换 views.json 为导出的文件
-        import tools.spider.crawl_views as crawl_module
-        crawl_module.VIEWS_FILE = filepath
-        
-        # 创建爬虫实例，传入 tier 参数以区分输出文件名
-        crawler = ViewsCrawler(
-            request_delay_min=request_delay_min,
-            request_delay_max=request_delay_max,
-            max_retries=max_retries,
-            tier=tier.value  # 传入分层类型，用于生成不同的文件名
-        )
-        
-        output_path = crawler.crawl()
+        crawl_time = datetime.now()
+        date_str = crawl_time.strftime('%Y-%m-%d')
+        hour_str = crawl_time.strftime('%H')
+        output_path = views_output_path(date_str, hour_str, tier.value)
+        checkpoint = _tier_checkpoint(tier, date_str, hour_str)
+        # 记录逐条流式写入分层 NDJSON 文件，不在内存中累积
+        with metrics.stage("crawl", tier.value), NdjsonWriter(output_path) as writer:
+            data = fetcher.crawl(
+                works,
+                on_record=writer.write_record,
+                on_error=writer.write_error,
+                checkpoint=checkpoint
+            )
+            data.pop("data", None)
+            data.pop("errors", None)
+            writer.close(dict(data, tier=tier.value))
+        metrics.record_fetch(tier.value, data)
+        checkpoint.remove()
         with log_lock:
             logger.info(f"✓ 爬取完成: {output_path}")
-        result_info["steps"]["crawl"] = {"success": True, "output": output_path}
+        result_info["steps"]["crawl"] = {
+            "success": True,
+            "output": output_path,
+            "duration_seconds": data["duration_seconds"],
+        }
         
     except Exception as e:
         with log_lock:
             logger.error(f"爬取失败: {e}")
         result_info["steps"]["crawl"] = {"success": False, "error": str(e)}
         return False, result_info, None
-    finally:
-        # 恢复原始路径
-        crawl_module.VIEWS_FILE = original_views_file
 
     result_info["status"] = "success"
     result_info["end_time"] = datetime.now().isoformat()
@@ -183,7 +310,9 @@ def merge_crawl_results(
     hour_str: str
 ) -> Optional[str]:
     """
-    合并多个分层的爬取结果文件为一个文件
+    流式合并多个分层的 NDJSON 爬取结果为一个文件
+    
+    逐行转写各分层的记录，只累加末尾的统计行，内存占用与作品数量无关
     
     Args:
         output_files: 各分层的输出文件路径字典
@@ -193,62 +322,34 @@ def merge_crawl_results(
     Returns:
         Optional[str]: 合并后的文件路径，如果无法合并则返回 None
     """
-    import json
-    
-    merged_data = {
-        "session_id": f"merged_{date_str.replace('-', '')}{hour_str}00",
-        "crawl_time": datetime.now().isoformat(),
-        "crawl_hour": hour_str,
-        "total_count": 0,
-        "success_count": 0,
-        "fail_count": 0,
-        "skip_count": 0,
-        "duration_seconds": 0,
-        "data": [],
-        "source_tiers": []
-    }
-    
     valid_files = []
+    source_tiers = []
     for tier, output_path in output_files.items():
         if output_path and os.path.exists(output_path):
-            try:
-                with open(output_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # 累加统计信息
-                merged_data["total_count"] += data.get("total_count", 0)
-                merged_data["success_count"] += data.get("success_count", 0)
-                merged_data["fail_count"] += data.get("fail_count", 0)
-                merged_data["skip_count"] += data.get("skip_count", 0)
-                merged_data["duration_seconds"] += data.get("duration_seconds", 0)
-                
-                # 合并数据
-                merged_data["data"].extend(data.get("data", []))
-                merged_data["source_tiers"].append(tier.value)
-                valid_files.append(output_path)
-                
-                logger.info(f"✓ 合并 {tier.value.upper()} 数据: {len(data.get('data', []))} 条")
-                
-            except Exception as e:
-                logger.error(f"✗ 读取 {tier.value} 数据失败: {e}")
+            valid_files.append(output_path)
+            source_tiers.append(tier.value)
+            summary = read_summary(output_path)
+            logger.info(f"✓ 合并 {tier.value.upper()} 数据: {summary.get('success_count', 0)} 条")
     
     if not valid_files:
         logger.warning("没有有效的数据文件可以合并")
         return None
     
-    # 生成合并后的文件路径
-    project_root = get_project_root()
-    merged_dir = os.path.join(project_root, "data", "spider", "views", date_str[:4], date_str[5:7], date_str[8:10])
-    os.makedirs(merged_dir, exist_ok=True)
-    
-    merged_filename = f"{date_str}-{hour_str}_views_data_merged.json"
-    merged_path = os.path.join(merged_dir, merged_filename)
+    merged_path = views_output_path(date_str, hour_str, "merged")
     
-    # 写入合并后的文件
-    with open(merged_path, 'w', encoding='utf-8') as f:
-        json.dump(merged_data, f, ensure_ascii=False, indent=2)
+    try:
+        merged = merge_ndjson(valid_files, merged_path, {
+            "session_id": f"merged_{date_str.replace('-', '')}{hour_str}00",
+            "crawl_time": datetime.now().isoformat(),
+            "crawl_hour": hour_str,
+            "source_tiers": source_tiers,
+        })
+    except Exception as e:
+        logger.error(f"✗ 合并数据失败: {e}")
+        return None
     
-    logger.info(f"✓ 合并完成: 总计 {merged_data['total_count']} 条记录 -> {merged_path}")
+    logger.info(f"✓ 合并完成: 总计 {merged['total_count']} 条记录 -> {merged_path}")
+    register_file(merged_path, KIND_VIEWS, f"{date_str} {hour_str}")
     
     return merged_path
 
@@ -262,6 +363,9 @@ def import_crawl_result(
     """
     导入单个爬取结果文件到数据库
     
+    NDJSON 文件逐行流式导入；旧版整文件 JSON 整体加载后同样经 MetricsStore 批量写入。
+    导入清单（import_manifest）中已导入且未被改写的文件直接跳过，导入后登记行数与内容哈希
+    
     Args:
         output_path: 爬取结果文件路径
         date_str: 日期字符串
@@ -275,26 +379,53 @@ def import_crawl_result(
         logger.warning(f"文件不存在，跳过导入: {output_path}")
         return False
     
-    importer = ViewsImporter()
+    if not force and file_imported(output_path):
+        logger.info(f"文件已导入，跳过: {output_path}（使用 --force 强制重新导入）")
+        return True
+    
+    if not output_path.endswith(NDJSON_SUFFIX):
+        return _import_legacy_json(output_path, date_str, hour_str, force)
     
     try:
-        importer.connect()
+        with MetricsStore(delta=METRICS_DELTA) as store:
+            imported = store.import_records(
+                iter_records(output_path),
+                read_summary(output_path),
+                date_str,
+                hour_str,
+                force=force
+            )
+        logger.info(f"✓ 导入成功: {output_path} ({imported} 条{_unchanged_note(store)})")
+        _mark_imported(output_path, imported, date_str, hour_str)
+        return True
         
-        # 加载数据文件
-        import json
+    except Exception as e:
+        logger.error(f"导入失败: {e}")
+        return False
+
+
+def _unchanged_note(store: MetricsStore) -> str:
+    """变化存储模式下附加未变化条数的日志说明"""
+    return f"，其中 {store.unchanged_count} 条未变化未写入" if store.delta else ""
+
+
+def _mark_imported(output_path: str, imported: int, date_str: str, hour_str: str):
+    """登记到导入清单（会话已导入而未写入时行数未知，记为空）"""
+    mark_file_imported(output_path, KIND_VIEWS, imported or None, f"{date_str} {hour_str}")
+
+
+def _import_legacy_json(output_path: str, date_str: str, hour_str: str, force: bool = False) -> bool:
+    """批量导入旧版整文件 JSON 爬取结果（{..., "data": [...]}）"""
+    try:
         with open(output_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
+        records = data.pop('data', [])
         
-        # 导入数据
-        success = importer.import_data(data, force=force)
-        importer.close()
-        
-        if success:
-            logger.info(f"✓ 导入成功: {output_path}")
-        else:
-            logger.error(f"导入失败: {output_path}")
-        
-        return success
+        with MetricsStore(delta=METRICS_DELTA) as store:
+            imported = store.import_records(records, data, date_str, hour_str, force=force)
+        logger.info(f"✓ 导入成功: {output_path} ({imported} 条{_unchanged_note(store)})")
+        _mark_imported(output_path, imported, date_str, hour_str)
+        return True
         
     except Exception as e:
         logger.error(f"导入失败: {e}")
@@ -306,7 +437,12 @@ def run_parallel_crawl(
     force: bool = False,
     request_delay_min: float = 1.0,
     request_delay_max: float = 3.0,
-    max_retries: int = 2
+    max_retries: int = 2,
+    async_mode: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rps: float = DEFAULT_RPS,
+    adaptive: bool = False,
+    rolling_buckets: int = 0
 ) -> Tuple[bool, Dict[str, Any], Dict[WorkTier, Optional[str]]]:
     """
     并行执行多个分层的爬取流程
@@ -317,6 +453,11 @@ def run_parallel_crawl(
         request_delay_min: 最小请求延迟
         request_delay_max: 最大请求延迟
         max_retries: 最大重试次数
+        async_mode: 是否使用异步并发抓取引擎
+        concurrency: 异步模式下的最大在途请求数
+        rps: 异步模式下的每秒请求预算（多个分层平分）
+        adaptive: 是否按播放增速只爬取本小时到期的作品（见 views_velocity）
+        rolling_buckets: 冷数据滚动分桶数，大于 0 时每小时只爬取轮到的一个桶
         
     Returns:
         Tuple[bool, dict, dict]: (整体是否成功, 执行信息, 各分层输出文件路径)
@@ -326,11 +467,16 @@ def run_parallel_crawl(
         "tiers": {},
     }
     output_files: Dict[WorkTier, Optional[str]] = {}
+    metrics = CrawlMetrics(mode="parallel")
     
     logger.info("=" * 60)
     logger.info(f"开始并行爬取: {[t.value for t in tiers]}")
     logger.info("=" * 60)
     
+    # 多个分层同时抓取时平分每秒请求预算，各分层抓取器的预算合计不超过 rps；
+    # 注册了 api.bilibili.com 共享限速器时，请求还需取得共享限速器的令牌
+    tier_rps = rps / len(tiers) if tiers else rps
+    
     # 使用线程池并行执行爬取
     with ThreadPoolExecutor(max_workers=len(tiers)) as executor:
         # 提交所有任务
@@ -342,7 +488,13 @@ def run_parallel_crawl(
                 force,
                 request_delay_min,
                 request_delay_max,
-                max_retries
+                max_retries,
+                async_mode,
+                concurrency,
+                tier_rps,
+                adaptive,
+                rolling_buckets,
+                metrics
             )
             future_to_tier[future] = tier
         
@@ -374,13 +526,15 @@ def run_parallel_crawl(
     hour_str = crawl_time.strftime('%H')
     
     # 合并所有分层的数据文件
-    merged_path = merge_crawl_results(output_files, date_str, hour_str)
+    with metrics.stage("merge"):
+        merged_path = merge_crawl_results(output_files, date_str, hour_str)
     
     # 统一导入合并后的文件
     all_import_success = True
     if merged_path:
         logger.info(f"\n导入合并后的数据...")
-        success = import_crawl_result(merged_path, date_str, hour_str, force)
+        with metrics.stage("import"):
+            success = import_crawl_result(merged_path, date_str, hour_str, force)
         # 为每个分层记录导入状态
         for tier in output_files.keys():
             if tier.value in results["tiers"]:
@@ -399,6 +553,7 @@ def run_parallel_crawl(
         for info in results["tiers"].values()
     )
     overall_success = any_crawl_success and all_import_success
+    results["metrics"] = _finish_metrics(metrics, overall_success)
     
     logger.info("\n" + "=" * 60)
     logger.info("并行爬取和导入执行完成")
@@ -407,13 +562,258 @@ def run_parallel_crawl(
     return overall_success, results, output_files
 
 
+def _finish_metrics(metrics: CrawlMetrics, success: bool) -> Dict[str, Any]:
+    """结束计时并写出运行指标；写出失败只记录日志，不影响爬取结果"""
+    metrics.finish(success)
+    data = metrics.as_dict()
+    try:
+        metrics.write_json(METRICS_PATH)
+        if METRICS_PROM_PATH:
+            metrics.write_prometheus(METRICS_PROM_PATH)
+    except OSError as e:
+        logger.warning(f"写出运行指标失败: {e}")
+        return data
+    
+    stages = ", ".join(
+        f"{item['stage']}{'/' + item['tier'] if item['tier'] else ''} {item['seconds']:.1f}s"
+        for item in data["stages"]
+    )
+    totals = data["totals"]
+    logger.info(f"阶段耗时: {stages}")
+    logger.info(
+        f"请求 {totals['request_count']} 次（重试 {totals['retry_count']}，限流 {totals['rate_limited_count']}），"
+        f"下载 {totals['bytes_downloaded'] / 1024:.1f} KB，{totals['records_per_second']} 条/秒 -> {METRICS_PATH}"
+    )
+    return data
+
+
+def _queue_put(record_queue: "queue.Queue", item: Tuple[str, Any], stop_event: threading.Event):
+    """放入队列；消费者中止后不再阻塞等待"""
+    while not stop_event.is_set():
+        try:
+            record_queue.put(item, timeout=PIPELINE_FLUSH_SECONDS)
+            return
+        except queue.Full:
+            continue
+    raise RuntimeError("流水线已中止")
+
+
+def _crawl_tier_into_queue(
+    tier: WorkTier,
+    record_queue: "queue.Queue",
+    stop_event: threading.Event,
+    checkpoint: CrawlCheckpoint,
+    request_delay_min: float,
+    request_delay_max: float,
+    max_retries: int,
+    async_mode: bool,
+    concurrency: int,
+    rps: float,
+    adaptive: bool = False,
+    rolling_buckets: int = 0,
+    metrics: Optional[CrawlMetrics] = None
+) -> Dict[str, Any]:
+    """
+    爬取单个分层，把记录和失败信息逐条放入有界队列（生产者）
+    
+    队列满时抓取协程阻塞，入库速度自然反压抓取速度。
+    无论成功与否，结束时都会放入 (PIPELINE_DONE, tier) 通知消费者。
+    
+    Returns:
+        dict: 分层执行信息（含抓取 summary）
+    """
+    info = {"tier": tier.value, "start_time": datetime.now().isoformat(), "steps": {}}
+    metrics = metrics or CrawlMetrics(mode="pipeline")
+    try:
+        with metrics.stage("export", tier.value):
+            export_count, works = _tier_works(tier, adaptive, rolling_buckets)
+        info["steps"]["export"] = {"success": True, "count": export_count}
+        if export_count == 0:
+            with log_lock:
+                logger.info(f"没有{tier.value.upper()}数据需要爬取")
+            info["status"] = "skipped"
+            return info
+        
+        fetcher = _build_fetcher(
+            tier, max_retries, async_mode, concurrency, rps, request_delay_min, request_delay_max
+        )
+        with metrics.stage("crawl", tier.value):
+            summary = fetcher.crawl(
+                works,
+                on_record=lambda record: _queue_put(record_queue, ("record", record), stop_event),
+                on_error=lambda error: _queue_put(record_queue, ("error", error), stop_event),
+                checkpoint=checkpoint
+            )
+        metrics.record_fetch(tier.value, summary)
+        summary.pop("data", None)
+        summary.pop("errors", None)
+        info["summary"] = summary
+        info["steps"]["crawl"] = {"success": True, "duration_seconds": summary["duration_seconds"]}
+        info["status"] = "success"
+    except Exception as e:
+        with log_lock:
+            logger.error(f"✗ {tier.value.upper()}数据爬取异常: {e}")
+        info["steps"]["crawl"] = {"success": False, "error": str(e)}
+    finally:
+        info["end_time"] = datetime.now().isoformat()
+        if not stop_event.is_set():
+            _queue_put(record_queue, (PIPELINE_DONE, tier), stop_event)
+    return info
+
+
+def run_streaming_crawl(
+    tiers: List[WorkTier],
+    force: bool = False,
+    request_delay_min: float = 1.0,
+    request_delay_max: float = 3.0,
+    max_retries: int = 2,
+    async_mode: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rps: float = DEFAULT_RPS,
+    adaptive: bool = False,
+    rolling_buckets: int = 0
+) -> Tuple[bool, Dict[str, Any], Optional[str]]:
+    """
+    流水线模式：边爬取边入库
+    
+    各分层在线程中爬取，记录经有界队列流向主线程，主线程按批写入数据库
+    （每 PIPELINE_BATCH_SIZE 条或队列空闲 PIPELINE_FLUSH_SECONDS 秒提交一次），
+    同时把记录写入合并后的 NDJSON 归档文件。不再需要分层文件合并与重新解析。
+    
+    Args:
+        tiers: 要爬取的分层列表
+        force: 本小时已导入时是否强制重新爬取导入
+        request_delay_min: 最小请求延迟（仅同步模式）
+        request_delay_max: 最大请求延迟（仅同步模式）
+        max_retries: 最大重试次数
+        async_mode: 是否使用异步并发抓取引擎
+        concurrency: 异步模式下的最大在途请求数
+        rps: 异步模式下的每秒请求预算（多个分层平分）
+        adaptive: 是否按播放增速只爬取本小时到期的作品（见 views_velocity）
+        rolling_buckets: 冷数据滚动分桶数，大于 0 时每小时只爬取轮到的一个桶
+        
+    Returns:
+        Tuple[bool, dict, Optional[str]]: (整体是否成功, 执行信息, 归档文件路径)
+    """
+    crawl_time = datetime.now()
+    date_str = crawl_time.strftime('%Y-%m-%d')
+    hour_str = crawl_time.strftime('%H')
+    session_summary = {
+        "session_id": f"merged_{date_str.replace('-', '')}{hour_str}00",
+        "crawl_time": crawl_time.isoformat(),
+        "crawl_hour": hour_str,
+        "source_tiers": [t.value for t in tiers],
+    }
+    results = {
+        "mode": "pipeline",
+        "start_time": timezone.localtime().strftime('%Y-%m-%d %H:%M:%S'),
+        "tiers": {},
+    }
+    archive_path = views_output_path(date_str, hour_str, "merged")
+    metrics = CrawlMetrics(mode="pipeline")
+    
+    logger.info("=" * 60)
+    logger.info(f"开始流水线爬取: {[t.value for t in tiers]}")
+    logger.info("=" * 60)
+    
+    store = MetricsStore(delta=METRICS_DELTA).connect()
+    try:
+        if not force and store.session_exists(session_summary["session_id"]):
+            logger.info(f"本时段数据已导入（{session_summary['session_id']}），跳过。使用 --force 强制重新爬取")
+            results["end_time"] = timezone.localtime().strftime('%Y-%m-%d %H:%M:%S')
+            return True, results, None
+        
+        record_queue: "queue.Queue" = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stop_event = threading.Event()
+        checkpoints = {tier: _tier_checkpoint(tier, date_str, hour_str) for tier in tiers}
+        # 与 run_parallel_crawl 相同：分层平分 rps，同时受共享限速器约束
+        tier_rps = rps / len(tiers) if tiers else rps
+        imported = 0
+        pending: List[Dict[str, Any]] = []
+        
+        with NdjsonWriter(archive_path) as writer, ThreadPoolExecutor(max_workers=len(tiers)) as executor:
+            futures = {
+                executor.submit(
+                    _crawl_tier_into_queue, tier, record_queue, stop_event, checkpoints[tier],
+                    request_delay_min, request_delay_max, max_retries, async_mode, concurrency,
+                    tier_rps, adaptive, rolling_buckets, metrics
+                ): tier
+                for tier in tiers
+            }
+            
+            # 消费者：唯一持有数据库连接与归档文件的线程；异常时通知生产者停止，避免阻塞在满队列上
+            finished = 0
+            try:
+                while finished < len(tiers):
+                    try:
+                        kind, payload = record_queue.get(timeout=PIPELINE_FLUSH_SECONDS)
+                    except queue.Empty:
+                        kind, payload = None, None
+                    
+                    if kind == "record":
+                        writer.write_record(payload)
+                        pending.append(payload)
+                    elif kind == "error":
+                        writer.write_error(payload)
+                    elif kind == PIPELINE_DONE:
+                        finished += 1
+                    
+                    if pending and (len(pending) >= PIPELINE_BATCH_SIZE or kind in (None, PIPELINE_DONE)):
+                        with metrics.stage("import"):
+                            imported += store.write_batch(pending, date_str, hour_str)
+                        pending = []
+            except BaseException:
+                stop_event.set()
+                raise
+            
+            for future, tier in futures.items():
+                info = future.result()
+                results["tiers"][tier.value] = info
+                for key in SUMMARY_COUNTERS:
+                    session_summary[key] = session_summary.get(key, 0) + info.get("summary", {}).get(key, 0)
+            
+            writer.close(session_summary)
+        
+        with metrics.stage("import"):
+            store.record_session(session_summary, date_str, hour_str, imported)
+        _mark_imported(archive_path, imported, date_str, hour_str)
+        for checkpoint in checkpoints.values():
+            checkpoint.remove()
+        logger.info(f"✓ 流水线入库完成: {imported} 条{_unchanged_note(store)} -> 归档 {archive_path}")
+    except Exception as e:
+        logger.error(f"流水线执行失败: {e}")
+        results["error"] = str(e)
+        results["end_time"] = timezone.localtime().strftime('%Y-%m-%d %H:%M:%S')
+        results["metrics"] = _finish_metrics(metrics, False)
+        return False, results, None
+    finally:
+        store.close()
+    
+    for info in results["tiers"].values():
+        info["import_success"] = info.get("status") == "success"
+    results["end_time"] = timezone.localtime().strftime('%Y-%m-%d %H:%M:%S')
+    
+    overall_success = any(
+        info.get("status") == "success"
+        for info in results["tiers"].values()
+    )
+    results["metrics"] = _finish_metrics(metrics, overall_success)
+    return overall_success, results, archive_path
+
+
 def run_crawl_pipeline(
     tier: WorkTier, 
     views_file: str,
     force: bool = False,
     request_delay_min: float = 1.0,
     request_delay_max: float = 3.0,
-    max_retries: int = 2
+    max_retries: int = 2,
+    async_mode: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rps: float = DEFAULT_RPS,
+    adaptive: bool = False,
+    rolling_buckets: int = 0,
+    pipeline: bool = False
 ) -> Tuple[bool, Dict[str, Any]]:
     """
     执行指定分层的完整爬取流程（串行版本，用于单独执行）
@@ -425,23 +825,37 @@ def run_crawl_pipeline(
         request_delay_min: 最小请求延迟
         request_delay_max: 最大请求延迟
         max_retries: 最大重试次数
+        async_mode: 是否使用异步并发抓取引擎
+        concurrency: 异步模式下的最大在途请求数
+        rps: 异步模式下的全局每秒请求预算
+        adaptive: 是否按播放增速只爬取本小时到期的作品（见 views_velocity）
+        rolling_buckets: 冷数据滚动分桶数，大于 0 时每小时只爬取轮到的一个桶
+        pipeline: 是否使用流水线模式（边爬取边入库，见 run_streaming_crawl）
         
     Returns:
         Tuple[bool, dict]: (是否成功, 执行信息)
     """
-    # 使用新的并行函数，但只执行一个 tier
-    success, results, output_files = run_parallel_crawl(
+    crawl = run_streaming_crawl if pipeline else run_parallel_crawl
+    # 使用并行/流水线函数，但只执行一个 tier
+    success, results, _ = crawl(
         tiers=[tier],
         force=force,
         request_delay_min=request_delay_min,
         request_delay_max=request_delay_max,
-        max_retries=max_retries
+        max_retries=max_retries,
+        async_mode=async_mode,
+        concurrency=concurrency,
+        rps=rps,
+        adaptive=adaptive,
+        rolling_buckets=rolling_buckets
     )
     
-    return success, results.get("tiers", {}).get(tier.value, {})
+    info = dict(results.get("tiers", {}).get(tier.value, {}))
+    info["metrics"] = results.get("metrics")
+    return success, info
 
 
-def run_scheduled_crawl(force: bool = False) -> Tuple[bool, Dict[str, Any]]:
+def run_scheduled_crawl(force: bool = False, **crawl_options) -> Tuple[bool, Dict[str, Any]]:
     """
     根据当前时间执行调度爬取
     - 每小时都爬取热数据
@@ -450,6 +864,7 @@ def run_scheduled_crawl(force: bool = False) -> Tuple[bool, Dict[str, Any]]:
     
     Args:
         force: 是否强制重新导入
+        **crawl_options: 抓取参数（async_mode/concurrency/rps/adaptive/rolling_buckets 等）；pipeline=True 时改用 run_streaming_crawl
         
     Returns:
         Tuple[bool, dict]: (是否成功, 执行信息)
@@ -465,7 +880,15 @@ def run_scheduled_crawl(force: bool = False) -> Tuple[bool, Dict[str, Any]]:
     # 确定要爬取的分层
     tiers_to_crawl = [WorkTier.HOT]  # 热数据始终爬取
     
-    if current_hour in COLD_CRAWL_HOURS:
+    if crawl_options.get("adaptive"):
+        # 自适应模式：每小时都检查冷数据，只爬取按播放增速到期的作品
+        tiers_to_crawl.append(WorkTier.COLD)
+        logger.info(f"\n本时段将爬取: 热数据 + 到期的冷数据（按播放增速分级）")
+    elif crawl_options.get("rolling_buckets"):
+        # 滚动模式：冷数据分桶，每小时爬取一个桶，负载均匀分布到全天
+        tiers_to_crawl.append(WorkTier.COLD)
+        logger.info(f"\n本时段将爬取: 热数据 + 冷数据滚动分桶（共 {crawl_options['rolling_buckets']} 桶）")
+    elif current_hour in COLD_CRAWL_HOURS:
         tiers_to_crawl.append(WorkTier.COLD)
         logger.info(f"\n本时段将爬取: 热数据 + 冷数据（并发执行）")
     else:
@@ -474,8 +897,12 @@ def run_scheduled_crawl(force: bool = False) -> Tuple[bool, Dict[str, Any]]:
         logger.info(f"\n本时段将爬取: 仅热数据")
         logger.info(f"下次冷数据爬取时间: {next_cold}:00")
     
-    # 执行并行爬取和统一导入
-    success, results, output_files = run_parallel_crawl(tiers=tiers_to_crawl, force=force)
+    # 执行并行爬取和统一导入（流水线模式下边爬取边入库）
+    if crawl_options.pop("pipeline", False):
+        success, results, archive_path = run_streaming_crawl(tiers=tiers_to_crawl, force=force, **crawl_options)
+        return success, results
+    
+    success, results, output_files = run_parallel_crawl(tiers=tiers_to_crawl, force=force, **crawl_options)
     
     return success, results
 
@@ -506,6 +933,21 @@ def main():
   
   # 调整请求延迟（秒）
   python run_tiered_crawler.py --hot --delay-min 0.5 --delay-max 1.5
+  
+  # 异步并发抓取：4 个在途请求，全局每秒 4 次
+  python run_tiered_crawler.py --scheduled --async --concurrency 4 --rps 4
+  
+  # 流水线模式：边爬取边入库
+  python run_tiered_crawler.py --scheduled --async --pipeline
+  
+  # 自适应分层：冷数据按播放增速决定爬取间隔
+  python run_tiered_crawler.py --scheduled --async --adaptive
+  
+  # 滚动模式：冷数据分 8 桶，每小时爬取一桶
+  python run_tiered_crawler.py --scheduled --async --rolling 8
+  
+  # 变化存储：只写入计数有变化的作品
+  python run_tiered_crawler.py --scheduled --async --pipeline --delta
         """
     )
     
@@ -522,9 +964,35 @@ def main():
     parser.add_argument('--delay-min', type=float, default=1.0, help='最小请求延迟（秒）')
     parser.add_argument('--delay-max', type=float, default=3.0, help='最大请求延迟（秒）')
     parser.add_argument('--retries', type=int, default=2, help='最大重试次数')
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                        help='使用异步并发抓取（令牌桶限速，替代每次请求后的随机延迟）')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'异步模式最大在途请求数（默认 {DEFAULT_CONCURRENCY}）')
+    parser.add_argument('--rps', type=float, default=None,
+                        help=f'异步模式每秒请求上限（默认 {DEFAULT_RPS}）；显式指定时 api.bilibili.com 的自适应速率'
+                             f'（含学到的速率）也不超过该值，不指定时按学习记录在自适应范围内调整')
+    parser.add_argument('--no-cookies', action='store_true',
+                        help='异步模式不使用 B站 Cookie 池（匿名请求）')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='按播放增速分配爬取间隔（每小时/每3小时/每天/每周），只爬取本小时到期的作品')
+    parser.add_argument('--rolling', dest='rolling_buckets', type=int, nargs='?',
+                        const=DEFAULT_COLD_BUCKETS, default=0, metavar='N',
+                        help=f'冷数据滚动模式：分成 N 个桶每小时爬取一个（默认 {DEFAULT_COLD_BUCKETS}，每个作品每 N 小时一次）')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流水线模式：边爬取边分批入库，合并文件仅作为归档输出')
+    parser.add_argument('--delta', action='store_true',
+                        help='变化存储：计数与上一次采样相同的作品不写入 work_metrics（读取时按阶梯函数还原）')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_PATH,
+                        help='运行指标 JSON 输出路径（阶段耗时、请求/重试次数、下载字节数、每秒记录数）')
+    parser.add_argument('--prom-file', help='同时输出 Prometheus textfile（供 node_exporter textfile collector 采集）')
     
     args = parser.parse_args()
     
+    global METRICS_PATH, METRICS_PROM_PATH, METRICS_DELTA
+    METRICS_PATH = args.metrics_file
+    METRICS_PROM_PATH = args.prom_file
+    METRICS_DELTA = args.delta
+    
     # 显示统计信息
     if args.stats:
         exporter = TieredViewsExporter()
@@ -545,7 +1013,15 @@ def main():
             print(f"   最旧: {stats['hot_works']['oldest']['title'][:45]}...")
         
         print(f"\n❄️ 冷数据（{stats['hot_days_threshold']}天前）: {stats['cold_works']['count']} 条")
-        print(f"   爬取频率: 每天3次 (00:00, 08:00, 16:00)")
+        rolling_buckets = args.rolling_buckets or DEFAULT_COLD_BUCKETS
+        if args.adaptive:
+            print(f"   爬取频率: 按播放增速分级（每小时/每3小时/每天/每周）")
+        elif args.rolling_buckets:
+            print(f"   爬取频率: 滚动分 {rolling_buckets} 桶，每小时一个桶（每个作品每 {rolling_buckets} 小时一次）")
+        else:
+            cold_hours = ', '.join(f'{h:02d}:00' for h in COLD_CRAWL_HOURS)
+            print(f"   爬取频率: 每天{len(COLD_CRAWL_HOURS)}次 ({cold_hours})")
+            print(f"   滚动模式（--rolling）: 分 {rolling_buckets} 桶，每个作品每 {rolling_buckets} 小时一次")
         if stats['cold_works']['newest']:
             print(f"   最新: {stats['cold_works']['newest']['title'][:45]}...")
         if stats['cold_works']['oldest']:
@@ -556,7 +1032,13 @@ def main():
         current_hour = get_current_hour()
         print(f"   当前时间: {current_hour}:00")
         print(f"   热数据: 始终爬取")
-        if should_crawl_cold_now():
+        bucket = current_bucket(datetime.now(), rolling_buckets)
+        if args.adaptive:
+            print(f"   冷数据: ✅ 本时段爬取按播放增速到期的作品")
+        elif args.rolling_buckets:
+            print(f"   冷数据: ✅ 本时段爬取第 {bucket + 1}/{rolling_buckets} 桶"
+                  f"（下一桶: 第 {(bucket + 1) % rolling_buckets + 1} 桶）")
+        elif should_crawl_cold_now():
             print(f"   冷数据: ✅ 本时段执行爬取（与热数据并发）")
         else:
             next_cold = None
@@ -567,12 +1049,34 @@ def main():
             if next_cold is None:
                 next_cold = COLD_CRAWL_HOURS[0]
             print(f"   冷数据: ⏸️ 跳过（下次: {next_cold}:00）")
+        if not args.adaptive and not args.rolling_buckets:
+            print(f"   滚动模式下本时段为第 {bucket + 1}/{rolling_buckets} 桶")
         print("=" * 70 + "\n")
         
         sys.exit(0)
     
     # 执行爬取
     success = False
+    info: Dict[str, Any] = {}
+    error_message = None
+    started = datetime.now()
+    if args.async_mode:
+        # 所有分层共用 api.bilibili.com 的自适应限速器，学到的速率在进程退出时保存；
+        # 显式指定的 --rps 作为上限，学到的速率更高时同样不超过它
+        enable_adaptive_rates(
+            {'api.bilibili.com': args.rps or DEFAULT_RPS},
+            max_rates={'api.bilibili.com': args.rps} if args.rps else None
+        )
+        if not args.no_cookies:
+            pool = load_pool('bilibili')
+            logger.info(f"Cookie 池: {len(pool.alive())} 个有效 Cookie")
+    crawl_options = {
+        "async_mode": args.async_mode,
+        "concurrency": args.concurrency,
+        "rps": args.rps or DEFAULT_RPS,
+        "adaptive": args.adaptive,
+        "rolling_buckets": args.rolling_buckets,
+    }
     
     try:
         if args.hot:
@@ -582,7 +1086,9 @@ def main():
                 force=args.force,
                 request_delay_min=args.delay_min,
                 request_delay_max=args.delay_max,
-                max_retries=args.retries
+                max_retries=args.retries,
+                pipeline=args.pipeline,
+                **crawl_options
             )
         elif args.cold:
             success, info = run_crawl_pipeline(
@@ -591,35 +1097,69 @@ def main():
                 force=args.force,
                 request_delay_min=args.delay_min,
                 request_delay_max=args.delay_max,
-                max_retries=args.retries
+                max_retries=args.retries,
+                pipeline=args.pipeline,
+                **crawl_options
+            )
+        elif args.all and args.pipeline:
+            # 流水线模式：热/冷数据边爬取边入库
+            success, info, archive_path = run_streaming_crawl(
+                tiers=[WorkTier.HOT, WorkTier.COLD],
+                force=args.force,
+                request_delay_min=args.delay_min,
+                request_delay_max=args.delay_max,
+                max_retries=args.retries,
+                **crawl_options
             )
         elif args.all:
             # 并行爬取热数据和冷数据
-            success, results, output_files = run_parallel_crawl(
+            success, info, output_files = run_parallel_crawl(
                 tiers=[WorkTier.HOT, WorkTier.COLD],
                 force=args.force,
                 request_delay_min=args.delay_min,
                 request_delay_max=args.delay_max,
-                max_retries=args.retries
+                max_retries=args.retries,
+                **crawl_options
             )
         elif args.scheduled:
-            success, info = run_scheduled_crawl(force=args.force)
+            success, info = run_scheduled_crawl(force=args.force, pipeline=args.pipeline, **crawl_options)
         else:
             # 默认执行调度模式
             print("使用默认模式：--scheduled（使用 --help 查看所有选项）")
-            success, info = run_scheduled_crawl(force=args.force)
+            success, info = run_scheduled_crawl(force=args.force, pipeline=args.pipeline, **crawl_options)
             
     except KeyboardInterrupt:
         logger.warning("用户中断爬取任务")
+        _record_cli_run(started, False, {}, "用户中断")
         sys.exit(130)
     except Exception as e:
         logger.error(f"执行失败: {e}")
         import traceback
         logger.error(traceback.format_exc())
         success = False
+        error_message = str(e)
     
+    _record_cli_run(started, success, info, error_message)
     sys.exit(0 if success else 1)
 
 
+def _record_cli_run(started: datetime, success: bool, info: Dict[str, Any], error_message: Optional[str]):
+    """命令行运行结果追加到运行台账（常驻调度进程由 scheduler_daemon 统一记录）"""
+    metrics = info.get("metrics") or {}
+    totals = metrics.get("totals") or {}
+    summary = None
+    if totals:
+        summary = f"成功 {totals.get('success_count', 0)} 条，失败 {totals.get('fail_count', 0)} 条"
+    record_run(
+        "tiered_views",
+        started,
+        success,
+        error_message=error_message or info.get("error"),
+        summary=summary,
+        details={"argv": sys.argv[1:], "mode": metrics.get("mode")},
+        tiers=metrics.get("tiers"),
+    )
+
+
 if __name__ == '__main__':
     main()
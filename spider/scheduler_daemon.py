@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫常驻调度进程
+在一个长期运行的进程中按原有定时器的节奏执行所有爬虫任务，代替每次启动新 Python 的 systemd timer + bash 包装脚本：
+django.setup()、模块导入只在启动时执行一次，数据库连接与 HTTP 连接池在多次运行间复用，
+同一上游主机的所有请求共用一个自适应令牌桶（rate_control.enable_adaptive_rates，学到的速率在任务结束后保存）。
+每次任务执行结果追加到运行台账（run_ledger，logs/crawl_runs.sqlite3）。
+
+路径: spider/scheduler_daemon.py
+
+任务与节奏（与原 timer 一致）:
+    tiered_views  每小时整点    分层投稿数据爬取（原 bilibili-tiered-crawler.timer）
+    fans_count    每小时整点    粉丝数并发采样 + 进程内入库（原 bilibili-spider.timer）
+    fans_sample   每 10 分钟    粉丝数补充采样（:05/:15/.../:55），只写入时间序列 follower_series
+    moments       每 5 分钟     微博/B站动态（原 moments-crawler.timer）
+    guards        每天 04:30    大航海名单（原为手动执行，默认不调度，需用 --jobs 显式启用）
+    views_compact 每天 05:00    压缩超过保留天数的投稿小时数据（views_rollup；删除小时数据，默认不调度，需用 --jobs 显式启用）
+    views_archive 每天 05:30    把上月及更早的每小时爬取文件折叠为月度归档并删除原文件（views_archive；默认不调度，需用 --jobs 显式启用）
+
+用法:
+    python spider/scheduler_daemon.py                       # 启动常驻调度（默认任务）
+    python spider/scheduler_daemon.py --jobs moments,fans_count
+    python spider/scheduler_daemon.py --run-once tiered_views   # 立即执行一次指定任务后退出
+    python spider/scheduler_daemon.py --list                # 查看任务与下次执行时间
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_PATH = os.path.join(PROJECT_ROOT, 'repo', 'xxm_fans_backend')
+
+# 添加后端目录到路径（必须首先添加）
+sys.path.insert(0, BACKEND_PATH)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xxm_fans_home.settings')
+
+import django
+django.setup()
+
+from django.db import close_old_connections
+
+from tools.spider.utils.logger import setup_views_logger
+from rate_control import enable_adaptive_rates, save_rate_state
+from run_ledger import record_run
+from views_tiering import DEFAULT_COLD_BUCKETS
+
+logger = setup_views_logger("scheduler_daemon")
+
+# 没有到期任务时的最长休眠秒数
+MAX_SLEEP_SECONDS = 30
+
+
+class ScheduledJob:
+    """
+    按固定间隔执行的任务
+
+    执行时间按本地时间从当天 00:00 起对齐：every_minutes=60 即每个整点，
+    every_minutes=1440, offset_minutes=270 即每天 04:30。
+    上一次执行尚未结束时跳过本次（与 oneshot 服务未结束时 timer 不再触发一致）。
+    func 返回 (是否成功, 台账信息)，台账信息可包含 summary / details / tiers（见 RunLedger.record）。
+    default=False 的任务不在默认调度中（原来没有定时器的任务），只在 --jobs 中列出时调度。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Tuple[bool, Dict[str, Any]]],
+        every_minutes: int,
+        offset_minutes: int = 0,
+        default: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.every_minutes = every_minutes
+        self.offset_minutes = offset_minutes
+        self.default = default
+        self.running = False
+        self.last_run: Optional[datetime] = None
+        self.last_success: Optional[bool] = None
+        self.next_run = self.schedule_after(datetime.now())
+
+    def schedule_after(self, now: datetime) -> datetime:
+        """返回 now 之后的下一个执行时间"""
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        minutes = (now - midnight).total_seconds() / 60 - self.offset_minutes
+        slots = int(minutes // self.every_minutes) + 1
+        return midnight + timedelta(minutes=self.offset_minutes + slots * self.every_minutes)
+
+
+def job_tiered_views() -> Tuple[bool, Dict[str, Any]]:
+    """分层投稿数据爬取：异步抓取（轮换 B站 Cookie 池）+ 流水线入库 + 冷数据滚动分桶"""
+    import run_tiered_crawler
+    from cookie_pool import load_pool
+    load_pool('bilibili')
+    success, results = run_tiered_crawler.run_scheduled_crawl(
+        async_mode=True, pipeline=True, rolling_buckets=DEFAULT_COLD_BUCKETS
+    )
+    metrics = results.get("metrics") or {}
+    totals = metrics.get("totals") or {}
+    return success, {
+        "summary": f"成功 {totals.get('success_count', 0)} 条，失败 {totals.get('fail_count', 0)} 条" if totals else None,
+        "details": {"mode": metrics.get("mode"), "error": results.get("error")},
+        "tiers": metrics.get("tiers"),
+    }
+
+
+def job_fans_count() -> Tuple[bool, Dict[str, Any]]:
+    """粉丝数采样，结果在进程内直接入库（同时写 JSON 归档）"""
+    import get_bilibili_fans_count
+
+    output = get_bilibili_fans_count.main(ingest=True)
+    results = output["results"]
+    failed = [r["name"] for r in results if r["status"] != "success"]
+    return not failed, {
+        "summary": f"成功 {len(results) - len(failed)}/{len(results)} 个账号",
+        "details": {"file": output["file"], "ingest": output["ingest"], "failed": failed},
+    }
+
+
+def job_fans_sample() -> Tuple[bool, Dict[str, Any]]:
+    """粉丝数小时内补充采样：只写入时间序列（follower_series），不入库、不写归档"""
+    import get_bilibili_fans_count
+
+    output = get_bilibili_fans_count.main(ingest=False, archive=False)
+    results = output["results"]
+    failed = [r["name"] for r in results if r["status"] != "success"]
+    return not failed, {"summary": f"成功 {len(results) - len(failed)}/{len(results)} 个账号", "details": {"failed": failed}}
+
+
+def job_moments() -> Tuple[bool, Dict[str, Any]]:
+    """微博/B站动态增量爬取（新动态立即入库，图片由下载管线在后台回填，不等待）"""
+    import crawl_moments
+    results = crawl_moments.main([], wait_images=False)
+    success = not any(r['error'] and r['error'] != 'cookie_missing' for r in results.values())
+    return success, {"details": results}
+
+
+def job_guards() -> Tuple[bool, Dict[str, Any]]:
+    """大航海名单爬取"""
+    import scrape_laplace_guards
+    scrape_laplace_guards.main([])
+    return True, {}
+
+
+def job_views_compact() -> Tuple[bool, Dict[str, Any]]:
+    """投稿指标保留策略：压缩超过保留天数的小时数据"""
+    import views_rollup
+    result = views_rollup.compact()
+    return True, {"summary": f"压缩 {result['days']} 天，删除 {result['deleted']} 行", "details": result}
+
+
+def job_views_archive() -> Tuple[bool, Dict[str, Any]]:
+    """投稿爬取结果月度归档：当月之前的每小时文件折叠为归档并删除原文件"""
+    import views_archive
+    results = views_archive.compact_before(datetime.now().strftime('%Y-%m'), delete=True)
+    deleted = sum(result['deleted'] for result in results)
+    return True, {"summary": f"归档 {len(results)} 个月，删除 {deleted} 个文件", "details": results}
+
+
+def build_jobs() -> Dict[str, ScheduledJob]:
+    """所有可调度的任务"""
+    jobs = [
+        ScheduledJob('tiered_views', job_tiered_views, every_minutes=60),
+        ScheduledJob('fans_count', job_fans_count, every_minutes=60),
+        ScheduledJob('fans_sample', job_fans_sample, every_minutes=10, offset_minutes=5),
+        ScheduledJob('moments', job_moments, every_minutes=5),
+        # 原为手动执行，不接管为默认节奏；需要每天自动爬取时用 --jobs 显式启用
+        ScheduledJob('guards', job_guards, every_minutes=1440, offset_minutes=270, default=False),
+        # 不可逆删除超过保留天数的小时数据，而分析页面仍读取小时数据：默认不调度，需用 --jobs 显式启用
+        ScheduledJob('views_compact', job_views_compact, every_minutes=1440, offset_minutes=300, default=False),
+        # 归档后删除原始爬取文件：默认不调度，需用 --jobs 显式启用
+        ScheduledJob('views_archive', job_views_archive, every_minutes=1440, offset_minutes=330, default=False),
+    ]
+    return {job.name: job for job in jobs}
+
+
+def run_job(job: ScheduledJob) -> bool:
+    """
+    执行一次任务
+
+    执行前后关闭失效的数据库连接（长期运行进程中 Django 不会在请求周期外自动清理连接），
+    结束后把结果追加到运行台账
+    """
+    job.running = True
+    job.last_run = datetime.now()
+    logger.info(f"▶ 开始任务: {job.name}")
+    close_old_connections()
+    ledger_info: Dict[str, Any] = {}
+    error_message = None
+    try:
+        success, ledger_info = job.func()
+        job.last_success = bool(success)
+    except SystemExit as e:
+        job.last_success = not e.code
+        error_message = None if job.last_success else f"SystemExit({e.code})"
+    except Exception as e:
+        job.last_success = False
+        error_message = str(e)
+        logger.error(f"任务 {job.name} 异常: {e}")
+        logger.error(traceback.format_exc())
+    finally:
+        close_old_connections()
+        # 每个任务结束后保存学到的速率，进程被强制结束时也不丢失
+        save_rate_state()
+        job.running = False
+
+    record_run(
+        job.name,
+        job.last_run,
+        job.last_success,
+        error_message=error_message or (ledger_info.get("details") or {}).get("error"),
+        summary=ledger_info.get("summary"),
+        details=ledger_info.get("details"),
+        tiers=ledger_info.get("tiers"),
+    )
+
+    duration = (datetime.now() - job.last_run).total_seconds()
+    status = "✓" if job.last_success else "✗"
+    logger.info(f"{status} 任务结束: {job.name}，耗时 {duration:.1f}s")
+    return job.last_success
+
+
+def run_forever(jobs: List[ScheduledJob], stop_event: threading.Event):
+    """主循环：到期的任务提交到线程池执行，长任务不阻塞高频任务"""
+    logger.info("=" * 60)
+    logger.info(f"爬虫调度进程启动: {[job.name for job in jobs]}")
+    for job in jobs:
+        logger.info(f"  {job.name}: 下次执行 {job.next_run.strftime('%Y-%m-%d %H:%M')}")
+    logger.info("=" * 60)
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        while not stop_event.is_set():
+            now = datetime.now()
+            for job in jobs:
+                if now < job.next_run:
+                    continue
+                if job.running:
+                    logger.warning(f"任务 {job.name} 上一次执行尚未结束，跳过本次")
+                else:
+                    executor.submit(run_job, job)
+                job.next_run = job.schedule_after(now)
+
+            next_due = min(job.next_run for job in jobs)
+            wait = (next_due - datetime.now()).total_seconds()
+            stop_event.wait(min(max(wait, 0), MAX_SLEEP_SECONDS))
+
+        logger.info("收到停止信号，等待运行中的任务结束...")
+    logger.info("爬虫调度进程已退出")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='爬虫常驻调度进程',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python scheduler_daemon.py
+  python scheduler_daemon.py --jobs tiered_views,moments
+  python scheduler_daemon.py --run-once fans_count
+        """
+    )
+    parser.add_argument('--jobs', help='只调度指定任务（逗号分隔），默认为除 guards、views_compact、views_archive 外的全部任务')
+    parser.add_argument('--run-once', metavar='JOB', help='立即执行一次指定任务后退出')
+    parser.add_argument('--list', action='store_true', help='列出任务及下次执行时间')
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_ROOT)
+    enable_adaptive_rates()
+
+    all_jobs = build_jobs()
+    names = args.jobs.split(',') if args.jobs else [name for name, job in all_jobs.items() if job.default]
+    unknown = [name for name in names + ([args.run_once] if args.run_once else []) if name not in all_jobs]
+    if unknown:
+        parser.error(f"未知任务: {unknown}，可选: {list(all_jobs)}")
+    jobs = [all_jobs[name] for name in names]
+
+    if args.list:
+        for job in jobs:
+            print(f"{job.name:<14} 每 {job.every_minutes} 分钟  下次: {job.next_run.strftime('%Y-%m-%d %H:%M')}")
+        for name in [name for name in all_jobs if name not in names]:
+            print(f"{name:<14} 未启用（--jobs 中列出时调度）")
+        return
+
+    if args.run_once:
+        sys.exit(0 if run_job(all_jobs[args.run_once]) else 1)
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+    run_forever(jobs, stop_event)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,43 +17,56 @@ Guard Level mapping (Bilibili API):
 import json
 import os
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 
-import requests
+from cookie_pool import COOKIE_EXPIRED_CODE, load_pool
+from http_client import PooledSession
+from rate_control import enable_adaptive_rates, is_rate_limited
 
 GUARD_LEVEL_MAP = {1: "总督", 2: "提督", 3: "舰长"}
 
 API_V1 = "https://api.live.bilibili.com/xlive/app-room/v1/guardTab/topList"
 API_V2 = "https://api.live.bilibili.com/xlive/app-room/v2/guardTab/topList"
 PAGE_SIZE = 29
-REQUEST_DELAY = 0.5
 
 HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Referer": "https://live.bilibili.com",
 }
 
+# Shared keep-alive connection pool: all pages reuse one connection to api.live.bilibili.com
+_session = PooledSession()
 
-def _load_cookie():
-    """Try to load Bilibili cookie from Django DB."""
+
+def _load_cookie_pool():
+    """Try to load the Bilibili cookie pool from Django DB; None when unavailable (anonymous access)."""
     try:
         import django
         os.environ.setdefault("DJANGO_SETTINGS_MODULE", "xxm_fans_home.settings")
         sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
         django.setup()
-        from moments.services.cookie_service import CookieService
-        cookie = CookieService.get_cookie("bilibili")
-        if cookie:
-            return cookie
+        pool = load_pool("bilibili")
+        if pool.alive():
+            return pool
     except Exception:
         pass
-    return ""
-
-
-def _fetch(api_url: str, params: dict, timeout: int = 15) -> dict:
-    resp = requests.get(api_url, params=params, headers=HEADERS, timeout=timeout)
+    return None
+
+
+def _fetch(api_url: str, params: dict, timeout: int = 15, cookie_pool=None) -> dict:
+    """Fetch one page, rotating through the cookie pool; an expired cookie is disabled and the next one tried."""
+    while True:
+        cookie = cookie_pool.acquire() if cookie_pool else None
+        headers = dict(HEADERS, Cookie=cookie.cookie_string) if cookie else HEADERS
+        resp = _session.get(api_url, params=params, headers=headers, timeout=timeout)
+        if cookie is None:
+            break
+        if resp.ok and resp.json().get("code") == COOKIE_EXPIRED_CODE:
+            print(f"Cookie #{cookie.cookie_id} expired, switching", file=sys.stderr)
+            cookie_pool.report(cookie, expired=True)
+            continue
+        cookie_pool.report(cookie, rate_limited=is_rate_limited(resp.status_code, resp.content))
+        break
     resp.raise_for_status()
     data = resp.json()
     if data.get("code") != 0:
@@ -79,16 +92,15 @@ def scrape_all_guards(room_id: int, ruid: int, output_dir: str = None) -> list[d
     if output_dir is None:
         output_dir = Path(__file__).parent
 
-    # Load cookie for authenticated API access
-    cookie = _load_cookie()
-    if cookie:
-        HEADERS["Cookie"] = cookie
-        print("Using authenticated cookie")
+    # Load cookie pool for authenticated API access; pages are spread across all valid cookies
+    cookie_pool = _load_cookie_pool()
+    if cookie_pool:
+        print(f"Using {len(cookie_pool.alive())} authenticated cookie(s)")
 
     # Page 1: use v1 to get top3 (expired governors), v2 for full list with medal_info
     print(f"Fetching page 1 for room_id={room_id}, ruid={ruid}...")
-    page1_v1 = _fetch(API_V1, {"roomid": room_id, "ruid": ruid, "page": 1, "page_size": PAGE_SIZE})
-    page1_v2 = _fetch(API_V2, {"roomid": room_id, "ruid": ruid, "page": 1, "page_size": PAGE_SIZE})
+    page1_v1 = _fetch(API_V1, {"roomid": room_id, "ruid": ruid, "page": 1, "page_size": PAGE_SIZE}, cookie_pool=cookie_pool)
+    page1_v2 = _fetch(API_V2, {"roomid": room_id, "ruid": ruid, "page": 1, "page_size": PAGE_SIZE}, cookie_pool=cookie_pool)
     total = page1_v2["info"]["num"]
     total_pages = page1_v2["info"]["page"]
     print(f"Total guards: {total}, Total pages: {total_pages}")
@@ -112,7 +124,8 @@ def scrape_all_guards(room_id: int, ruid: int, output_dir: str = None) -> list[d
     for page in range(2, total_pages + 1):
         print(f"Fetching page {page}/{total_pages}...", end=" ")
         try:
-            data = _fetch(API_V2, {"roomid": room_id, "ruid": ruid, "page": page, "page_size": PAGE_SIZE})
+            data = _fetch(API_V2, {"roomid": room_id, "ruid": ruid, "page": page, "page_size": PAGE_SIZE},
+                          cookie_pool=cookie_pool)
             items = []
             for item in data["list"]:
                 if item["uid"] not in seen_uids:
@@ -122,7 +135,6 @@ def scrape_all_guards(room_id: int, ruid: int, output_dir: str = None) -> list[d
             print(f"OK ({len(items)} items)")
         except Exception as e:
             print(f"FAILED: {e}", file=sys.stderr)
-        time.sleep(REQUEST_DELAY)
 
     return all_guards
 
@@ -156,23 +168,27 @@ def save_results(guards: list[dict], ruid: int, output_dir: str):
     print(f"Highest fan badge: Lv.{max_medal['medal_level']} ({max_medal['username']})")
 
 
-def main():
-    if len(sys.argv) >= 3:
-        room_id = int(sys.argv[1])
-        ruid = int(sys.argv[2])
-    elif len(sys.argv) >= 2:
-        ruid = int(sys.argv[1])
+def main(argv: list[str] = None):
+    argv = sys.argv if argv is None else [sys.argv[0]] + list(argv)
+    if len(argv) >= 3:
+        room_id = int(argv[1])
+        ruid = int(argv[2])
+    elif len(argv) >= 2:
+        ruid = int(argv[1])
         room_id = 8777
     else:
         room_id = 8777
         ruid = 37754047
 
-    output_dir = sys.argv[-1] if len(sys.argv) >= 4 and os.path.isdir(sys.argv[-1]) else str(Path(__file__).parent)
+    output_dir = argv[-1] if len(argv) >= 4 and os.path.isdir(argv[-1]) else str(Path(__file__).parent)
 
     print(f"Scraping guards: room_id={room_id}, ruid={ruid}")
     print(f"Output directory: {output_dir}")
     print()
 
+    # Page pacing comes from the adaptive per-host limiter instead of a fixed delay
+    enable_adaptive_rates()
+
     guards = scrape_all_guards(room_id, ruid, output_dir)
     save_results(guards, ruid, output_dir)
     return guards
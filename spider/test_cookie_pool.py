@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cookie 池单元测试
+覆盖：按等待时间轮换身份、单个 Cookie 过期停用、全部过期、刷新时保留健康状态、抓取器轮换 Cookie 与停用过期 Cookie
+
+用法:
+    python spider/test_cookie_pool.py
+"""
+
+import os
+import sys
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from cookie_pool import CookiePool
+from views_fetcher import AsyncViewsFetcher, CookieExpiredError, RateLimitedError
+
+
+class TestCookiePool(unittest.TestCase):
+    """Cookie 池测试"""
+
+    def make_pool(self, count, on_expired=None):
+        return CookiePool('bilibili', [(i, f'SESSDATA=c{i}') for i in range(count)], on_expired=on_expired)
+
+    def test_requests_spread_across_cookies(self):
+        """每个 Cookie 的桶容量用完后换下一个，请求均匀分摊"""
+        pool = self.make_pool(3)
+        used = Counter()
+        for _ in range(6):
+            cookie, wait = pool.reserve()
+            used[cookie.cookie_id] += 1
+        self.assertEqual(used, {0: 2, 1: 2, 2: 2})
+
+    def test_expired_cookie_disabled(self):
+        """过期的 Cookie 停用并回调一次，其余 Cookie 继续使用；全部过期后返回 None"""
+        expired = []
+        pool = self.make_pool(2, on_expired=lambda cookie: expired.append(cookie.cookie_id))
+        first = pool.acquire()
+        pool.report(first, expired=True)
+        pool.report(first, expired=True)
+        self.assertEqual(expired, [first.cookie_id])
+        self.assertEqual([c.cookie_id for c in pool.alive()], [1 - first.cookie_id])
+
+        pool.report(pool.acquire(), expired=True)
+        self.assertEqual(pool.reserve(), (None, 0.0))
+
+    def test_rate_limited_cookie_slows_down(self):
+        """限流只降低该 Cookie 的速率"""
+        pool = self.make_pool(2)
+        cookie = pool.acquire()
+        pool.report(cookie, rate_limited=True)
+        rates = {c['cookie_id']: c['rate'] for c in pool.stats()}
+        self.assertEqual(rates[cookie.cookie_id], 1.0)
+        self.assertEqual(rates[1 - cookie.cookie_id], 2.0)
+
+    def test_update_keeps_health(self):
+        """刷新 Cookie 列表：未变化的保留状态，更换内容的重新开始，消失的移除"""
+        pool = self.make_pool(3)
+        kept = pool._cookies[0]
+        kept.request_count = 5
+        pool.update([(0, 'SESSDATA=c0'), (1, 'SESSDATA=new'), (3, 'SESSDATA=c3')])
+        self.assertIs(pool._cookies[0], kept)
+        self.assertEqual(pool._cookies[1].request_count, 0)
+        self.assertEqual(sorted(pool._cookies), [0, 1, 3])
+
+
+class TestFetcherCookieRotation(unittest.TestCase):
+    """抓取器轮换 Cookie 测试"""
+
+    STAT = {'view': 100}
+
+    def test_fetcher_rotates_cookies(self):
+        """请求依次带上池中的 Cookie，限流反馈给对应的 Cookie"""
+        pool = CookiePool('bilibili', [(1, 'SESSDATA=a'), (2, 'SESSDATA=b')])
+        calls = []
+
+        def stat(bvid, cookie_string=None):
+            calls.append(cookie_string)
+            if len(calls) == 1:
+                raise RateLimitedError('-352')
+            return self.STAT
+
+        with patch('views_fetcher.get_pool', return_value=pool):
+            fetcher = AsyncViewsFetcher(concurrency=1, rps=1000, max_retries=1)
+        fetcher.RATE_LIMIT_BACKOFF = 0
+        with patch.object(fetcher, '_fetch_stat', side_effect=stat):
+            result = fetcher.crawl([{'platform': 'bilibili', 'work_id': f'BV{i}'} for i in range(4)])
+
+        self.assertEqual(result['success_count'], 4)
+        self.assertEqual(set(calls), {'SESSDATA=a', 'SESSDATA=b'})
+        self.assertEqual(sum(c['rate_limited_count'] for c in pool.stats()), 1)
+
+    def test_fetcher_disables_expired_cookie(self):
+        """返回 -101 的 Cookie 被停用，换下一个身份重试且不消耗重试次数"""
+        expired = []
+        pool = CookiePool(
+            'bilibili', [(1, 'SESSDATA=a'), (2, 'SESSDATA=b')],
+            on_expired=lambda cookie: expired.append(cookie.cookie_id)
+        )
+
+        def stat(bvid, cookie_string=None):
+            if cookie_string == 'SESSDATA=a':
+                raise CookieExpiredError('code=-101')
+            return self.STAT
+
+        with patch('views_fetcher.get_pool', return_value=pool):
+            fetcher = AsyncViewsFetcher(concurrency=1, rps=1000, max_retries=0)
+        with patch.object(fetcher, '_fetch_stat', side_effect=stat):
+            result = fetcher.crawl([{'platform': 'bilibili', 'work_id': f'BV{i}'} for i in range(3)])
+
+        self.assertEqual(result['success_count'], 3)
+        self.assertEqual(expired, [1])
+        self.assertEqual([c.cookie_id for c in pool.alive()], [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取运行指标单元测试
+覆盖：阶段耗时累加、分层请求统计汇总、JSON 与 Prometheus textfile 输出
+
+用法:
+    python spider/test_crawl_metrics.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from crawl_metrics import CrawlMetrics
+
+SUMMARY = {
+    'total_count': 10, 'success_count': 8, 'fail_count': 2, 'skip_count': 0, 'duration_seconds': 4.0,
+    'request_count': 13, 'retry_count': 3, 'rate_limited_count': 1, 'bytes_downloaded': 2048,
+}
+
+
+class TestCrawlMetrics(unittest.TestCase):
+    """运行指标测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+
+    def test_stage_durations_accumulate(self):
+        """同一阶段多次计时合计"""
+        metrics = CrawlMetrics()
+        metrics.add_stage('import', 0.5)
+        metrics.add_stage('import', 0.25)
+        metrics.add_stage('crawl', 3.0, tier='hot')
+
+        stages = {(item['stage'], item['tier']): item['seconds'] for item in metrics.as_dict()['stages']}
+        self.assertEqual(stages[('import', None)], 0.75)
+        self.assertEqual(stages[('crawl', 'hot')], 3.0)
+
+    def test_fetch_totals(self):
+        """分层统计与总计"""
+        metrics = CrawlMetrics()
+        metrics.record_fetch('hot', SUMMARY)
+        metrics.record_fetch('cold', SUMMARY)
+        data = metrics.as_dict()
+
+        self.assertEqual(data['tiers']['hot']['records_per_second'], 2.0)
+        self.assertEqual(data['totals']['request_count'], 26)
+        self.assertEqual(data['totals']['bytes_downloaded'], 4096)
+
+    def test_write_json_and_prometheus(self):
+        """输出文件可被解析"""
+        metrics = CrawlMetrics(mode='pipeline')
+        with metrics.stage('export', tier='hot'):
+            pass
+        metrics.record_fetch('hot', SUMMARY)
+        metrics.finish(success=True)
+
+        json_path = metrics.write_json(os.path.join(self.temp_dir, 'metrics', 'run.json'))
+        prom_path = metrics.write_prometheus(os.path.join(self.temp_dir, 'spider.prom'))
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['mode'], 'pipeline')
+        with open(prom_path, 'r', encoding='utf-8') as f:
+            prom = f.read()
+        self.assertIn('spider_crawl_request_count{job="tiered_views",tier="hot"} 13', prom)
+        self.assertIn('spider_crawl_success{job="tiered_views"} 1', prom)
+        self.assertFalse(os.path.exists(prom_path + '.tmp'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """
 满の动态爬虫单元测试
-覆盖：B站API解析、微博API解析、去重逻辑、Cookie过期检测
+覆盖：B站API解析、微博API解析、批量去重与写入、图片并发下载与回填、Cookie过期检测
 """
 import sys
 import os
+import threading
+import time
 import unittest
+from collections import Counter
 from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 
@@ -19,7 +22,10 @@ import django
 django.setup()
 
 sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
-from crawl_moments import BilibiliDynamicCrawler, WeiboDynamicCrawler, MomentSaver
+from cookie_pool import CookiePool
+from crawl_moments import BilibiliDynamicCrawler, WeiboDynamicCrawler, fetch_with_pool
+from moment_images import MomentImagePipeline
+from moment_saver import MomentSaver
 
 
 class TestBilibiliDynamicCrawler(unittest.TestCase):
@@ -329,62 +335,202 @@ class TestWeiboDynamicCrawler(unittest.TestCase):
         result = self.crawler._clean_html('纯文本无标签')
         self.assertEqual(result, '纯文本无标签')
 
+    def test_login_required_is_expiry(self):
+        """ok=-100 表示登录失效，其他非 ok 响应不算 Cookie 过期"""
+        self.crawler.session = MagicMock()
+        self.crawler.session.get.return_value.json.return_value = {'ok': -100, 'url': 'https://passport.weibo.cn/'}
+        self.assertEqual(self.crawler.fetch_dynamics('SUB=a'), (None, WeiboDynamicCrawler.LOGIN_REQUIRED_CODE))
+
+        self.crawler.session.get.return_value.json.return_value = {'ok': 0, 'msg': '这里还没有内容'}
+        self.assertEqual(self.crawler.fetch_dynamics('SUB=a'), ([], 1))
+
+    def test_pool_not_wiped_by_api_errors(self):
+        """接口异常（非登录失效）不会把池中的 Cookie 逐个标记为无效"""
+        pool = CookiePool('weibo', [(1, 'SUB=a'), (2, 'SUB=b')])
+        dynamics, code, has_cookie = fetch_with_pool(
+            pool, lambda cookie_string: (None, None),
+            lambda code: code == WeiboDynamicCrawler.LOGIN_REQUIRED_CODE
+        )
+        self.assertEqual((dynamics, code, has_cookie), (None, None, True))
+        self.assertEqual(len(pool.alive()), 2)
+
 
 class TestMomentSaver(unittest.TestCase):
     """动态保存器测试"""
 
-    @patch('crawl_moments.ImageService')
-    @patch('crawl_moments.Moment')
-    def test_skip_existing_moment(self, MockMoment, MockImageService):
-        """测试已存在动态跳过"""
-        MockMoment.objects.filter.return_value.exists.return_value = True
-
-        dynamics = [{
-            'source_id': 'exist001',
-            'content': '已存在',
-            'image_urls': [],
+    @staticmethod
+    def make_dynamic(source_id, image_urls=None):
+        return {
+            'source_id': source_id,
+            'content': f'动态{source_id}',
+            'image_urls': image_urls or [],
             'publish_time': datetime(2024, 6, 15),
             'like_count': 0,
             'comment_count': 0,
             'share_count': 0,
             'source_url': 'http://example.com',
-        }]
+        }
 
-        saved, skipped = MomentSaver.save_dynamics('weibo', dynamics)
+    def setUp(self):
+        patchers = [
+            patch('moment_saver.Moment'),
+            patch('moment_saver.get_pipeline'),
+            patch('moment_saver.transaction'),
+        ]
+        self.MockMoment, self.MockGetPipeline, self.MockTransaction = [p.start() for p in patchers]
+        self.pipeline = self.MockGetPipeline.return_value
+        for p in patchers:
+            self.addCleanup(p.stop)
+        self.existing = self.MockMoment.objects.filter.return_value.values_list
+
+    def test_skip_existing_moment(self):
+        """测试已存在动态跳过"""
+        self.existing.return_value = [('exist001', ['exist001_0.webp'])]
+
+        saved, skipped = MomentSaver.save_dynamics('weibo', [self.make_dynamic('exist001')])
         self.assertEqual(saved, 0)
         self.assertEqual(skipped, 1)
+        self.MockMoment.objects.bulk_create.assert_not_called()
 
-    @patch('crawl_moments.Moment')
-    @patch('crawl_moments.ImageService')
-    def test_save_new_moment(self, MockImageService, MockMoment):
-        """测试保存新动态"""
-        MockMoment.objects.filter.return_value.exists.return_value = False
-        MockImageService.download_and_generate_thumbnails.return_value = []
-
-        dynamics = [{
-            'source_id': 'new001',
-            'content': '新动态',
-            'image_urls': ['http://img.jpg'],
-            'publish_time': datetime(2024, 6, 15),
-            'like_count': 10,
-            'comment_count': 2,
-            'share_count': 1,
-            'source_url': 'http://example.com/new',
-        }]
+    def test_save_new_moment(self):
+        """测试保存新动态：先以空 images 写入，写入后提交图片下载（最多4张）"""
+        self.existing.return_value = []
+        calls = []
+        self.MockTransaction.atomic.return_value.__exit__.side_effect = lambda *args: calls.append('commit')
+        self.pipeline.submit.side_effect = lambda *args: calls.append('submit')
 
+        urls = [f'http://img{i}.jpg' for i in range(6)]
+        dynamics = [self.make_dynamic('new001', urls), self.make_dynamic('new002')]
         saved, skipped = MomentSaver.save_dynamics('bilibili', dynamics)
-        self.assertEqual(saved, 1)
+        self.assertEqual(saved, 2)
         self.assertEqual(skipped, 0)
-        self.assertTrue(MockMoment.objects.create.called)
+        self.assertEqual(self.MockMoment.call_args_list[0].kwargs['images'], [])
+        self.assertTrue(self.MockMoment.objects.bulk_create.call_args.kwargs['ignore_conflicts'])
+        self.pipeline.submit.assert_called_once_with('bilibili', 'new001', urls[:4])
+        self.assertEqual(calls, ['commit', 'submit'])
+
+    def test_requeue_missing_images(self):
+        """已入库但 images 仍为空的动态（上次回填前退出）重新提交下载，不重复写入"""
+        self.existing.return_value = [('old001', []), ('old002', ['old002_0.webp'])]
+        dynamics = [
+            self.make_dynamic('old001', ['http://img.jpg']),
+            self.make_dynamic('old002', ['http://img.jpg']),
+        ]
+        saved, skipped = MomentSaver.save_dynamics('weibo', dynamics)
+        self.assertEqual((saved, skipped), (0, 2))
+        self.MockMoment.objects.bulk_create.assert_not_called()
+        self.pipeline.submit.assert_called_once_with('weibo', 'old001', ['http://img.jpg'])
 
-    @patch('crawl_moments.Moment')
-    @patch('crawl_moments.ImageService')
-    def test_save_empty_dynamics(self, MockImageService, MockMoment):
+    def test_save_empty_dynamics(self):
         """测试保存空列表"""
         saved, skipped = MomentSaver.save_dynamics('weibo', [])
         self.assertEqual(saved, 0)
         self.assertEqual(skipped, 0)
-        MockMoment.objects.create.assert_not_called()
+        self.MockMoment.objects.bulk_create.assert_not_called()
+
+    def test_batched_queries(self):
+        """测试每批一次 IN 查询、一次批量写入，批内重复的 source_id 只保留一条"""
+        self.existing.side_effect = [[('d0', []), ('d1', [])], [], []]
+        dynamics = [self.make_dynamic(f'd{i}') for i in range(5)] + [self.make_dynamic('d4')]
+
+        saved, skipped = MomentSaver.save_dynamics('weibo', dynamics, batch_size=2)
+        self.assertEqual((saved, skipped), (3, 3))
+        self.assertEqual(self.MockMoment.objects.filter.call_count, 3)
+        self.assertEqual(
+            self.MockMoment.objects.filter.call_args_list[0].kwargs,
+            {'source': 'weibo', 'source_id__in': ['d0', 'd1']},
+        )
+        self.MockMoment.objects.bulk_create.assert_called_once()
+        self.assertEqual(len(self.MockMoment.objects.bulk_create.call_args.args[0]), 3)
+        self.MockTransaction.atomic.assert_called_once()
+
+
+class TestMomentImagePipeline(unittest.TestCase):
+    """图片下载管线测试"""
+
+    def setUp(self):
+        patchers = [
+            patch('moment_images.Moment'),
+            patch('moment_images.ImageService'),
+            patch('moment_images.connection'),
+        ]
+        self.MockMoment, self.MockImageService, self.MockConnection = [p.start() for p in patchers]
+        for p in patchers:
+            self.addCleanup(p.stop)
+
+    def test_backfills_images_with_per_host_limit(self):
+        """并发下载，同一图片主机不超过 per_host 个，完成后按 source_id 回填 images"""
+        lock = threading.Lock()
+        active, peak = Counter(), Counter()
+
+        def download(source, source_id, urls):
+            host = urls[0].split('/')[2]
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+            return [f'{source_id}.webp']
+
+        self.MockImageService.download_and_generate_thumbnails.side_effect = download
+        pipeline = MomentImagePipeline(max_workers=6, per_host=2)
+        self.addCleanup(pipeline.shutdown)
+        for i in range(6):
+            pipeline.submit('weibo', f'wb{i}', [f'https://wx1.sinaimg.cn/large/{i}.jpg'])
+            pipeline.submit('bilibili', f'bili{i}', [f'https://i0.hdslb.com/bfs/{i}.jpg'])
+        self.assertIsNone(pipeline.submit('weibo', 'noimg', []))
+
+        self.assertEqual(pipeline.wait(timeout=10), {'done': 12, 'failed': 0, 'pending': 0})
+        self.assertEqual(peak, {'wx1.sinaimg.cn': 2, 'i0.hdslb.com': 2})
+        self.MockMoment.objects.filter.assert_any_call(source='weibo', source_id='wb3')
+        self.MockMoment.objects.filter.return_value.update.assert_any_call(images=['wb3.webp'])
+        self.assertEqual(self.MockConnection.close.call_count, 12)
+
+    def test_mixed_hosts_hold_every_host_slot(self):
+        """一条动态的图片分布在多个主机时，下载期间占用每个主机的名额"""
+        started, release = threading.Event(), threading.Event()
+
+        def download(source, source_id, urls):
+            if source_id == 'mixed':
+                started.set()
+                release.wait(5)
+            return []
+
+        self.MockImageService.download_and_generate_thumbnails.side_effect = download
+        pipeline = MomentImagePipeline(max_workers=4, per_host=1)
+        self.addCleanup(pipeline.shutdown)
+        pipeline.submit('weibo', 'mixed', ['https://wx1.sinaimg.cn/a.jpg', 'https://wx2.sinaimg.cn/b.jpg'])
+        self.assertTrue(started.wait(5))
+        second = pipeline.submit('weibo', 'other', ['https://wx2.sinaimg.cn/c.jpg'])
+        time.sleep(0.1)
+        self.assertFalse(second.done())
+
+        release.set()
+        self.assertEqual(pipeline.wait(timeout=10)['done'], 2)
+
+    def test_inflight_moment_not_resubmitted(self):
+        """同一动态下载中时不重复提交，完成后可以再次提交"""
+        release = threading.Event()
+        self.MockImageService.download_and_generate_thumbnails.side_effect = lambda *args: release.wait(5) and []
+        pipeline = MomentImagePipeline(max_workers=2)
+        self.addCleanup(pipeline.shutdown)
+        self.assertIsNotNone(pipeline.submit('weibo', 'a', ['https://wx1.sinaimg.cn/a.jpg']))
+        self.assertIsNone(pipeline.submit('weibo', 'a', ['https://wx1.sinaimg.cn/a.jpg']))
+
+        release.set()
+        pipeline.wait(timeout=10)
+        self.assertIsNotNone(pipeline.submit('weibo', 'a', ['https://wx1.sinaimg.cn/a.jpg']))
+        self.assertEqual(pipeline.wait(timeout=10), {'done': 2, 'failed': 0, 'pending': 0})
+
+    def test_failure_counted(self):
+        """下载失败只计数，不影响其他动态"""
+        self.MockImageService.download_and_generate_thumbnails.side_effect = [OSError('timeout'), ['ok.webp']]
+        pipeline = MomentImagePipeline(max_workers=1)
+        self.addCleanup(pipeline.shutdown)
+        pipeline.submit('weibo', 'a', ['https://wx1.sinaimg.cn/a.jpg'])
+        pipeline.submit('weibo', 'b', ['https://wx1.sinaimg.cn/b.jpg'])
+        self.assertEqual(pipeline.wait(timeout=10), {'done': 1, 'failed': 1, 'pending': 0})
 
 
 if __name__ == '__main__':
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+粉丝数并发采样单元测试
+覆盖：账号配置去重与分组、并发采样保持顺序、限流后重试、业务错误不重试、进程内入库与可选归档
+
+用法:
+    python spider/test_follower_sampler.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+import get_bilibili_fans_count
+from follower_sampler import FollowerSampler, load_accounts
+from mock_upstream import MockUpstreamServer
+
+
+class TestLoadAccounts(unittest.TestCase):
+    """账号配置测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'accounts.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'accounts': [
+                {'uid': 1, 'name': '甲', 'group': 'self'},
+                {'uid': '2', 'group': 'artist'},
+                {'uid': 1, 'name': '重复', 'group': 'related'},
+            ]}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_dedupe_and_groups(self):
+        """按 uid 去重保留第一次出现的条目，缺省名称用 uid，可按分组过滤"""
+        self.assertEqual(load_accounts(self.path), [
+            {'uid': 1, 'name': '甲', 'group': 'self'},
+            {'uid': 2, 'name': '2', 'group': 'artist'},
+        ])
+        self.assertEqual([a['uid'] for a in load_accounts(self.path, ['artist'])], [2])
+
+    def test_default_config(self):
+        """仓库自带的配置可以读取"""
+        self.assertIn(37754047, [a['uid'] for a in load_accounts()])
+
+
+class TestFollowerSampler(unittest.TestCase):
+    """并发采样测试（本地模拟上游）"""
+
+    def sample(self, server, accounts, **kwargs):
+        with patch('follower_sampler.RELATION_API_URL', server.url('/x/relation/stat')), \
+                patch('follower_sampler.get_host_limiter', return_value=None):
+            sampler = FollowerSampler(**kwargs)
+            sampler.RATE_LIMIT_BACKOFF = 0.05
+            return sampler.sample(accounts)
+
+    def test_concurrent_sample_keeps_order(self):
+        """40 个账号并发采样：耗时远小于逐个请求，结果与输入顺序一致"""
+        accounts = [{'uid': uid, 'name': f'u{uid}'} for uid in range(100, 140)]
+        with MockUpstreamServer(latency_ms=50) as server:
+            started = time.monotonic()
+            results = self.sample(server, accounts, concurrency=8, rps=1000)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 40 * 0.05 / 2)
+        self.assertEqual([r['uid'] for r in results], [a['uid'] for a in accounts])
+        self.assertEqual([r['follower'] for r in results], [1000000 + a['uid'] for a in accounts])
+        self.assertTrue(all(r['status'] == 'success' and 'message' not in r for r in results))
+
+    def test_rate_limited_retry(self):
+        """首轮突发超出上游限流时退避重试，最终全部成功"""
+        accounts = [{'uid': uid, 'name': str(uid)} for uid in range(6)]
+        with MockUpstreamServer(throttle_rps=2, throttle_mode='code352') as server:
+            results = self.sample(server, accounts, concurrency=4, rps=1.5, max_retries=5)
+            self.assertGreater(server.throttled_count, 0)
+        self.assertTrue(all(r['status'] == 'success' for r in results))
+
+    def test_business_error_not_retried(self):
+        """账号不存在等业务错误直接返回 error，不重试"""
+        with MockUpstreamServer() as server:
+            with patch.dict('mock_upstream.GENERATORS', relation=lambda params: {'code': -404, 'message': '啥都木有'}):
+                results = self.sample(server, [{'uid': 1, 'name': '甲'}])
+            self.assertEqual(server.request_count, 1)
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertEqual(results[0]['message'], '啥都木有')
+
+
+
+class TestFansCountMain(unittest.TestCase):
+    """粉丝数入口：进程内入库与可选归档"""
+
+    RESULTS = [
+        {'uid': 1, 'name': '甲', 'follower': 10, 'status': 'success', 'timestamp': '2026-02-06 14:00:00'},
+        {'uid': 2, 'name': '乙', 'follower': None, 'status': 'error', 'timestamp': '2026-02-06 14:00:00'},
+    ]
+    SUMMARY = {'success': 1, 'failed': 1, 'created_accounts': 0}
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def run_main(self, **kwargs):
+        with patch('get_bilibili_fans_count.FollowerSampler.sample', return_value=self.RESULTS), \
+                patch('get_bilibili_fans_count.setup_django'), \
+                patch('get_bilibili_fans_count.write_series') as series, \
+                patch('get_bilibili_fans_count.ingest_samples', return_value=self.SUMMARY) as ingest, \
+                patch('get_bilibili_fans_count.register_file') as register, \
+                patch('get_bilibili_fans_count.mark_file_imported') as mark:
+            output = get_bilibili_fans_count.main(**kwargs)
+        series.assert_called_once_with(self.RESULTS, series.call_args.args[1])
+        return output, ingest, register, mark
+
+    def test_ingest_and_archive(self):
+        """入库与归档使用同一采样时间，入库成功后归档文件标记为已导入"""
+        output, ingest, register, mark = self.run_main(ingest=True)
+        self.assertEqual(output['ingest'], self.SUMMARY)
+        with open(output['file'], 'r', encoding='utf-8') as f:
+            archived = json.load(f)
+        self.assertEqual(archived['accounts'], self.RESULTS)
+        results, crawl_time = ingest.call_args.args
+        self.assertEqual(results, self.RESULTS)
+        self.assertEqual(crawl_time.strftime('%Y-%m-%d %H:%M:%S'), archived['update_time'])
+        register.assert_called_once()
+        mark.assert_called_once_with(output['file'], 'fans_count', row_count=1)
+
+    def test_ingest_without_archive(self):
+        """关闭归档时不写文件、不登记清单"""
+        output, ingest, register, mark = self.run_main(ingest=True, archive=False)
+        self.assertIsNone(output['file'])
+        self.assertEqual(os.listdir(self.temp_dir), [])
+        ingest.assert_called_once()
+        register.assert_not_called()
+        mark.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+粉丝数时间序列单元测试
+覆盖：差分编码往返、追加与乱序合并、跨天读取、重采样取区间内最后一次采样、缺失区间插值
+
+用法:
+    python spider/test_follower_series.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from follower_series import FollowerSeriesStore, decode_points, encode_points
+
+DAY = datetime(2026, 2, 6)
+
+
+class TestEncoding(unittest.TestCase):
+    """差分编码测试"""
+
+    def test_round_trip(self):
+        """粉丝数增减都能还原，10 分钟间隔的小幅变化每个点不超过 4 字节"""
+        points = [(0, 2741652), (600, 2741660), (1200, 2741590), (86399, 2741600)]
+        self.assertEqual(decode_points(encode_points(points)), points)
+
+        dense = [(i * 600, 2741652 + i * 3) for i in range(144)]
+        blob = encode_points(dense)
+        self.assertEqual(decode_points(blob), dense)
+        self.assertLessEqual(len(blob), 8 + 4 * len(dense))
+
+    def test_append_continues_deltas(self):
+        """追加编码以已有最后一个点为起点，拼接后与整体编码一致"""
+        points = [(0, 100), (600, 105), (1200, 103)]
+        self.assertEqual(encode_points(points[:2]) + encode_points(points[2:], points[1]), encode_points(points))
+
+
+class TestFollowerSeriesStore(unittest.TestCase):
+    """存储与重采样测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = FollowerSeriesStore(os.path.join(self.temp_dir, 'follower_series.sqlite3')).connect()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def add(self, minutes, count, uid=1):
+        self.store.add_samples([(uid, DAY + timedelta(minutes=minutes), count)])
+
+    def test_append_and_out_of_order(self):
+        """每个账号每天一行；乱序采样合并，重复时刻以后写入的为准"""
+        for minutes, count in [(0, 100), (10, 110), (30, 130), (20, 999), (20, 120)]:
+            self.add(minutes, count)
+        self.add(24 * 60 + 5, 140)
+
+        samples = self.store.load_samples(1, DAY, DAY + timedelta(days=2))
+        self.assertEqual([c for _, c in samples], [100, 110, 120, 130, 140])
+        self.assertEqual(self.store.storage_stats()['rows'], 2)
+        self.assertEqual(self.store.storage_stats()['samples'], 5)
+
+    def test_add_results_skips_failures(self):
+        """采样器结果中失败的账号不写入"""
+        results = [
+            {'uid': 1, 'follower': 10, 'status': 'success'},
+            {'uid': 2, 'follower': None, 'status': 'error'},
+        ]
+        self.assertEqual(self.store.add_results(results, DAY), 1)
+        self.assertEqual(self.store.load_samples(2, DAY, DAY + timedelta(days=1)), [])
+
+    def test_series_interpolates_gaps(self):
+        """10 分钟分辨率：有采样的点取区间内最后一次采样，失败留下的空缺按前后采样插值"""
+        for minutes, count in [(0, 100), (10, 110), (40, 140), (50, 150)]:
+            self.add(minutes, count)
+        series = self.store.load_series(1, DAY, DAY + timedelta(hours=1), timedelta(minutes=10))
+
+        self.assertEqual([p['follower_count'] for p in series], [100, 110, 120, 130, 140, 150])
+        self.assertEqual([p['interpolated'] for p in series], [False, False, True, True, False, False])
+        self.assertEqual([p['delta'] for p in series], [None, 10, 10, 10, 10, 10])
+
+    def test_coarse_resolution_takes_last_sample(self):
+        """小时分辨率取每小时内最后一次采样，序列截止到最后一次采样"""
+        for minutes, count in [(5, 100), (55, 150), (65, 160), (115, 200)]:
+            self.add(minutes, count)
+        series = self.store.load_series(1, DAY + timedelta(hours=1), DAY + timedelta(hours=5))
+
+        self.assertEqual([(p['time'].hour, p['follower_count']) for p in series], [(1, 150)])
+        series = self.store.load_series(1, DAY + timedelta(hours=1), DAY + timedelta(hours=2))
+        self.assertEqual([(p['time'].hour, p['follower_count']) for p in series], [(1, 150)])
+
+        series = self.store.load_series(1, DAY + timedelta(minutes=115), DAY + timedelta(hours=5))
+        self.assertEqual([p['follower_count'] for p in series], [200])
+
+    def test_gap_across_window_start(self):
+        """缺失区间跨越查询起点时，起点仍按前后采样插值"""
+        self.add(-60, 100)
+        self.add(60, 120)
+        series = self.store.load_series(1, DAY, DAY + timedelta(hours=1))
+        self.assertEqual([(p['follower_count'], p['interpolated']) for p in series], [(110, True), (120, False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 客户端单元测试
+覆盖：跨会话复用长连接、close 不关闭共享连接池、5xx 重试、默认超时与限速、Cookie 字符串
+
+用法:
+    python spider/test_http_client.py
+"""
+
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+import http_client
+from http_client import PooledSession, shared_adapter
+from mock_upstream import MockUpstreamServer
+
+
+class FlakyServer:
+    """前 failures 次请求返回 503，之后返回 200"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.request_count = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.request_count += 1
+                status = 503 if server.request_count <= server.failures else 200
+                self.send_response(status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class TestPooledSession(unittest.TestCase):
+    """共享连接池会话测试"""
+
+    def test_sessions_share_keepalive_connection(self):
+        """不同会话、多次请求复用同一条长连接，关闭会话后连接仍可复用"""
+        with MockUpstreamServer() as server:
+            url = server.url('/x/relation/stat')
+            first = PooledSession({'Referer': 'https://www.bilibili.com'})
+            for uid in range(3):
+                self.assertEqual(first.get(url, params={'vmid': uid}).json()['code'], 0)
+            first.close()
+
+            second = PooledSession({'Referer': 'https://live.bilibili.com'})
+            self.assertEqual(second.get(url).status_code, 200)
+
+            port = server._httpd.server_address[1]
+            pools = shared_adapter().poolmanager.pools
+            opened = sum(pools[key].num_connections for key in pools.keys() if key.key_port == port)
+            self.assertEqual(opened, 1)
+            self.assertEqual(server.request_count, 4)
+
+    def test_retries_server_errors(self):
+        """5xx 由连接池重试，重试用尽后返回最后一次响应"""
+        with FlakyServer(failures=2) as server:
+            response = PooledSession().get(server.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(server.request_count, 3)
+
+        with FlakyServer(failures=5) as server:
+            response = PooledSession(max_retries=0).get(server.url)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(server.request_count, 1)
+
+    def test_default_timeout_and_throttle(self):
+        """未指定超时时使用会话默认超时，请求前按主机限速、响应后反馈限流；throttled=False 时都不做"""
+        session = PooledSession(timeout=3)
+        with patch.object(http_client, 'throttle') as mock_throttle, \
+                patch.object(http_client, 'report') as mock_report, \
+                patch('requests.Session.request') as mock_request:
+            mock_request.return_value.status_code = 412
+            mock_request.return_value.content = b''
+            session.get('https://api.bilibili.com/x/relation/stat')
+            mock_throttle.assert_called_once_with('https://api.bilibili.com/x/relation/stat')
+            mock_report.assert_called_once_with('https://api.bilibili.com/x/relation/stat', True)
+            self.assertEqual(mock_request.call_args.kwargs['timeout'], 3)
+
+            PooledSession(throttled=False).get('https://api.bilibili.com/x/relation/stat', timeout=1)
+            self.assertEqual(mock_throttle.call_count, 1)
+            self.assertEqual(mock_report.call_count, 1)
+            self.assertEqual(mock_request.call_args.kwargs['timeout'], 1)
+
+    def test_cookie_string(self):
+        """Cookie 字符串逐项写入，忽略不含 = 的片段"""
+        session = PooledSession()
+        session.set_cookie_string('SESSDATA=abc; bili_jct=x=y; broken', '.bilibili.com')
+        self.assertEqual(session.cookies.get_dict(), {'SESSDATA': 'abc', 'bili_jct': 'x=y'})
+
+
+if __name__ == '__main__':
+    unittest.main()
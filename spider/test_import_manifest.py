@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导入清单单元测试
+覆盖：登记与最新文件查询、已导入判断（文件改写后失效、只改修改时间时比较哈希）、待导入列表、目录扫描登记
+
+用法:
+    python spider/test_import_manifest.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from import_manifest import KIND_FANS, KIND_VIEWS, STATUS_IMPORTED, ImportManifest, file_hash
+
+
+class TestImportManifest(unittest.TestCase):
+    """导入清单测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manifest = ImportManifest(os.path.join(self.temp_dir, 'manifest.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, name, content='{}'):
+        path = os.path.join(self.temp_dir, 'fans_count', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_latest_by_slot(self):
+        """最新文件按文件名中的时段排序，与登记顺序无关"""
+        newer = self.write('b_fans_count_2026-02-06-14.json')
+        older = self.write('b_fans_count_2026-02-06-09.json')
+        self.manifest.register(newer, KIND_FANS)
+        self.manifest.register(older, KIND_FANS)
+
+        latest = self.manifest.latest(KIND_FANS)
+        self.assertEqual(latest['data_slot'], '2026-02-06 14')
+        self.assertEqual(latest['path'], os.path.abspath(newer))
+        self.assertIsNone(self.manifest.latest(KIND_VIEWS))
+
+    def test_imported_until_rewritten(self):
+        """导入后登记哈希与行数；文件被改写后视为未导入，重新登记回到 written"""
+        path = self.write('b_fans_count_2026-02-06-14.json', '{"accounts": []}')
+        self.manifest.register(path, KIND_FANS)
+        self.assertFalse(self.manifest.is_imported(path))
+
+        self.manifest.mark_imported(path, KIND_FANS, row_count=2)
+        entry = self.manifest.get(path)
+        self.assertEqual((entry['status'], entry['row_count']), (STATUS_IMPORTED, 2))
+        self.assertEqual(entry['content_hash'], file_hash(path))
+        self.assertTrue(self.manifest.is_imported(path))
+
+        # 同一文件重复登记不改变导入状态
+        self.manifest.register(path, KIND_FANS)
+        self.assertTrue(self.manifest.is_imported(path))
+
+        time.sleep(0.01)
+        self.write('b_fans_count_2026-02-06-14.json', '{"accounts": [1]}')
+        self.assertFalse(self.manifest.is_imported(path))
+        self.manifest.register(path, KIND_FANS)
+        self.assertEqual([e['path'] for e in self.manifest.pending(KIND_FANS)], [os.path.abspath(path)])
+
+    def test_touched_file_compares_hash(self):
+        """只有修改时间变化、内容未变的文件仍视为已导入，清单中的修改时间随之更新"""
+        path = self.write('b_fans_count_2026-02-06-14.json', '{"accounts": [1]}')
+        self.manifest.mark_imported(path, KIND_FANS, row_count=1)
+        mtime_ns = os.stat(path).st_mtime_ns + 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+        self.assertTrue(self.manifest.is_imported(path))
+        self.assertEqual(self.manifest.get(path)['mtime_ns'], mtime_ns)
+
+        # 大小相同、内容不同
+        self.write('b_fans_count_2026-02-06-14.json', '{"accounts": [2]}')
+        os.utime(path, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+        self.assertFalse(self.manifest.is_imported(path))
+
+    def test_deleted_file_stays_imported(self):
+        """已导入的文件归档删除后仍视为已导入"""
+        path = self.write('b_fans_count_2026-02-06-14.json')
+        self.manifest.mark_imported(path, KIND_FANS, row_count=1)
+        os.remove(path)
+        self.assertTrue(self.manifest.is_imported(path))
+
+    def test_scan(self):
+        """扫描目录登记已有文件，重复扫描不重复登记、不覆盖导入状态"""
+        first = self.write('2026/02/b_fans_count_2026-02-06-14.json')
+        self.write('2026/02/b_fans_count_2026-02-06-15.json')
+        self.write('2026/02/other.json')
+        self.manifest.mark_imported(first, KIND_FANS)
+
+        root = os.path.join(self.temp_dir, 'fans_count')
+        self.assertEqual(self.manifest.scan(KIND_FANS, root), 1)
+        self.assertEqual(self.manifest.scan(KIND_FANS, root), 0)
+        self.assertTrue(self.manifest.is_imported(first))
+        self.assertEqual(len(self.manifest.pending(KIND_FANS)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
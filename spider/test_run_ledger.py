@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行台账单元测试
+覆盖：追加记录、失败查询、耗时统计、分层计数、旧版 JSON 日志导入
+
+用法:
+    python spider/test_run_ledger.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from run_ledger import RunLedger, import_json_log, record_run
+
+
+class TestRunLedger(unittest.TestCase):
+    """运行台账测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.db_path = os.path.join(self.temp_dir, 'logs', 'crawl_runs.sqlite3')
+        self.ledger = RunLedger(self.db_path)
+
+    def test_recent_and_failures(self):
+        """最近记录按时间倒序，失败查询只返回失败记录"""
+        self.ledger.record('moments', '2026-01-01 10:00:00', '2026-01-01 10:00:30', True)
+        self.ledger.record('moments', '2026-01-01 10:05:00', '2026-01-01 10:05:10', False, 'cookie 失效')
+
+        recent = self.ledger.recent('moments')
+        self.assertEqual([row['start_time'] for row in recent], ['2026-01-01 10:05:00', '2026-01-01 10:00:00'])
+        self.assertEqual(recent[1]['duration_seconds'], 30)
+
+        failures = self.ledger.recent(failures_only=True)
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]['error_message'], 'cookie 失效')
+
+    def test_duration_stats(self):
+        """按任务统计运行次数、失败次数与耗时"""
+        self.ledger.record('fans_count', '2026-01-01 10:00:00', '2026-01-01 10:00:04', True)
+        self.ledger.record('fans_count', '2026-01-01 11:00:00', '2026-01-01 11:00:08', False)
+
+        stats = self.ledger.duration_stats(datetime(2026, 1, 1))
+        self.assertEqual(stats, [{
+            'job': 'fans_count', 'runs': 2, 'failures': 1, 'avg_seconds': 6.0,
+            'max_seconds': 8.0, 'last_run': '2026-01-01 11:00:00',
+        }])
+
+    def test_tier_counts(self):
+        """分层计数单独成表"""
+        tiers = {
+            'hot': {'success_count': 2, 'request_count': 2, 'crawl_seconds': 0.5},
+            'cold': {'success_count': 60, 'fail_count': 3, 'request_count': 70, 'retry_count': 7},
+        }
+        run_id = record_run('tiered_views', datetime.now() - timedelta(minutes=3), True,
+                            tiers=tiers, db_path=self.db_path)
+
+        rows = self.ledger.tier_counts()
+        self.assertEqual({row['tier']: row['success_count'] for row in rows}, {'hot': 2, 'cold': 60})
+        self.assertTrue(all(row['id'] == run_id for row in rows))
+
+    def test_import_json_log(self):
+        """导入旧版 cron 脚本的 JSON 数组日志"""
+        path = os.path.join(self.temp_dir, 'bilibili_fans_count.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([
+                {'start_time': '2026-01-01 10:00:00', 'end_time': '2026-01-01 10:00:05', 'exit_code': 0,
+                 'status': 'success', 'error_message': '', 'summary': '✓ 咻咻满\n'},
+                {'start_time': '2026-01-01 11:00:00', 'end_time': '2026-01-01 11:00:05', 'exit_code': 1,
+                 'status': 'failed', 'error_message': 'exit code 1', 'summary': ''},
+            ], f, ensure_ascii=False)
+
+        self.assertEqual(import_json_log(self.ledger, path, 'fans_count'), 2)
+        rows = self.ledger.recent('fans_count')
+        self.assertEqual([row['success'] for row in rows], [0, 1])
+        self.assertEqual(rows[1]['summary'], '✓ 咻咻满')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -329,6 +329,21 @@ class TestParallelCrawlFeatures(unittest.TestCase):
         self.assertTrue(hasattr(rtc, 'export_and_crawl_tier'))
         self.assertTrue(callable(rtc.export_and_crawl_tier))
 
+    def test_single_tier_pipeline_uses_streaming_crawl(self):
+        """--hot/--cold 搭配 --pipeline 时走流水线入库，而不是爬取后合并导入"""
+        sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+        import run_tiered_crawler as rtc
+        
+        results = {"tiers": {"hot": {"status": "success"}}, "metrics": {}}
+        with patch.object(rtc, 'run_streaming_crawl', return_value=(True, results, 'archive')) as streaming, \
+                patch.object(rtc, 'run_parallel_crawl') as parallel:
+            success, info = rtc.run_crawl_pipeline(rtc.WorkTier.HOT, "views_hot.json", pipeline=True)
+        
+        self.assertTrue(success)
+        self.assertEqual(info["status"], "success")
+        self.assertEqual(streaming.call_args.kwargs["tiers"], [rtc.WorkTier.HOT])
+        parallel.assert_not_called()
+
 
 class TestIntegration(unittest.TestCase):
     """集成测试"""
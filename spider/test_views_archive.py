@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投稿爬取结果月度归档单元测试
+覆盖：按列归档与还原、合并文件优先、旧版 JSON、增量重归档、删除原文件、归档与原文件混合读取
+
+用法:
+    python spider/test_views_archive.py
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+import views_archive
+from test_views_records import make_record, write_hour
+
+
+class TestViewsArchive(unittest.TestCase):
+    """月度归档测试"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_hour(self, date_str, hour_str, suffix, count, view_count=100):
+        return write_hour(self.data_dir, date_str, hour_str, suffix, count, view_count)
+
+    def sessions(self, start, end):
+        return [
+            (list(records), summary, date_str, hour_str)
+            for records, summary, date_str, hour_str in views_archive.iter_sessions(start, end, self.data_dir)
+        ]
+
+    def test_roundtrip_prefers_merged(self):
+        """有合并文件的小时只归档合并文件，记录按列还原"""
+        self.write_hour('2026-01-06', '14', 'hot', 2)
+        self.write_hour('2026-01-06', '14', 'merged', 3)
+        self.write_hour('2026-01-06', '15', 'hot', 1)
+        self.write_hour('2026-01-06', '15', 'cold', 2)
+
+        result = views_archive.compact_month('2026-01', data_dir=self.data_dir)
+        self.assertEqual(result['sessions'], 3)
+        self.assertEqual(result['records'], 6)
+        self.assertTrue(result['path'].endswith('views_2026-01.ndjson.gz'))
+
+        blocks = list(views_archive.iter_archive_blocks(result['path']))
+        self.assertEqual(blocks[0]['source'], '2026-01-06-14_views_data_merged.ndjson')
+        self.assertEqual(blocks[0]['summary']['session_id'], 'merged_2026-01-0614')
+        self.assertEqual(blocks[0]['errors'], [{'work_id': 'BVbad', 'error': 'gone', 'status': 'failed'}])
+        self.assertEqual(list(views_archive.block_records(blocks[0])), [make_record(i, crawl_time='2026-01-06T14:00:05') for i in range(3)])
+
+    def test_legacy_json(self):
+        """旧版整文件 JSON 同样归档"""
+        day_dir = os.path.join(self.data_dir, '2026', '01', '02')
+        os.makedirs(day_dir)
+        with open(os.path.join(day_dir, '2026-01-02-08_views_data.json'), 'w', encoding='utf-8') as f:
+            json.dump({'session_id': 'legacy', 'data': [make_record(1), make_record(2)]}, f, indent=2)
+
+        result = views_archive.compact_month('2026-01', data_dir=self.data_dir)
+        self.assertEqual(result['records'], 2)
+        sessions = self.sessions('2026-01-01', '2026-01-31')
+        self.assertEqual(sessions[0][1], {'session_id': 'legacy'})
+        self.assertEqual(sessions[0][2:], ('2026-01-02', '08'))
+
+    def test_delete_and_recompact(self):
+        """删除原文件后补写的小时可增量并入已有归档"""
+        self.write_hour('2026-01-06', '14', 'merged', 2)
+        result = views_archive.compact_month('2026-01', delete=True, data_dir=self.data_dir)
+        self.assertEqual(result['deleted'], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, '2026', '01', '06')))
+
+        self.write_hour('2026-01-07', '00', 'merged', 3)
+        result = views_archive.compact_month('2026-01', delete=True, data_dir=self.data_dir)
+        self.assertEqual((result['sessions'], result['records']), (2, 5))
+        self.assertEqual(views_archive.scan_month('2026-01', self.data_dir), {})
+
+    def test_mixed_read_in_order(self):
+        """归档与未归档文件按 (日期, 小时) 顺序合并读取，原文件优先"""
+        self.write_hour('2026-01-06', '14', 'merged', 2)
+        self.write_hour('2026-01-06', '16', 'merged', 2)
+        views_archive.compact_month('2026-01', delete=True, data_dir=self.data_dir)
+        self.write_hour('2026-01-06', '15', 'merged', 1)
+        self.write_hour('2026-01-06', '16', 'merged', 4, view_count=500)
+        self.write_hour('2026-02-01', '00', 'merged', 1)
+
+        sessions = self.sessions('2026-01-06', '2026-02-01')
+        self.assertEqual([(s[2], s[3]) for s in sessions],
+                         [('2026-01-06', '14'), ('2026-01-06', '15'), ('2026-01-06', '16'), ('2026-02-01', '00')])
+        self.assertEqual(len(sessions[2][0]), 4)
+        self.assertEqual(sessions[2][0][0]['view_count'], 500)
+        self.assertEqual(len(self.sessions('2026-01-06', '2026-01-06')), 3)
+
+if __name__ == '__main__':
+    unittest.main()
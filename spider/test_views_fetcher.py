@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步并发抓取引擎单元测试
+覆盖：令牌桶限速、AIMD 自适应限速与速率持久化、并发抓取结果汇总、限流/不存在稿件的重试策略、断点续爬、模拟上游端到端请求
+
+用法:
+    python spider/test_views_fetcher.py
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+import rate_control
+from rate_control import AdaptiveRateLimiter, TokenBucket, is_rate_limited
+from views_fetcher import AsyncViewsFetcher, RateLimitedError, WorkNotFoundError
+from views_records import CrawlCheckpoint
+from mock_upstream import MockUpstreamServer
+
+
+def make_works(count, **extra):
+    return [
+        dict({'platform': 'bilibili', 'work_id': f'BV{i:03d}', 'title': f'作品{i}', 'is_valid': True}, **extra)
+        for i in range(count)
+    ]
+
+
+class TestTokenBucket(unittest.TestCase):
+    """令牌桶测试"""
+
+    def test_burst_does_not_wait(self):
+        """桶容量内的请求无需等待"""
+        bucket = TokenBucket(rate=10, burst=3)
+        waits = [bucket.reserve() for _ in range(3)]
+        self.assertEqual(waits, [0.0, 0.0, 0.0])
+
+    def test_over_budget_waits(self):
+        """超出桶容量后按速率排队"""
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.reserve()
+        wait = bucket.reserve()
+        self.assertAlmostEqual(wait, 0.1, delta=0.02)
+        wait = bucket.reserve()
+        self.assertAlmostEqual(wait, 0.2, delta=0.02)
+
+    def test_invalid_rate(self):
+        """速率必须为正数"""
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    """AIMD 自适应限速测试"""
+
+    def test_additive_increase_until_max(self):
+        """正常响应线性加速，不超过上限"""
+        limiter = AdaptiveRateLimiter(2.0, min_rate=0.5, max_rate=3.0, increase=0.2)
+        limiter.record_success()
+        self.assertAlmostEqual(limiter.rate, 2.1)
+        for _ in range(100):
+            limiter.record_success()
+        self.assertEqual(limiter.rate, 3.0)
+
+    def test_multiplicative_decrease_with_cooldown(self):
+        """限流时速率减半，冷却期内的多次限流只降一次，不低于下限"""
+        limiter = AdaptiveRateLimiter(4.0, min_rate=0.5, max_rate=8.0, cooldown=60)
+        self.assertTrue(limiter.record_throttled())
+        self.assertFalse(limiter.record_throttled())
+        self.assertEqual(limiter.rate, 2.0)
+
+        limiter = AdaptiveRateLimiter(4.0, min_rate=1.5, max_rate=8.0, cooldown=0)
+        for _ in range(5):
+            limiter.record_throttled()
+        self.assertEqual(limiter.rate, 1.5)
+
+    def test_rate_limit_detection(self):
+        """HTTP 412/429 与 B站风控返回码判定为限流"""
+        self.assertTrue(is_rate_limited(412))
+        self.assertTrue(is_rate_limited(200, b'{"code":-352,"message":"-352"}'))
+        self.assertTrue(is_rate_limited(200, '{ "code": -799, "message": "请求过于频繁"}'.encode('utf-8')))
+        self.assertFalse(is_rate_limited(200, b'{"code":0,"data":{"view":-352}}'))
+        self.assertFalse(is_rate_limited(200, b'{"ok":1}'))
+
+    def test_learned_rate_persisted(self):
+        """学到的速率保存后，下次注册时从该速率开始"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = os.path.join(temp_dir, 'rate_state.json')
+
+        with patch.object(rate_control, '_host_limiters', {}), patch.object(rate_control, '_state_path', path):
+            limiter = rate_control.enable_adaptive_rates(state_path=path)['api.bilibili.com']
+            self.assertEqual(rate_control.save_rate_state(), 0)
+            limiter.record_throttled()
+            rate_control.report('https://api.live.bilibili.com/x', rate_limited=True)
+            self.assertEqual(rate_control.save_rate_state(), 2)
+
+        with patch.object(rate_control, '_host_limiters', {}), patch.object(rate_control, '_state_path', path):
+            limiters = rate_control.enable_adaptive_rates(state_path=path)
+            self.assertEqual(limiters['api.bilibili.com'].rate, 2.0)
+            self.assertEqual(limiters['api.live.bilibili.com'].rate, 1.0)
+            self.assertEqual(limiters['m.weibo.cn'].rate, 1.0)
+
+    def test_explicit_cap_overrides_learned_rate(self):
+        """显式上限（--rps）低于学到的速率时从上限开始，之后也不再超过"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = os.path.join(temp_dir, 'rate_state.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'api.bilibili.com': {'rate': 10.0, 'updated_at': '2026-01-01T00:00:00'}}, f)
+
+        with patch.object(rate_control, '_host_limiters', {}), patch.object(rate_control, '_state_path', path):
+            limiter = rate_control.enable_adaptive_rates(state_path=path)['api.bilibili.com']
+            self.assertEqual(limiter.rate, 10.0)
+            rate_control.enable_adaptive_rates(state_path=path, max_rates={'api.bilibili.com': 3.0})
+            self.assertEqual(limiter.rate, 3.0)
+            for _ in range(100):
+                limiter.record_success()
+            self.assertEqual(limiter.rate, 3.0)
+            self.assertEqual(rate_control.save_rate_state(), 0)
+
+
+class TestAsyncViewsFetcher(unittest.TestCase):
+    """异步抓取器测试"""
+
+    STAT = {'view': 100, 'danmaku': 2, 'reply': 3, 'like': 4, 'coin': 5, 'favorite': 6, 'share': 7}
+
+    def test_crawl_collects_all_records(self):
+        """所有作品都被抓取，统计字段映射正确"""
+        fetcher = AsyncViewsFetcher(concurrency=4, rps=1000)
+        with patch.object(fetcher, '_fetch_stat', return_value=self.STAT):
+            result = fetcher.crawl(make_works(10))
+
+        self.assertEqual(result['total_count'], 10)
+        self.assertEqual(result['success_count'], 10)
+        self.assertEqual(result['fail_count'], 0)
+        record = result['data'][0]
+        self.assertEqual(record['view_count'], 100)
+        self.assertEqual(record['comment_count'], 3)
+        self.assertEqual(record['status'], 'success')
+
+    def test_requests_run_concurrently(self):
+        """请求并发执行，耗时远小于串行"""
+        def slow_stat(bvid):
+            time.sleep(0.1)
+            return self.STAT
+
+        fetcher = AsyncViewsFetcher(concurrency=8, rps=1000)
+        with patch.object(fetcher, '_fetch_stat', side_effect=slow_stat):
+            started = time.monotonic()
+            result = fetcher.crawl(make_works(16))
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(result['success_count'], 16)
+        self.assertLess(elapsed, 0.8)
+
+    def test_generator_consumed_outside_event_loop(self):
+        """生成器（如惰性查询数据库的作品源）在进入事件循环前消费完"""
+        def lazy_works():
+            for work in make_works(5):
+                # Django 在有运行中的事件循环时拒绝数据库访问（SynchronousOnlyOperation）
+                with self.assertRaises(RuntimeError):
+                    asyncio.get_running_loop()
+                yield work
+
+        fetcher = AsyncViewsFetcher(concurrency=2, rps=1000)
+        with patch.object(fetcher, '_fetch_stat', return_value=self.STAT):
+            result = fetcher.crawl(lazy_works())
+
+        self.assertEqual(result['success_count'], 5)
+
+    def test_invalid_works_skipped(self):
+        """失效作品被跳过"""
+        fetcher = AsyncViewsFetcher(rps=1000)
+        with patch.object(fetcher, '_fetch_stat', return_value=self.STAT) as mock_stat:
+            result = fetcher.crawl(make_works(3, is_valid=False))
+
+        self.assertEqual(result['skip_count'], 3)
+        mock_stat.assert_not_called()
+
+    def test_not_found_not_retried(self):
+        """不存在的稿件不重试"""
+        fetcher = AsyncViewsFetcher(rps=1000, max_retries=3)
+        with patch.object(fetcher, '_fetch_stat', side_effect=WorkNotFoundError('gone')) as mock_stat:
+            result = fetcher.crawl(make_works(1))
+
+        self.assertEqual(result['fail_count'], 1)
+        self.assertEqual(mock_stat.call_count, 1)
+        self.assertEqual(result['errors'][0]['work_id'], 'BV000')
+
+    def test_rate_limited_retried(self):
+        """限流后退避重试"""
+        fetcher = AsyncViewsFetcher(rps=1000, max_retries=2)
+        fetcher.RATE_LIMIT_BACKOFF = 0
+        with patch.object(fetcher, '_fetch_stat', side_effect=[RateLimitedError('412'), self.STAT]):
+            result = fetcher.crawl(make_works(1))
+
+        self.assertEqual(result['success_count'], 1)
+        self.assertEqual(result['request_count'], 2)
+        self.assertEqual(result['retry_count'], 1)
+        self.assertEqual(result['rate_limited_count'], 1)
+
+    def test_rate_limited_slows_shared_limiter(self):
+        """限流反馈给主机共享的自适应限速器"""
+        limiter = AdaptiveRateLimiter(1000.0, min_rate=1.0, max_rate=2000.0)
+        with patch('views_fetcher.get_host_limiter', return_value=limiter):
+            fetcher = AsyncViewsFetcher(max_retries=2)
+        fetcher.RATE_LIMIT_BACKOFF = 0
+        with patch.object(fetcher, '_fetch_stat', side_effect=[RateLimitedError('-352'), self.STAT]):
+            fetcher.crawl(make_works(1))
+
+        self.assertAlmostEqual(limiter.rate, 500.0 + limiter.increase / 500.0)
+
+    def test_own_budget_respected_with_shared_limiter(self):
+        """共享限速器很宽松时，抓取器仍不超过自己的 rps 预算"""
+        limiter = AdaptiveRateLimiter(1000.0, min_rate=1.0, max_rate=2000.0)
+        with patch('views_fetcher.get_host_limiter', return_value=limiter):
+            fetcher = AsyncViewsFetcher(concurrency=1, rps=20)
+        with patch.object(fetcher, '_fetch_stat', return_value=self.STAT):
+            started = time.monotonic()
+            result = fetcher.crawl(make_works(6))
+            elapsed = time.monotonic() - started
+
+        self.assertIs(fetcher.limiter, limiter)
+        self.assertEqual(result['success_count'], 6)
+        self.assertGreaterEqual(elapsed, 0.2)
+
+    def test_resume_from_checkpoint(self):
+        """中途中断后重新执行，只请求未完成的作品"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = os.path.join(temp_dir, 'hot.ndjson.checkpoint')
+        calls = []
+
+        def dying_stat(bvid):
+            calls.append(bvid)
+            if len(calls) > 4:
+                raise KeyboardInterrupt
+            return self.STAT
+
+        fetcher = AsyncViewsFetcher(concurrency=1, rps=1000)
+        with patch.object(fetcher, '_fetch_stat', side_effect=dying_stat):
+            with self.assertRaises(KeyboardInterrupt):
+                fetcher.crawl(make_works(10), checkpoint=CrawlCheckpoint(path))
+
+        fetcher = AsyncViewsFetcher(concurrency=1, rps=1000)
+        with patch.object(fetcher, '_fetch_stat', return_value=self.STAT) as mock_stat:
+            result = fetcher.crawl(make_works(10), checkpoint=CrawlCheckpoint(path))
+
+        self.assertEqual(mock_stat.call_count, 6)
+        self.assertEqual(result['success_count'], 10)
+        self.assertEqual(sorted(r['work_id'] for r in result['data']), [f'BV{i:03d}' for i in range(10)])
+
+    def test_checkpoint_partial_line_truncated(self):
+        """断点末尾写了一半的行在读取时截掉，之后追加的记录不会拼接在残行后面"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        path = os.path.join(temp_dir, 'hot.ndjson.checkpoint')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"work_id": "BV000", "view_count": 1}\n{"work_id": "BV0')
+
+        checkpoint = CrawlCheckpoint(path)
+        self.assertEqual(list(checkpoint.load()), ['BV000'])
+        checkpoint.append({'work_id': 'BV001', 'view_count': 2})
+        checkpoint.close()
+
+        self.assertEqual(sorted(CrawlCheckpoint(path).load()), ['BV000', 'BV001'])
+
+
+class TestFetcherAgainstMockUpstream(unittest.TestCase):
+    """通过本地模拟上游发起真实 HTTP 请求"""
+
+    def test_http_round_trip(self):
+        """响应解析与线上接口一致"""
+        with MockUpstreamServer() as server:
+            fetcher = AsyncViewsFetcher(concurrency=2, rps=1000)
+            with patch('views_fetcher.STAT_API_URL', server.url('/x/web-interface/archive/stat')):
+                result = fetcher.crawl(make_works(5))
+
+        self.assertEqual(result['success_count'], 5)
+        self.assertGreater(result['data'][0]['view_count'], 10000)
+        self.assertGreater(result['bytes_downloaded'], 0)
+
+    def test_bytes_downloaded_counts_compressed_size(self):
+        """下载字节数按压缩后的传输大小统计，而不是解压后的响应体"""
+        with MockUpstreamServer(gzip=True) as server:
+            fetcher = AsyncViewsFetcher(concurrency=1, rps=1000)
+            with patch('views_fetcher.STAT_API_URL', server.url('/x/web-interface/archive/stat')):
+                result = fetcher.crawl(make_works(1))
+            response = requests.get(server.url('/x/web-interface/archive/stat'), params={'bvid': 'BV000'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(result['success_count'], 1)
+        self.assertEqual(result['bytes_downloaded'], int(response.headers['Content-Length']))
+        self.assertLess(result['bytes_downloaded'], len(response.content))
+
+    def test_risk_control_code_is_rate_limited(self):
+        """code=-352 按限流处理"""
+        with MockUpstreamServer(throttle_rps=1, throttle_mode='code352') as server:
+            fetcher = AsyncViewsFetcher(concurrency=1, rps=1000, max_retries=0)
+            with patch('views_fetcher.STAT_API_URL', server.url('/x/web-interface/archive/stat')):
+                result = fetcher.crawl(make_works(2))
+            self.assertEqual(server.throttled_count, 1)
+
+        self.assertEqual(result['success_count'], 1)
+        self.assertEqual(result['fail_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
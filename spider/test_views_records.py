@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NDJSON 爬取结果格式与流式导入单元测试
+覆盖：写入/读取、summary 尾部读取、流式合并、分批导入与会话幂等、变化存储与阶梯还原、日/周汇总与压缩
+
+用法:
+    python spider/test_views_records.py
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from views_records import NdjsonWriter, iter_records, iter_lines, merge_ndjson, read_summary
+from views_store import MetricsStore
+
+
+def make_record(i, view_count=100, crawl_time='2026-02-06T14:30:05'):
+    """测试用作品记录（test_views_archive / test_views_replay 共用）"""
+    return {
+        'platform': 'bilibili',
+        'work_id': f'BV{i:04d}',
+        'title': f'作品"{i}"',
+        'crawl_time': crawl_time,
+        'view_count': view_count + i,
+        'like_count': i,
+        'status': 'success',
+    }
+
+
+def write_hour(data_dir, date_str, hour_str, suffix, count, view_count=100):
+    """按爬取结果目录结构写入一个小时的 NDJSON 文件（count 条记录 + 1 条失败），返回路径"""
+    path = os.path.join(data_dir, date_str[:4], date_str[5:7], date_str[8:10],
+                        f"{date_str}-{hour_str}_views_data_{suffix}.ndjson")
+    writer = NdjsonWriter(path)
+    for i in range(count):
+        writer.write_record(make_record(i, view_count, f'{date_str}T{hour_str}:00:05'))
+    writer.write_error({'work_id': 'BVbad', 'error': 'gone', 'status': 'failed'})
+    writer.close({'session_id': f'{suffix}_{date_str}{hour_str}', 'total_count': count + 1})
+    return path
+
+
+class TestNdjsonFormat(unittest.TestCase):
+    """NDJSON 读写测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_file(self, name, count, summary):
+        path = os.path.join(self.temp_dir, name)
+        writer = NdjsonWriter(path)
+        for i in range(count):
+            writer.write_record(make_record(i))
+        writer.write_error({'work_id': 'BVbad', 'error': 'gone', 'status': 'failed'})
+        writer.close(summary)
+        return path
+
+    def test_records_and_summary(self):
+        """记录与 summary 可分别读取"""
+        path = self.write_file('hot.ndjson', 3, {'session_id': 's1', 'total_count': 4, 'success_count': 3})
+        records = list(iter_records(path))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]['title'], '作品"0"')
+        summary = read_summary(path)
+        self.assertEqual(summary['session_id'], 's1')
+        self.assertEqual(summary['success_count'], 3)
+
+    def test_summary_tail_read_on_large_file(self):
+        """大文件只读尾部也能取到 summary"""
+        path = self.write_file('big.ndjson', 2000, {'session_id': 'big', 'total_count': 2001})
+        self.assertEqual(read_summary(path)['total_count'], 2001)
+
+    def test_abort_leaves_no_file(self):
+        """写入异常时不留下半成品"""
+        path = os.path.join(self.temp_dir, 'broken.ndjson')
+        with self.assertRaises(RuntimeError):
+            with NdjsonWriter(path) as writer:
+                writer.write_record(make_record(1))
+                raise RuntimeError('boom')
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    def test_merge_accumulates_counters(self):
+        """合并时转写记录并累加统计"""
+        hot = self.write_file('hot.ndjson', 2, {'total_count': 3, 'success_count': 2, 'fail_count': 1})
+        cold = self.write_file('cold.ndjson', 5, {'total_count': 6, 'success_count': 5, 'fail_count': 1})
+        merged_path = os.path.join(self.temp_dir, 'merged.ndjson')
+
+        merged = merge_ndjson([hot, cold], merged_path, {'session_id': 'merged_1'})
+
+        self.assertEqual(merged['total_count'], 9)
+        self.assertEqual(merged['success_count'], 7)
+        self.assertEqual(len(list(iter_records(merged_path))), 7)
+        summaries = [obj for obj in iter_lines(merged_path) if obj.get('_meta') == 'summary']
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(read_summary(merged_path)['session_id'], 'merged_1')
+
+
+class TestStreamingImport(unittest.TestCase):
+    """流式导入测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'view_data.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_import_generator_in_batches(self):
+        """生成器输入分批写入"""
+        records = (make_record(i) for i in range(1234))
+        with MetricsStore(self.db_path, batch_size=100) as store:
+            imported = store.import_records(records, {'session_id': 's1'}, '2026-02-06', '14')
+        self.assertEqual(imported, 1234)
+
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute(
+            "SELECT crawl_time, view_count FROM work_metrics WHERE work_id = 'BV0001'"
+        ).fetchone()
+        conn.close()
+        self.assertEqual(row, ('14:30:05', 101))
+
+    def test_session_idempotent(self):
+        """同一会话未强制时不重复导入"""
+        with MetricsStore(self.db_path) as store:
+            store.import_records([make_record(1)], {'session_id': 's1'}, '2026-02-06', '14')
+            self.assertEqual(store.import_records([make_record(1)], {'session_id': 's1'}, '2026-02-06', '14'), 0)
+            self.assertEqual(
+                store.import_records([make_record(1)], {'session_id': 's1'}, '2026-02-06', '14', force=True), 1
+            )
+
+    def test_upsert_updates_in_place(self):
+        """重复导入同一小时时原地更新指标，不删除重建行"""
+        with MetricsStore(self.db_path) as store:
+            store.import_records([make_record(1)], {'session_id': 's1'}, '2026-02-06', '14')
+            row_id = store.conn.execute("SELECT id FROM work_metrics WHERE work_id = 'BV0001'").fetchone()[0]
+            store.import_records(
+                [make_record(1, view_count=500)], {'session_id': 's1'}, '2026-02-06', '14', force=True
+            )
+            rows = store.conn.execute("SELECT id, view_count FROM work_metrics").fetchall()
+        self.assertEqual(rows, [(row_id, 501)])
+
+    def test_import_sessions_single_transaction(self):
+        """多会话回放导入，已导入的会话被跳过"""
+        with MetricsStore(self.db_path) as store:
+            store.import_records([make_record(0)], {'session_id': 'h00'}, '2026-02-06', '00')
+            imported = store.import_sessions(
+                ([make_record(i) for i in range(3)], {'session_id': f'h{hour:02d}'}, '2026-02-06', f'{hour:02d}')
+                for hour in range(3)
+            )
+        self.assertEqual(imported, 6)
+
+
+class TestDeltaStorage(unittest.TestCase):
+    """变化存储测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'view_data.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_unchanged_rows_skipped(self):
+        """计数未变化的采样不写入 work_metrics"""
+        with MetricsStore(self.db_path, delta=True) as store:
+            for hour, view_count in (('00', 100), ('08', 100), ('16', 200)):
+                store.write_batch([make_record(1, view_count), make_record(2)], '2026-02-06', hour)
+            rows = store.conn.execute(
+                "SELECT work_id, crawl_hour FROM work_metrics ORDER BY work_id, crawl_hour"
+            ).fetchall()
+            latest = store.conn.execute(
+                "SELECT last_seen_hour, prev_seen_hour, prev_view_count FROM work_metrics_latest WHERE work_id = 'BV0002'"
+            ).fetchone()
+        self.assertEqual(rows, [('BV0001', '00'), ('BV0001', '16'), ('BV0002', '00')])
+        self.assertEqual(store.unchanged_count, 3)
+        self.assertEqual(latest, ('16', '08', 102))
+
+    def test_step_series(self):
+        """阶梯函数还原到最近一次采样为止"""
+        with MetricsStore(self.db_path, delta=True) as store:
+            for hour, view_count in (('00', 100), ('01', 100), ('02', 150), ('03', 150)):
+                store.write_batch([make_record(0, view_count)], '2026-02-06', hour)
+            series = store.load_series('bilibili', 'BV0000', datetime(2026, 2, 5, 23), datetime(2026, 2, 6, 6))
+        self.assertEqual(
+            [(item['slot'].hour, item['view_count']) for item in series],
+            [(0, 100), (1, 100), (2, 150), (3, 150)]
+        )
+
+    def test_out_of_order_replay_stored(self):
+        """早于最近采样的时段无法判断是否变化，直接写入且不回退最近状态"""
+        with MetricsStore(self.db_path, delta=True) as store:
+            store.write_batch([make_record(1)], '2026-02-06', '16')
+            store.write_batch([make_record(1)], '2026-02-06', '08')
+            count = store.conn.execute("SELECT COUNT(*) FROM work_metrics").fetchone()[0]
+            latest = store.conn.execute("SELECT last_seen_hour FROM work_metrics_latest").fetchone()[0]
+        self.assertEqual(count, 2)
+        self.assertEqual(latest, '16')
+
+
+class TestRollups(unittest.TestCase):
+    """日/周汇总与保留策略测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'view_data.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def import_day(self, store, crawl_date, views):
+        for hour, view_count in enumerate(views):
+            store.write_batch([make_record(0, view_count)], crawl_date, f'{hour:02d}')
+
+    def test_daily_and_weekly(self):
+        """日汇总增量维护，周汇总由日汇总重算"""
+        with MetricsStore(self.db_path) as store:
+            self.import_day(store, '2026-02-09', [100, 150, 160])
+            self.import_day(store, '2026-02-10', [160, 400])
+            day = store.load_rollup('bilibili', 'BV0000', '2026-02-09', '2026-02-09')[0]
+            week = store.load_rollup('bilibili', 'BV0000', '2026-02-10', '2026-02-15', 'week')[0]
+
+        self.assertEqual((day['samples'], day['view_first'], day['view_count'], day['view_max_delta']),
+                         (3, 100, 160, 50))
+        self.assertEqual((week['period'], week['samples'], week['view_first'], week['view_count'], week['view_max_delta']),
+                         ('2026-02-09', 5, 100, 400, 240))
+
+    def test_rebuild_matches_incremental(self):
+        """全量重算结果与增量维护一致"""
+        with MetricsStore(self.db_path) as store:
+            self.import_day(store, '2026-02-09', [100, 150, 120])
+            before = store.load_rollup('bilibili', 'BV0000', '2026-02-09', '2026-02-09')
+            self.assertEqual(store.rebuild_rollups('2026-02-01', '2026-02-28'), 1)
+            after = store.load_rollup('bilibili', 'BV0000', '2026-02-09', '2026-02-09')
+        self.assertEqual(before, after)
+        self.assertEqual((after[0]['view_min'], after[0]['view_max'], after[0]['view_count']), (100, 150, 120))
+
+    def test_compact_keeps_last_sample_per_day(self):
+        """压缩后每天只保留最后一次采样，汇总不变，重复压缩不再处理"""
+        with MetricsStore(self.db_path) as store:
+            self.import_day(store, '2026-01-01', [100, 110, 130])
+            self.import_day(store, '2026-03-01', [200, 210])
+            result = store.compact_raw(keep_days=30, today=datetime(2026, 3, 1))
+            rows = store.conn.execute('SELECT crawl_date, crawl_hour FROM work_metrics ORDER BY crawl_date, crawl_hour').fetchall()
+            day = store.load_rollup('bilibili', 'BV0000', '2026-01-01', '2026-01-01')[0]
+            again = store.compact_raw(keep_days=30, today=datetime(2026, 3, 1) + timedelta(days=1))
+
+        self.assertEqual(result, {'days': 1, 'deleted': 2})
+        self.assertEqual(rows, [('2026-01-01', '02'), ('2026-03-01', '00'), ('2026-03-01', '01')])
+        self.assertEqual((day['samples'], day['view_max_delta']), (3, 20))
+        self.assertEqual(again, {'days': 0, 'deleted': 0})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投稿爬取结果批量回放单元测试
+覆盖：归档与原文件混合回放、并行解析、幂等跳过、强制重放后汇总不重复计数
+
+用法:
+    python spider/test_views_replay.py
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+import views_archive
+from test_views_records import write_hour as write_merged_hour
+from views_replay import ReplayProgress, replay
+from views_store import MetricsStore
+
+
+def write_hour(data_dir, date_str, hour_str, count, view_count):
+    return write_merged_hour(data_dir, date_str, hour_str, 'merged', count, view_count)
+
+
+class TestViewsReplay(unittest.TestCase):
+    """批量回放测试"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.data_dir, 'view_data.sqlite3')
+        # 1 月已归档，2 月为原文件
+        for day in ('2026-01-30', '2026-01-31'):
+            for hour in range(3):
+                write_hour(self.data_dir, day, f'{hour:02d}', 5, 100 + hour * 10)
+        views_archive.compact_month('2026-01', delete=True, data_dir=self.data_dir)
+        write_hour(self.data_dir, '2026-02-01', '00', 5, 200)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def replay(self, workers=0, force=False):
+        return replay('2026-01-01', '2026-02-28', force=force, workers=workers,
+                      db_path=self.db_path, data_dir=self.data_dir)
+
+    def daily(self, day):
+        with MetricsStore(self.db_path) as store:
+            return store.load_rollup('bilibili', 'BV0001', day, day)[0]
+
+    def test_replay_and_idempotent(self):
+        """回放全部会话，重复执行只跳过"""
+        result = self.replay()
+        self.assertEqual((result['days'], result['sessions'], result['records']), (3, 7, 35))
+        self.assertEqual(result['rollup_days'], 3)
+        self.assertEqual(self.daily('2026-01-30')['view_count'], 121)
+        self.assertEqual(self.daily('2026-01-30')['samples'], 3)
+
+        result = self.replay()
+        self.assertEqual((result['sessions'], result['skipped'], result['records']), (0, 7, 0))
+
+    def test_parallel_matches_serial(self):
+        """并行解析与主进程解析结果一致"""
+        result = self.replay(workers=2)
+        self.assertEqual(result['records'], 35)
+        with MetricsStore(self.db_path) as store:
+            rows = store.conn.execute(
+                'SELECT crawl_date, crawl_hour, view_count FROM work_metrics ORDER BY 1, 2, 3'
+            ).fetchall()
+        self.assertEqual(len(rows), 35)
+        self.assertEqual(rows[-1], ('2026-02-01', '00', 204))
+
+    def test_force_does_not_double_count(self):
+        """强制重放后汇总由小时数据重算，采样次数不翻倍"""
+        self.replay()
+        result = self.replay(force=True)
+        self.assertEqual(result['records'], 35)
+        self.assertEqual(self.daily('2026-01-31')['samples'], 3)
+
+    def test_force_keeps_retention(self):
+        """强制重放已压缩的日期后重新压缩，保留策略不被撤销，汇总仍按完整小时数据计算"""
+        self.replay()
+        with MetricsStore(self.db_path) as store:
+            compacted = store.compact_raw(keep_days=1, today=datetime(2026, 2, 1))
+        self.assertEqual(compacted['days'], 1)
+
+        result = self.replay(force=True)
+        self.assertEqual(result['recompacted_days'], 1)
+        self.assertEqual(self.daily('2026-01-30')['samples'], 3)
+        with MetricsStore(self.db_path) as store:
+            rows = store.conn.execute(
+                "SELECT crawl_hour FROM work_metrics WHERE crawl_date = '2026-01-30' AND work_id = 'BV0001'"
+            ).fetchall()
+            self.assertEqual(rows, [('02',)])
+            self.assertEqual(store.compacted_dates(['2026-01-30', '2026-01-31']), ['2026-01-30'])
+            self.assertEqual(store.compact_raw(keep_days=1, today=datetime(2026, 2, 1))['days'], 0)
+
+    def test_progress(self):
+        """非终端输出每天一行进度"""
+        stream = io.StringIO()
+        replay('2026-01-30', '2026-02-01', workers=0, db_path=self.db_path, data_dir=self.data_dir,
+               progress=ReplayProgress('2026-01-30', '2026-02-01', stream))
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[-1].startswith('[   3/3] 2026-02-01'))
+
+
+if __name__ == '__main__':
+    unittest.main()
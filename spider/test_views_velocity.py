@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+播放增速自适应分层单元测试
+覆盖：增速计算、级别匹配、间隔内错峰、冷数据滚动分桶
+
+用法:
+    python spider/test_views_velocity.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'spider'))
+
+from views_store import MetricsStore
+from views_tiering import current_bucket, work_bucket
+from views_velocity import UNKNOWN_INTERVAL_HOURS, crawl_interval, is_due, load_view_velocity
+
+
+class TestViewVelocity(unittest.TestCase):
+    """增速计算与分级测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'view_data.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def import_sample(self, store, work_id, slot, view_count):
+        record = {'platform': 'bilibili', 'work_id': work_id, 'view_count': view_count}
+        store.write_batch([record], slot.strftime('%Y-%m-%d'), slot.strftime('%H'))
+
+    def test_velocity_uses_latest_two_samples(self):
+        """增速取最近两次采样，早期的平稳数据不会稀释突然增长"""
+        now = datetime(2026, 2, 10, 12)
+        with MetricsStore(self.db_path) as store:
+            self.import_sample(store, 'BVviral', now - timedelta(days=7), 1000)
+            self.import_sample(store, 'BVviral', now - timedelta(hours=4), 1000)
+            self.import_sample(store, 'BVviral', now - timedelta(hours=1), 7000)
+            self.import_sample(store, 'BVonce', now - timedelta(hours=1), 500)
+
+        velocities = load_view_velocity(self.db_path, now)
+        self.assertEqual(velocities[('bilibili', 'BVviral')], 2000)
+        self.assertNotIn(('bilibili', 'BVonce'), velocities)
+
+    def test_velocity_with_delta_storage(self):
+        """变化存储下未变化的采样不在 work_metrics 中，增速仍按最近两次采样计算"""
+        now = datetime(2026, 2, 10, 12)
+        with MetricsStore(self.db_path, delta=True) as store:
+            self.import_sample(store, 'BVflat', now - timedelta(hours=10), 1000)
+            self.import_sample(store, 'BVflat', now - timedelta(hours=6), 1600)
+            self.import_sample(store, 'BVflat', now - timedelta(hours=2), 1600)
+            self.import_sample(store, 'BVgrow', now - timedelta(hours=6), 1000)
+            self.import_sample(store, 'BVgrow', now - timedelta(hours=2), 1400)
+
+        velocities = load_view_velocity(self.db_path, now)
+        self.assertEqual(velocities[('bilibili', 'BVflat')], 0)
+        self.assertEqual(velocities[('bilibili', 'BVgrow')], 100)
+
+    def test_missing_database(self):
+        """数据库不存在时没有增速数据"""
+        self.assertEqual(load_view_velocity(os.path.join(self.temp_dir, 'none.sqlite3')), {})
+
+    def test_interval_levels(self):
+        """增速越高间隔越短"""
+        self.assertEqual(crawl_interval(500), 1)
+        self.assertEqual(crawl_interval(50), 3)
+        self.assertEqual(crawl_interval(5), 24)
+        self.assertEqual(crawl_interval(0), 168)
+        self.assertEqual(crawl_interval(None), UNKNOWN_INTERVAL_HOURS)
+
+    def test_due_once_per_interval(self):
+        """每个作品在一个间隔内恰好到期一次，且不同作品分散在不同小时"""
+        start = datetime(2026, 2, 10, 0)
+        hours = [start + timedelta(hours=h) for h in range(24)]
+        due_hours = set()
+        for i in range(200):
+            due = [h for h in hours if is_due(f'BV{i:04d}', 24, h)]
+            self.assertEqual(len(due), 1)
+            due_hours.add(due[0].hour)
+        self.assertGreater(len(due_hours), 12)
+
+
+class TestRollingBuckets(unittest.TestCase):
+    """冷数据滚动分桶测试"""
+
+    def test_each_work_crawled_three_times_a_day(self):
+        """8 个桶时每个作品每天恰好爬取 3 次，间隔 8 小时"""
+        start = datetime(2026, 2, 10, 0)
+        for i in range(50):
+            work_id = f'BV{i:04d}'
+            hours = [
+                h for h in range(24)
+                if work_bucket(work_id, 8) == current_bucket(start + timedelta(hours=h), 8)
+            ]
+            self.assertEqual(len(hours), 3)
+            self.assertEqual([b - a for a, b in zip(hours, hours[1:])], [8, 8])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投稿爬取结果月度归档
+把 data/spider/views/YYYY/MM/DD/ 下一个月的每小时爬取文件（NDJSON / 旧版整文件 JSON）折叠为一个压缩归档文件，
+并提供按日期范围读取会话的接口，回放与回填时归档和尚未归档的文件可以混合读取。
+
+路径: spider/views_archive.py
+
+归档格式:
+    data/spider/views/YYYY/MM/views_YYYY-MM.ndjson.gz（安装了 zstandard 时可选 .ndjson.zst）
+    每行是一个爬取会话（一个小时的一个结果文件），作品记录按列存储，相同字段名不再逐条重复：
+    {"date": "2026-02-06", "hour": "14", "source": "2026-02-06-14_views_data_merged.ndjson",
+     "summary": {...}, "rows": 142, "columns": {"work_id": [...], "view_count": [...], ...}, "errors": [...]}
+
+    同一小时有合并文件（_merged）时只归档合并文件，分层文件内容与其重复；没有合并文件时各分层文件分别归档。
+
+用法:
+    python spider/views_archive.py compact 2026-01                  # 归档一个月（保留原文件）
+    python spider/views_archive.py compact --before 2026-02 --delete  # 归档此前所有月份并删除原文件
+    python spider/views_archive.py list
+    python spider/views_replay.py --start 2026-01-01 --end 2026-01-31   # 回放入库见 views_replay
+
+    from views_archive import iter_sessions
+    store.import_sessions(iter_sessions('2026-01-01', '2026-01-31'))
+"""
+
+import argparse
+import gzip
+import heapq
+import io
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import views_records
+from views_records import iter_lines
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_PREFIX = 'views_'
+
+# 压缩方式 -> 归档文件扩展名
+CODEC_EXTENSIONS = {
+    'gzip': '.ndjson.gz',
+    'zstd': '.ndjson.zst',
+}
+DEFAULT_CODEC = 'gzip'
+
+# gzip 压缩级别：6 与 9 的体积相差很小，速度快得多
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+# {date}-{hour}_views_data[_{suffix}].ndjson|json
+SOURCE_FILE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})-(\d{2})_views_data(?:_([A-Za-z0-9]+))?\.(ndjson|json)$')
+
+MERGED_SUFFIX = 'merged'
+
+# 归档行按固定字段顺序、紧凑分隔符写出，行首即为会话键
+BLOCK_KEY_RE = re.compile(r'^\{"date":"([0-9-]+)","hour":"([0-9]+)","source":"([^"]*)"')
+
+Session = Tuple[Iterator[Dict[str, Any]], Dict[str, Any], str, str]
+
+
+def _data_dir(data_dir: Optional[str]) -> str:
+    # 运行时读取模块属性，测试 / 基准替换 VIEWS_DATA_DIR 后同样生效
+    return data_dir or views_records.VIEWS_DATA_DIR
+
+
+def archive_path(month: str, codec: str = DEFAULT_CODEC, data_dir: Optional[str] = None) -> str:
+    """
+    月度归档文件路径
+
+    Args:
+        month: 月份 (YYYY-MM)
+        codec: gzip 或 zstd
+
+    Returns:
+        str: data/spider/views/YYYY/MM/views_YYYY-MM.ndjson.gz
+    """
+    return os.path.join(_data_dir(data_dir), month[:4], month[5:7], f"{ARCHIVE_PREFIX}{month}{CODEC_EXTENSIONS[codec]}")
+
+
+def find_archive(month: str, data_dir: Optional[str] = None) -> Optional[str]:
+    """返回已存在的月度归档路径，没有时返回 None"""
+    for codec in CODEC_EXTENSIONS:
+        path = archive_path(month, codec, data_dir)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _codec_of(path: str) -> str:
+    for codec, ext in CODEC_EXTENSIONS.items():
+        if path.endswith(ext):
+            return codec
+    raise ValueError(f"无法识别的归档格式: {path}")
+
+
+def _open_archive(path: str, mode: str, codec: Optional[str] = None):
+    """以文本方式打开归档文件（mode 为 'r' 或 'w'，codec 为空时按扩展名判断）"""
+    codec = codec or _codec_of(path)
+    if codec == 'gzip':
+        if mode == 'w':
+            return gzip.open(path, 'wt', encoding='utf-8', compresslevel=GZIP_LEVEL)
+        return gzip.open(path, 'rt', encoding='utf-8')
+
+    if zstandard is None:
+        raise RuntimeError("读写 .zst 归档需要安装 zstandard")
+    raw = open(path, 'wb' if mode == 'w' else 'rb')
+    if mode == 'w':
+        stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+    else:
+        stream = zstandard.ZstdDecompressor().stream_reader(raw)
+    return io.TextIOWrapper(stream, encoding='utf-8')
+
+
+def iter_months(start_date: str, end_date: str) -> Iterator[str]:
+    """[start_date, end_date] 覆盖的月份 (YYYY-MM)"""
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    end = (int(end_date[:4]), int(end_date[5:7]))
+    while (year, month) <= end:
+        yield f"{year:04d}-{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def list_months(data_dir: Optional[str] = None) -> List[str]:
+    """数据目录下存在的月份（有日目录或归档文件）"""
+    root = _data_dir(data_dir)
+    months = []
+    if not os.path.isdir(root):
+        return months
+    for year in sorted(os.listdir(root)):
+        year_dir = os.path.join(root, year)
+        if not (year.isdigit() and os.path.isdir(year_dir)):
+            continue
+        for month in sorted(os.listdir(year_dir)):
+            if month.isdigit() and os.path.isdir(os.path.join(year_dir, month)):
+                months.append(f"{year}-{month}")
+    return months
+
+
+class SourceFile:
+    """一个每小时爬取结果文件"""
+
+    def __init__(self, path: str, date_str: str, hour_str: str, suffix: Optional[str], ext: str):
+        self.path = path
+        self.date = date_str
+        self.hour = hour_str
+        self.suffix = suffix or ''
+        self.ext = ext
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def load(self) -> Tuple[Iterator[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        读取文件内容
+
+        Returns:
+            tuple: (作品记录迭代器, 错误信息列表, summary)；NDJSON 文件的记录逐行读取
+        """
+        if self.ext == 'json':
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            records = data.pop('data', [])
+            return iter(records), [], data
+
+        errors: List[Dict[str, Any]] = []
+        summary: Dict[str, Any] = {}
+
+        def records() -> Iterator[Dict[str, Any]]:
+            for obj in iter_lines(self.path):
+                meta = obj.pop('_meta', None)
+                if meta is None:
+                    yield obj
+                elif meta == 'summary':
+                    summary.update(obj)
+                else:
+                    errors.append(obj)
+
+        return records(), errors, summary
+
+
+def scan_month(month: str, data_dir: Optional[str] = None) -> Dict[Tuple[str, str], List[SourceFile]]:
+    """
+    扫描一个月的每小时爬取文件
+
+    Returns:
+        dict: {(日期, 小时): [该小时的所有结果文件]}（不含断点文件与写了一半的 .tmp 文件）
+    """
+    month_dir = os.path.join(_data_dir(data_dir), month[:4], month[5:7])
+    hours: Dict[Tuple[str, str], List[SourceFile]] = {}
+    if not os.path.isdir(month_dir):
+        return hours
+    for day in sorted(os.listdir(month_dir)):
+        day_dir = os.path.join(month_dir, day)
+        if not os.path.isdir(day_dir):
+            continue
+        for name in sorted(os.listdir(day_dir)):
+            match = SOURCE_FILE_RE.match(name)
+            if not match:
+                continue
+            date_str, hour_str, suffix, ext = match.groups()
+            hours.setdefault((date_str, hour_str), []).append(
+                SourceFile(os.path.join(day_dir, name), date_str, hour_str, suffix, ext)
+            )
+    return hours
+
+
+def select_sources(files: List[SourceFile]) -> List[SourceFile]:
+    """
+    选出一个小时中需要导入 / 归档的文件
+
+    有合并文件时只取合并文件；否则取各分层文件。同一后缀同时有 NDJSON 和旧版 JSON 时取 NDJSON。
+    """
+    by_suffix: Dict[str, SourceFile] = {}
+    for source in files:
+        current = by_suffix.get(source.suffix)
+        if current is None or (current.ext == 'json' and source.ext == 'ndjson'):
+            by_suffix[source.suffix] = source
+    if MERGED_SUFFIX in by_suffix:
+        return [by_suffix[MERGED_SUFFIX]]
+    return [by_suffix[suffix] for suffix in sorted(by_suffix)]
+
+
+def _to_block(source: SourceFile) -> Dict[str, Any]:
+    """把一个结果文件转换为按列存储的归档行"""
+    records, errors, summary = source.load()
+    columns: Dict[str, List[Any]] = {}
+    rows = 0
+    for record in records:
+        for key in record:
+            if key not in columns:
+                # 新出现的字段，此前的行补 None
+                columns[key] = [None] * rows
+        for key, values in columns.items():
+            values.append(record.get(key))
+        rows += 1
+    return {
+        'date': source.date,
+        'hour': source.hour,
+        'source': source.name,
+        'summary': summary,
+        'rows': rows,
+        'columns': columns,
+        'errors': errors,
+    }
+
+
+def block_records(block: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """按行还原归档行中的作品记录（原记录中没有的字段为 None）"""
+    columns = block['columns']
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def iter_archive_lines(path: str, codec: Optional[str] = None) -> Iterator[Tuple[Tuple[str, str, str], str]]:
+    """
+    逐行读取归档文件，不解析 JSON
+
+    Returns:
+        Iterator: ((日期, 小时, 文件名), 原始行)；键从行首取出，范围外的会话无需反序列化
+    """
+    with _open_archive(path, 'r', codec) as f:
+        for line in f:
+            match = BLOCK_KEY_RE.match(line)
+            if match:
+                yield match.groups(), line
+
+
+def iter_archive_blocks(path: str, codec: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """逐行读取归档文件（每次只有一个会话的数据在内存中）"""
+    for _, line in iter_archive_lines(path, codec):
+        yield json.loads(line)
+
+
+def _block_session(block: Dict[str, Any]) -> Session:
+    return block_records(block), dict(block['summary']), block['date'], block['hour']
+
+
+def _source_session(source: SourceFile) -> Session:
+    records, _, summary = source.load()
+    # NDJSON 的 summary 在文件末尾，读取记录前先从尾部取出
+    if source.ext == 'ndjson':
+        summary.update(views_records.read_summary(source.path))
+    return records, summary, source.date, source.hour
+
+
+def entry_session(entry: Union[SourceFile, str]) -> Session:
+    """把 iter_entries 产出的条目（原文件或归档原始行）读取为会话"""
+    if isinstance(entry, SourceFile):
+        return _source_session(entry)
+    return _block_session(json.loads(entry))
+
+
+def _month_entries(month: str, start_date: str, end_date: str, data_dir: Optional[str]) -> Iterator[Tuple[tuple, Any]]:
+    """
+    一个月内按 (日期, 小时, 文件名) 排序的会话条目
+
+    尚未删除的原文件优先于归档中的同一小时（归档后又补爬、重新合并的小时以原文件为准）。
+    """
+    hours = {
+        key: files for key, files in scan_month(month, data_dir).items()
+        if start_date <= key[0] <= end_date
+    }
+    loose = (
+        ((source.date, source.hour, source.name), source)
+        for key in sorted(hours)
+        for source in select_sources(hours[key])
+    )
+
+    path = find_archive(month, data_dir)
+    if path is None:
+        return loose
+
+    archived = (
+        (key, line)
+        for key, line in iter_archive_lines(path)
+        if start_date <= key[0] <= end_date and key[:2] not in hours
+    )
+    return heapq.merge(archived, loose, key=lambda entry: entry[0])
+
+
+def iter_entries(
+    start_date: str,
+    end_date: str,
+    data_dir: Optional[str] = None
+) -> Iterator[Tuple[Tuple[str, str, str], Union[SourceFile, str]]]:
+    """
+    按 (日期, 小时, 文件名) 升序列出 [start_date, end_date] 内的会话条目，不读取记录
+
+    Returns:
+        Iterator: (键, 条目)；条目为 SourceFile（未归档的原文件）或归档中的原始行，用 entry_session 读取
+    """
+    for month in iter_months(start_date, end_date):
+        yield from _month_entries(month, start_date, end_date, data_dir)
+
+
+def iter_sessions(start_date: str, end_date: str, data_dir: Optional[str] = None) -> Iterator[Session]:
+    """
+    按时间顺序读取 [start_date, end_date] 内的所有爬取会话，归档与未归档的文件透明合并
+
+    产出的 (records, summary, crawl_date, crawl_hour) 可直接传给 MetricsStore.import_sessions；
+    需要按天导入（原 ViewsImporter.import_by_date 的用法）时 start_date 与 end_date 取同一天。
+    汇总表依赖采样顺序，因此严格按 (日期, 小时) 升序产出。大范围回放使用 views_replay。
+    """
+    for _, entry in iter_entries(start_date, end_date, data_dir):
+        yield entry_session(entry)
+
+
+def _archived_keys(path: Optional[str]) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+    """读取已有归档中的会话，按 (日期, 小时) 分组"""
+    blocks: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    if path:
+        for block in iter_archive_blocks(path):
+            blocks.setdefault((block['date'], block['hour']), []).append(block)
+    return blocks
+
+
+def compact_month(
+    month: str,
+    delete: bool = False,
+    codec: Optional[str] = None,
+    data_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    把一个月的每小时结果文件折叠进月度归档
+
+    已有归档时增量合并：磁盘上仍存在的小时以原文件为准重新写入，其余小时沿用归档中的内容，
+    因此可以重复执行。先写临时文件再替换，中途失败不会损坏已有归档。
+
+    Args:
+        month: 月份 (YYYY-MM)
+        delete: 归档并校验行数后删除原文件（含与合并文件重复的分层文件）
+        codec: gzip 或 zstd，默认沿用已有归档的格式，没有时为 gzip
+
+    Returns:
+        dict: {'month', 'path', 'sessions', 'records', 'files', 'deleted', 'bytes_before', 'bytes_after'}
+    """
+    existing = find_archive(month, data_dir)
+    codec = codec or (_codec_of(existing) if existing else DEFAULT_CODEC)
+    if codec == 'zstd' and zstandard is None:
+        raise RuntimeError("zstd 归档需要安装 zstandard")
+
+    hours = scan_month(month, data_dir)
+    source_files = [source for files in hours.values() for source in files]
+    result = {
+        'month': month,
+        'path': existing,
+        'sessions': 0,
+        'records': 0,
+        'files': len(source_files),
+        'deleted': 0,
+        'bytes_before': sum(os.path.getsize(s.path) for s in source_files)
+                        + (os.path.getsize(existing) if existing else 0),
+        'bytes_after': os.path.getsize(existing) if existing else 0,
+    }
+    if not hours:
+        return result
+
+    archived = _archived_keys(existing)
+    path = archive_path(month, codec, data_dir)
+    temp_path = path + '.tmp'
+    try:
+        with _open_archive(temp_path, 'w', codec) as f:
+            for key in sorted(set(hours) | set(archived)):
+                if key in hours:
+                    blocks = [_to_block(source) for source in select_sources(hours[key])]
+                else:
+                    blocks = archived[key]
+                for block in blocks:
+                    f.write(json.dumps(block, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    result['sessions'] += 1
+                    result['records'] += block['rows']
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # 删除原文件前校验归档可完整读回
+    if delete:
+        readback = sum(block['rows'] for block in iter_archive_blocks(temp_path, codec))
+        if readback != result['records']:
+            os.remove(temp_path)
+            raise RuntimeError(f"归档校验失败: 写入 {result['records']} 行，读回 {readback} 行")
+
+    os.replace(temp_path, path)
+    if existing and existing != path:
+        os.remove(existing)
+    result['path'] = path
+    result['bytes_after'] = os.path.getsize(path)
+
+    if delete:
+        for source in source_files:
+            os.remove(source.path)
+            result['deleted'] += 1
+        month_dir = os.path.dirname(path)
+        for day in os.listdir(month_dir):
+            day_dir = os.path.join(month_dir, day)
+            if os.path.isdir(day_dir) and not os.listdir(day_dir):
+                os.rmdir(day_dir)
+    return result
+
+
+def compact_before(
+    month: str,
+    delete: bool = False,
+    codec: Optional[str] = None,
+    data_dir: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """归档早于 month 的所有月份（供常驻调度进程调用，当月数据仍在写入，不归档）"""
+    return [
+        compact_month(m, delete, codec, data_dir)
+        for m in list_months(data_dir)
+        if m < month and scan_month(m, data_dir)
+    ]
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f}MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='投稿爬取结果月度归档')
+    parser.add_argument('--data-dir', help='爬取结果目录（默认 data/spider/views）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compact_parser = subparsers.add_parser('compact', help='把月份的每小时文件折叠为归档')
+    compact_parser.add_argument('month', nargs='?', help='月份 YYYY-MM')
+    compact_parser.add_argument('--before', help='归档早于该月份 (YYYY-MM) 的所有月份')
+    compact_parser.add_argument('--delete', action='store_true', help='归档并校验后删除原文件')
+    compact_parser.add_argument('--codec', choices=list(CODEC_EXTENSIONS), help='压缩方式（默认 gzip）')
+
+    subparsers.add_parser('list', help='查看各月份的归档与未归档文件')
+
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        if bool(args.month) == bool(args.before):
+            parser.error("需要指定月份或 --before（二选一）")
+        if args.month and args.month >= datetime.now().strftime('%Y-%m'):
+            parser.error("当月数据仍在写入，不能归档")
+        try:
+            if args.month:
+                results = [compact_month(args.month, args.delete, args.codec, args.data_dir)]
+            else:
+                results = compact_before(args.before, args.delete, args.codec, args.data_dir)
+        except RuntimeError as e:
+            parser.error(str(e))
+        for result in results:
+            print(f"✓ {result['month']}: {result['sessions']} 个会话 {result['records']:,} 条记录，"
+                  f"{_format_size(result['bytes_before'])} -> {_format_size(result['bytes_after'])}"
+                  f"，删除 {result['deleted']} 个文件 -> {result['path']}")
+    elif args.command == 'list':
+        for month in list_months(args.data_dir):
+            path = find_archive(month, args.data_dir)
+            loose = sum(len(files) for files in scan_month(month, args.data_dir).values())
+            archived = f"{os.path.basename(path)} ({_format_size(os.path.getsize(path))})" if path else '未归档'
+            print(f"{month}  {archived:<36} 未归档文件 {loose}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+B站投稿数据异步并发抓取引擎
+用有界并发 + 全局令牌桶限速代替 ViewsCrawler 逐条请求 + 随机 sleep 的方式，
+输出格式与 tools.spider.crawl_views.ViewsCrawler 的爬取结果保持一致
+
+路径: spider/views_fetcher.py
+
+用法:
+    fetcher = AsyncViewsFetcher(concurrency=4, rps=4.0, tier='cold')
+    result = fetcher.crawl(works)                   # works 为作品记录列表（生成器先在调用线程载入）
+    result = fetcher.crawl(load_works(views_file))  # 或从指定的导出文件读取
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from cookie_pool import COOKIE_EXPIRED_CODE, get_pool
+from http_client import PooledSession
+from rate_control import RATE_LIMIT_CODES, TokenBucket, get_host_limiter
+from views_records import CrawlCheckpoint
+
+# B站投稿统计接口（只返回 stat，比 x/web-interface/view 轻量）
+STAT_API_URL = 'https://api.bilibili.com/x/web-interface/archive/stat'
+STAT_API_HOST = 'api.bilibili.com'
+
+# 默认并发参数：4 个在途请求，全局每秒 4 次
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPS = 4.0
+
+# 稿件不存在/不可见，不需要重试
+NOT_FOUND_CODES = {-404, -403, 62002, 62004, 62012}
+
+HEADERS = {
+    'Referer': 'https://www.bilibili.com',
+}
+
+
+class RateLimitedError(Exception):
+    """上游触发限流（HTTP 412 或风控返回码）"""
+
+
+class WorkNotFoundError(Exception):
+    """稿件不存在或不可见"""
+
+
+class CookieExpiredError(Exception):
+    """请求使用的 Cookie 登录失效（-101）"""
+
+
+def wire_bytes(response: requests.Response) -> int:
+    """
+    响应体在网络上传输的字节数（gzip 等压缩前的大小）
+
+    response.content 是解压后的内容；urllib3 的 tell() 记录实际从连接读取的字节数，
+    取不到时退回 Content-Length，再退回解压后的长度
+    """
+    raw = getattr(response, 'raw', None)
+    try:
+        read = raw.tell() if raw is not None else 0
+    except (AttributeError, OSError, ValueError):
+        read = 0
+    if read:
+        return read
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+class AsyncViewsFetcher:
+    """B站投稿数据异步并发抓取器"""
+
+    TIMEOUT = 10
+    RATE_LIMIT_BACKOFF = 30.0
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rps: float = DEFAULT_RPS,
+        max_retries: int = 2,
+        tier: Optional[str] = None,
+        logger=None,
+        request_delay_min: float = 0.0,
+        request_delay_max: float = 0.0
+    ):
+        """
+        Args:
+            concurrency: 最大在途请求数
+            rps: 本抓取器的每秒请求预算（注册了主机级共享限速器时，同时受共享限速器约束）
+            max_retries: 单个作品的最大重试次数
+            tier: 分层类型，仅用于日志
+            logger: 日志记录器，为空时使用 print
+            request_delay_min: 每个 worker 两次请求间的最小随机延迟（兼容同步模式）
+            request_delay_max: 每个 worker 两次请求间的最大随机延迟（兼容同步模式）
+        """
+        self.concurrency = max(1, int(concurrency))
+        # 本抓取器自己的预算（多个分层同时抓取时各自分得一份）
+        self.budget = TokenBucket(rps, burst=self.concurrency)
+        # 注册了主机级共享限速器（常驻调度进程 / --async）时，所有抓取器与其他爬虫还共用同一份自适应预算，
+        # 请求需同时取得两边的令牌；限流反馈只作用于共享限速器
+        self.limiter = get_host_limiter(STAT_API_HOST) or self.budget
+        # 入口注册了 B站 Cookie 池时，请求轮换池中的身份，每个 Cookie 另受自己的请求预算限制
+        self.cookie_pool = get_pool('bilibili')
+        self.max_retries = max_retries
+        self.request_delay_min = request_delay_min
+        self.request_delay_max = request_delay_max
+        self.tier = tier
+        self.logger = logger
+        # 独占连接池（连接数与并发数一致）；限速与重试由抓取器自己负责
+        self.session = PooledSession(
+            HEADERS, timeout=self.TIMEOUT, throttled=False, pool_maxsize=self.concurrency, max_retries=0
+        )
+        # 响应体传输字节数（压缩后）在线程池中累加
+        self._bytes_lock = threading.Lock()
+        self._bytes_downloaded = 0
+
+    def _log(self, level: str, message: str):
+        if self.logger:
+            getattr(self.logger, level)(message)
+        else:
+            print(message)
+
+    def crawl(
+        self,
+        works: Iterable[Dict[str, Any]],
+        on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_error: Optional[Callable[[Dict[str, Any]], None]] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None
+    ) -> Dict[str, Any]:
+        """
+        抓取一批作品的统计数据
+
+        Args:
+            works: views.json 中 works 格式的作品记录；生成器会在进入事件循环前载入列表
+                  （惰性读取数据库的生成器不能在协程中消费）
+            on_record: 成功记录的回调；提供时记录交给回调（如流式写文件），不再累积到 data
+            on_error: 失败信息的回调；提供时不再累积到 errors
+            checkpoint: 爬取断点；已完成的记录先原样交给 on_record，对应作品不再请求
+
+        Returns:
+            dict: 与 ViewsCrawler 输出一致的爬取结果
+        """
+        if not isinstance(works, (list, tuple)):
+            works = list(works)
+        return asyncio.run(self._crawl(works, on_record, on_error, checkpoint))
+
+    async def _crawl(
+        self,
+        works: Iterable[Dict[str, Any]],
+        on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_error: Optional[Callable[[Dict[str, Any]], None]] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None
+    ) -> Dict[str, Any]:
+        start = datetime.now()
+        started_at = time.monotonic()
+        result = {
+            "session_id": f"crawl_{start.strftime('%Y%m%d%H%M%S')}",
+            "crawl_time": start.isoformat(),
+            "crawl_hour": start.strftime('%H'),
+            "total_count": 0,
+            "success_count": 0,
+            "fail_count": 0,
+            "skip_count": 0,
+            "duration_seconds": 0,
+            "request_count": 0,
+            "retry_count": 0,
+            "rate_limited_count": 0,
+            "bytes_downloaded": 0,
+            "data": [],
+            "errors": [],
+        }
+
+        self._bytes_downloaded = 0
+        work_iter = iter(works)
+        loop = asyncio.get_running_loop()
+        if on_record is None:
+            on_record = result["data"].append
+        if on_error is None:
+            on_error = result["errors"].append
+
+        completed = checkpoint.load() if checkpoint else {}
+        if completed:
+            self._log('info', f"从断点恢复: 已完成 {len(completed)} 个作品")
+            for record in completed.values():
+                result["total_count"] += 1
+                result["success_count"] += 1
+                on_record(record)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            async def worker():
+                # 各 worker 从同一个迭代器取任务，事件循环单线程，无需加锁
+                for work in work_iter:
+                    if work.get('work_id') in completed:
+                        continue
+                    result["total_count"] += 1
+                    if not work.get('is_valid', True) or work.get('platform', 'bilibili') != 'bilibili':
+                        result["skip_count"] += 1
+                        continue
+                    record, error = await self._fetch_work(loop, executor, work, result)
+                    if record:
+                        result["success_count"] += 1
+                        if checkpoint:
+                            checkpoint.append(record)
+                        on_record(record)
+                    else:
+                        result["fail_count"] += 1
+                        on_error(error)
+
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            finally:
+                if checkpoint:
+                    checkpoint.close()
+
+        result["duration_seconds"] = round(time.monotonic() - started_at, 2)
+        result["bytes_downloaded"] = self._bytes_downloaded
+        self._log('info', f"抓取完成: 成功 {result['success_count']}, 失败 {result['fail_count']}, "
+                          f"跳过 {result['skip_count']}, 耗时 {result['duration_seconds']}s")
+        return result
+
+    async def _fetch_work(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        executor: ThreadPoolExecutor,
+        work: Dict[str, Any],
+        counters: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """抓取单个作品，返回 (记录, 错误)；请求/重试/限流次数累加到 counters"""
+        work_id = work.get('work_id', '')
+        last_error = ''
+
+        attempt = 0
+        while attempt <= self.max_retries:
+            wait = self.budget.reserve()
+            if self.limiter is not self.budget:
+                wait = max(wait, self.limiter.reserve())
+            await asyncio.sleep(wait)
+            cookie, wait = self.cookie_pool.reserve() if self.cookie_pool else (None, 0.0)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            counters["request_count"] += 1
+            if attempt:
+                counters["retry_count"] += 1
+            if self.request_delay_max > 0:
+                await asyncio.sleep(random.uniform(self.request_delay_min, self.request_delay_max))
+            try:
+                args = (work_id, cookie.cookie_string) if cookie else (work_id,)
+                stat = await loop.run_in_executor(executor, self._fetch_stat, *args)
+                self.limiter.record_success()
+                if cookie:
+                    self.cookie_pool.report(cookie)
+                return self._build_record(work, stat), None
+            except WorkNotFoundError as e:
+                last_error = str(e)
+                break
+            except CookieExpiredError as e:
+                last_error = str(e)
+                # 停用失效的 Cookie（同步标记数据库），立即换下一个身份重试，不计入重试次数
+                self._log('warning', f"Cookie #{cookie.cookie_id} 已过期 ({e})，换下一个")
+                self.cookie_pool.report(cookie, expired=True)
+                continue
+            except RateLimitedError as e:
+                last_error = str(e)
+                counters["rate_limited_count"] += 1
+                # 共享限速器为自适应限速时按 AIMD 降速，所有 worker 与同主机的其他任务一起放慢
+                self.limiter.record_throttled()
+                if cookie:
+                    self.cookie_pool.report(cookie, rate_limited=True)
+                delay = self.RATE_LIMIT_BACKOFF * (attempt + 1)
+                self._log('warning', f"触发限流 {work_id}: {e}，{delay:.0f}秒后重试")
+                await asyncio.sleep(delay)
+            except (requests.RequestException, ValueError) as e:
+                last_error = str(e)
+                await asyncio.sleep(2 ** attempt + random.uniform(0, 1))
+            attempt += 1
+
+        self._log('warning', f"抓取失败 {work_id}: {last_error}")
+        return None, {"work_id": work_id, "error": last_error, "status": "failed"}
+
+    def _fetch_stat(self, bvid: str, cookie_string: Optional[str] = None) -> Dict[str, Any]:
+        """请求单个稿件的统计数据（在线程池中执行）"""
+        headers = {'Cookie': cookie_string} if cookie_string else None
+        response = self.session.get(STAT_API_URL, params={'bvid': bvid}, headers=headers, timeout=self.TIMEOUT)
+        with self._bytes_lock:
+            self._bytes_downloaded += wire_bytes(response)
+        if response.status_code == 412:
+            raise RateLimitedError("HTTP 412")
+        response.raise_for_status()
+        data = response.json()
+
+        code = data.get('code')
+        if code in RATE_LIMIT_CODES:
+            raise RateLimitedError(f"code={code}, message={data.get('message')}")
+        if code in NOT_FOUND_CODES:
+            raise WorkNotFoundError(f"视频不存在或已删除 (code={code})")
+        if code == COOKIE_EXPIRED_CODE and cookie_string:
+            raise CookieExpiredError(f"code={code}, message={data.get('message')}")
+        if code != 0:
+            raise ValueError(f"API error: code={code}, message={data.get('message')}")
+        return data.get('data') or {}
+
+    @staticmethod
+    def _build_record(work: Dict[str, Any], stat: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "platform": work.get('platform', 'bilibili'),
+            "work_id": work.get('work_id', ''),
+            "title": work.get('title', ''),
+            "crawl_time": datetime.now().isoformat(),
+            "view_count": stat.get('view', 0) or 0,
+            "danmaku_count": stat.get('danmaku', 0) or 0,
+            "comment_count": stat.get('reply', 0) or 0,
+            "like_count": stat.get('like', 0) or 0,
+            "coin_count": stat.get('coin', 0) or 0,
+            "favorite_count": stat.get('favorite', 0) or 0,
+            "share_count": stat.get('share', 0) or 0,
+            "status": "success",
+        }
+
+
+def load_works(views_file: str) -> List[Dict[str, Any]]:
+    """读取导出的 views.json，返回 works 列表"""
+    import json
+    with open(views_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get('works', [])
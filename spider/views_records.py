@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取结果的流式记录格式（NDJSON）
+每行一个 JSON 对象：作品记录直接写一行；元信息行带有 "_meta" 字段
+（error 为单条失败信息，summary 为写在文件末尾的会话统计）。
+写入、合并、读取都是逐行进行，内存占用与作品数量无关。
+
+路径: spider/views_records.py
+
+文件示例:
+    {"platform": "bilibili", "work_id": "BV1xx411c7mD", "view_count": 100000, ...}
+    {"_meta": "error", "work_id": "BV1yy411c7mD", "error": "视频不存在或已删除", "status": "failed"}
+    {"_meta": "summary", "session_id": "crawl_20260206143000", "total_count": 142, ...}
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIEWS_DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'spider', 'views')
+
+NDJSON_SUFFIX = '.ndjson'
+CHECKPOINT_SUFFIX = '.checkpoint'
+SUMMARY_PREFIX = '{"_meta":"summary"'
+
+# summary 中需要在合并时累加的统计字段
+SUMMARY_COUNTERS = (
+    'total_count', 'success_count', 'fail_count', 'skip_count', 'duration_seconds',
+    'request_count', 'retry_count', 'rate_limited_count', 'bytes_downloaded',
+)
+
+
+def views_output_path(date_str: str, hour_str: str, suffix: Optional[str] = None) -> str:
+    """
+    生成按日期分目录的爬取结果路径
+
+    Args:
+        date_str: 日期 (YYYY-MM-DD)
+        hour_str: 小时 (HH)
+        suffix: 文件名后缀（如 hot/cold/merged），为空时不加
+
+    Returns:
+        str: data/spider/views/YYYY/MM/DD/{date}-{hour}_views_data[_{suffix}].ndjson
+    """
+    directory = os.path.join(VIEWS_DATA_DIR, date_str[:4], date_str[5:7], date_str[8:10])
+    name = f"{date_str}-{hour_str}_views_data"
+    if suffix:
+        name += f"_{suffix}"
+    return os.path.join(directory, name + NDJSON_SUFFIX)
+
+
+def _dumps(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+class NdjsonWriter:
+    """
+    NDJSON 爬取结果写入器
+
+    先写入 .tmp 文件，close() 写入 summary 后原子重命名，
+    保证读取方看到的文件一定是完整的。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        self.record_count = 0
+        self.error_count = 0
+
+    def write_record(self, record: Dict[str, Any]):
+        self._file.write(_dumps(record) + '\n')
+        self.record_count += 1
+
+    def write_error(self, error: Dict[str, Any]):
+        self._file.write(_dumps({'_meta': 'error', **error}) + '\n')
+        self.error_count += 1
+
+    def write_line(self, line: str):
+        """写入一行已序列化的内容（合并时直接转写，避免反序列化）"""
+        self._file.write(line if line.endswith('\n') else line + '\n')
+
+    def close(self, summary: Optional[Dict[str, Any]] = None) -> str:
+        """
+        写入 summary 并完成文件
+
+        Returns:
+            str: 最终文件路径
+        """
+        if summary is not None:
+            self._file.write(_dumps({'_meta': 'summary', **summary}) + '\n')
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        elif not self._file.closed:
+            self.close()
+        return False
+
+
+class CrawlCheckpoint:
+    """
+    爬取断点
+
+    每抓取成功一个作品就把记录追加一行并 flush，进程被杀死后已完成的记录仍在文件中；
+    同一小时内重新执行时读取这些记录，跳过已完成的作品。失败的作品不记录，重启后会重试。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取已完成的记录
+
+        Returns:
+            dict: {work_id: 记录}；文件不存在时为空，末尾写了一半的行被忽略并截掉
+        """
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        self._truncate_partial_line()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                completed[record['work_id']] = record
+        return completed
+
+    def _truncate_partial_line(self):
+        """截掉进程中断时写了一半的末行，避免之后追加的记录拼接在残行后面"""
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                index = f.read(step).rfind(b'\n')
+                if index >= 0:
+                    pos = pos - step + index + 1
+                    break
+                pos -= step
+            if pos < end:
+                f.truncate(pos)
+
+    def append(self, record: Dict[str, Any]):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(_dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """结果已完整落盘/入库后删除断点"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def iter_lines(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取 NDJSON 文件中的所有对象（包括元信息行）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取 NDJSON 文件中的作品记录（跳过元信息行）"""
+    for obj in iter_lines(path):
+        if '_meta' not in obj:
+            yield obj
+
+
+def read_summary(path: str) -> Dict[str, Any]:
+    """
+    读取文件末尾的 summary 行（只读取文件尾部，不扫描全文）
+
+    Returns:
+        dict: summary 内容，没有 summary 时返回空字典
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        block = 4096
+        data = b''
+        while size > 0:
+            step = min(block, size)
+            size -= step
+            f.seek(size)
+            data = f.read(step) + data
+            lines = data.strip().split(b'\n')
+            if len(lines) > 1 or size == 0:
+                last = json.loads(lines[-1].decode('utf-8'))
+                if last.get('_meta') == 'summary':
+                    last.pop('_meta')
+                    return last
+                return {}
+    return {}
+
+
+def merge_ndjson(
+    paths: Iterable[str],
+    output_path: str,
+    summary: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    流式合并多个 NDJSON 结果文件
+
+    作品记录与错误行逐行转写，各文件的 summary 统计累加后写到合并文件末尾。
+
+    Args:
+        paths: 待合并的文件路径
+        output_path: 合并后的文件路径
+        summary: 合并文件的基础 summary（session_id 等），统计字段会被累加
+
+    Returns:
+        dict: 合并后的 summary
+    """
+    merged = dict(summary)
+    for key in SUMMARY_COUNTERS:
+        merged.setdefault(key, 0)
+
+    writer = NdjsonWriter(output_path)
+    try:
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    # 元信息行总是以 _meta 开头，summary 行以固定前缀识别，其余行直接转写
+                    if line.startswith(SUMMARY_PREFIX):
+                        part = json.loads(line)
+                        for key in SUMMARY_COUNTERS:
+                            merged[key] += part.get(key, 0) or 0
+                        continue
+                    writer.write_line(line)
+    except Exception:
+        writer.abort()
+        raise
+
+    merged['duration_seconds'] = round(merged['duration_seconds'], 2)
+    writer.close(merged)
+    return merged
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投稿爬取结果批量回放
+把一个日期范围内的爬取会话（月度归档与尚未归档的原文件，见 views_archive）重新导入 view_data.sqlite3，
+用于表结构变更后重建指标、按数据库恢复方案从原始数据恢复，代替逐日逐小时调用导入。
+
+- 解析并行：按天分组的会话交给子进程解析并转换为 work_metrics 行，主进程只负责写库，解析与写库重叠进行
+- 批量写入：每天一个事务；回放期间关闭逐批的汇总维护，结束后按天整体重算日/周汇总（rebuild_rollups）
+- 幂等：已登记的会话跳过（子进程中直接跳过，不转换记录），中断后重新执行从未完成的那天继续
+- 回放期间 synchronous=OFF：掉电最多丢失未完成的那天，重新执行即可补回
+
+路径: spider/views_replay.py
+
+用法:
+    python spider/views_replay.py --start 2025-01-01 --end 2025-12-31              # 回放一年
+    python spider/views_replay.py --start 2026-01-01 --end 2026-01-31 --force --workers 8
+    python spider/views_replay.py --start 2026-01-01 --no-rollups                  # 分段回放，最后再统一重算汇总
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from views_archive import entry_session, iter_entries
+from views_store import DEFAULT_DB_PATH, MetricsStore
+
+# 默认解析进程数：留一个核给写库的主进程
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# 每个解析进程最多预取的天数（限制解析结果占用的内存）
+PREFETCH_PER_WORKER = 2
+
+# 回放期间的 SQLite 页缓存（KB，负数为按 KB 计）
+REPLAY_CACHE_KB = 262144
+
+ParsedSession = Tuple[Optional[List[Tuple]], Dict[str, Any], str, str]
+
+
+def parse_day(entries: List[Any], skip_ids: FrozenSet[str]) -> List[ParsedSession]:
+    """
+    解析一天的会话条目并转换为 work_metrics 行（在子进程中执行）
+
+    Args:
+        entries: views_archive.iter_entries 产出的条目
+        skip_ids: 已导入的会话 ID，这些会话不转换记录，rows 为 None
+
+    Returns:
+        list: [(rows, summary, crawl_date, crawl_hour)]
+    """
+    parsed = []
+    for entry in entries:
+        records, summary, crawl_date, crawl_hour = entry_session(entry)
+        if MetricsStore.session_id_for(summary, crawl_date, crawl_hour) in skip_ids:
+            parsed.append((None, summary, crawl_date, crawl_hour))
+            continue
+        parsed.append((list(MetricsStore.metric_rows(records, crawl_date, crawl_hour)), summary, crawl_date, crawl_hour))
+    return parsed
+
+
+def _iter_days(start_date: str, end_date: str, data_dir: Optional[str]) -> Iterator[Tuple[str, List[Any]]]:
+    """按天分组的会话条目 (日期, [条目])"""
+    for crawl_date, group in groupby(iter_entries(start_date, end_date, data_dir), key=lambda item: item[0][0]):
+        yield crawl_date, [entry for _, entry in group]
+
+
+def _parsed_days(
+    days: Iterator[Tuple[str, List[Any]]],
+    skip_ids: Dict[str, FrozenSet[str]],
+    workers: int
+) -> Iterator[Tuple[str, List[ParsedSession]]]:
+    """按日期顺序产出解析结果；workers > 1 时在进程池中并行解析，最多预取 workers × PREFETCH_PER_WORKER 天"""
+    if workers <= 1:
+        for crawl_date, entries in days:
+            yield crawl_date, parse_day(entries, skip_ids.get(crawl_date, frozenset()))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for crawl_date, entries in days:
+            pending.append((crawl_date, executor.submit(parse_day, entries, skip_ids.get(crawl_date, frozenset()))))
+            if len(pending) >= workers * PREFETCH_PER_WORKER:
+                crawl_date, future = pending.popleft()
+                yield crawl_date, future.result()
+        while pending:
+            crawl_date, future = pending.popleft()
+            yield crawl_date, future.result()
+
+
+class ReplayProgress:
+    """回放进度输出（终端中原地刷新，重定向到文件时每天一行）"""
+
+    def __init__(self, start_date: str, end_date: str, stream=None):
+        self.start = datetime.strptime(start_date, '%Y-%m-%d')
+        self.total_days = (datetime.strptime(end_date, '%Y-%m-%d') - self.start).days + 1
+        self.stream = stream or sys.stderr
+        self.started = time.monotonic()
+        self._tty = hasattr(self.stream, 'isatty') and self.stream.isatty()
+
+    def update(self, crawl_date: str, records: int, skipped: int):
+        done = (datetime.strptime(crawl_date, '%Y-%m-%d') - self.start).days + 1
+        elapsed = time.monotonic() - self.started
+        rate = records / elapsed if elapsed > 0 else 0
+        remaining = elapsed / done * (self.total_days - done) if done else 0
+        line = (f"[{done:>4}/{self.total_days}] {crawl_date}  已导入 {records:,} 条  跳过 {skipped} 个会话  "
+                f"{rate:,.0f} 条/秒  剩余约 {timedelta(seconds=int(remaining))}")
+        self.stream.write(('\r' + line) if self._tty else line + '\n')
+        self.stream.flush()
+
+    def close(self):
+        if self._tty:
+            self.stream.write('\n')
+            self.stream.flush()
+
+
+def _imported_ids(store: MetricsStore, start_date: str, end_date: str) -> Dict[str, FrozenSet[str]]:
+    """范围内已登记的会话 ID，按日期分组"""
+    grouped: Dict[str, set] = {}
+    for crawl_date, session_id in store.conn.execute(
+        'SELECT crawl_date, session_id FROM crawl_sessions WHERE crawl_date BETWEEN ? AND ?',
+        (start_date, end_date)
+    ):
+        grouped.setdefault(crawl_date, set()).add(session_id)
+    return {crawl_date: frozenset(ids) for crawl_date, ids in grouped.items()}
+
+
+def replay(
+    start_date: str,
+    end_date: str,
+    force: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    db_path: str = DEFAULT_DB_PATH,
+    delta: bool = False,
+    rollups: bool = True,
+    data_dir: Optional[str] = None,
+    progress: Optional[ReplayProgress] = None
+) -> Dict[str, Any]:
+    """
+    回放 [start_date, end_date] 内的所有爬取会话
+
+    Args:
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        force: 已导入的会话也重新导入（同一时段的行被覆盖）
+        workers: 解析进程数，0 或 1 时在主进程中解析
+        db_path: view_data.sqlite3 路径
+        delta: 使用变化存储写入
+        rollups: 回放结束后重算涉及日期的日/周汇总
+        data_dir: 爬取结果目录（默认 data/spider/views）
+        progress: 进度输出，为空时不输出
+
+    Returns:
+        dict: {'days', 'sessions', 'skipped', 'records', 'rollup_days', 'recompacted_days', 'seconds'}
+    """
+    started = time.monotonic()
+    result = {'days': 0, 'sessions': 0, 'skipped': 0, 'records': 0, 'rollup_days': 0, 'recompacted_days': 0}
+    imported_dates = []
+
+    with MetricsStore(db_path, delta=delta, rollups=False) as store:
+        store.conn.execute('PRAGMA synchronous=OFF')
+        store.conn.execute(f'PRAGMA cache_size=-{REPLAY_CACHE_KB}')
+        skip_ids = {} if force else _imported_ids(store, start_date, end_date)
+
+        for crawl_date, sessions in _parsed_days(_iter_days(start_date, end_date, data_dir), skip_ids, workers):
+            pending = [session for session in sessions if session[0] is not None]
+            skipped = len(sessions) - len(pending)
+            records, already = store.import_row_sessions(pending, force=force)
+            result['days'] += 1
+            result['sessions'] += len(pending) - already
+            result['skipped'] += skipped + already
+            result['records'] += records
+            if records:
+                imported_dates.append(crawl_date)
+            if progress:
+                progress.update(crawl_date, result['records'], result['skipped'])
+
+        # 已按保留策略压缩的日期被重新写入了完整的小时数据：先取消压缩登记，
+        # 汇总按完整数据重算后再重新压缩，回放不会撤销保留策略
+        recompact = store.compacted_dates(imported_dates)
+        store.release_compacted(recompact)
+
+        if rollups and imported_dates:
+            result['rollup_days'] = store.rebuild_rollups(imported_dates[0], imported_dates[-1])
+
+        for crawl_date in recompact:
+            store.compact_day(crawl_date)
+        result['recompacted_days'] = len(recompact)
+
+    if progress:
+        progress.close()
+    result['seconds'] = round(time.monotonic() - started, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='投稿爬取结果批量回放')
+    parser.add_argument('--start', required=True, help='开始日期 YYYY-MM-DD')
+    parser.add_argument('--end', default=datetime.now().strftime('%Y-%m-%d'), help='结束日期（默认今天）')
+    parser.add_argument('--force', action='store_true', help='已导入的会话也重新导入')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'解析进程数（默认 {DEFAULT_WORKERS}，0 为在主进程中解析）')
+    parser.add_argument('--delta', action='store_true', help='使用变化存储写入')
+    parser.add_argument('--no-rollups', action='store_true', help='不重算日/周汇总（分段回放时最后统一执行 views_rollup rebuild）')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='view_data.sqlite3 路径')
+    parser.add_argument('--data-dir', help='爬取结果目录（默认 data/spider/views）')
+    parser.add_argument('--quiet', action='store_true', help='不输出进度')
+    args = parser.parse_args()
+
+    if args.start > args.end:
+        parser.error("开始日期不能晚于结束日期")
+
+    progress = None if args.quiet else ReplayProgress(args.start, args.end)
+    result = replay(
+        args.start, args.end, args.force, args.workers, args.db,
+        args.delta, not args.no_rollups, args.data_dir, progress
+    )
+    rate = result['records'] / result['seconds'] if result['seconds'] > 0 else 0
+    print(f"✓ 回放完成: {result['days']} 天 {result['sessions']} 个会话 {result['records']:,} 条记录，"
+          f"跳过 {result['skipped']} 个已导入会话，重算 {result['rollup_days']} 天汇总，"
+          f"重新压缩 {result['recompacted_days']} 天，耗时 {result['seconds']}s（{rate:,.0f} 条/秒）")
+
+
+if __name__ == '__main__':
+    main()
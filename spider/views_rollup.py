@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投稿指标汇总与保留策略维护工具
+日/周汇总在每次导入时由 MetricsStore 增量维护；本工具用于升级后回填历史汇总、
+按保留天数压缩小时数据，以及查看单个作品的汇总。
+
+路径: spider/views_rollup.py
+
+用法:
+    python spider/views_rollup.py rebuild --start 2025-01-01 --end 2026-02-10   # 回填历史汇总
+    python spider/views_rollup.py compact --keep-days 90                       # 压缩 90 天前的小时数据
+    python spider/views_rollup.py show BV1xx411c7mD --granularity week --start 2025-06-01
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from views_store import DEFAULT_DB_PATH, MetricsStore
+from views_velocity import VELOCITY_WINDOW_HOURS
+
+# 默认保留 90 天的小时数据
+DEFAULT_KEEP_DAYS = 90
+
+# 保留天数不能短于增速计算窗口，否则自适应分层取不到最近两次采样
+MIN_KEEP_DAYS = VELOCITY_WINDOW_HOURS // 24 + 1
+
+
+def compact(keep_days: int = DEFAULT_KEEP_DAYS, db_path: str = DEFAULT_DB_PATH) -> dict:
+    """压缩超过保留天数的小时数据（供常驻调度进程调用）"""
+    if keep_days < MIN_KEEP_DAYS:
+        raise ValueError(f"保留天数不能少于 {MIN_KEEP_DAYS} 天（增速计算窗口）")
+    with MetricsStore(db_path) as store:
+        return store.compact_raw(keep_days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='投稿指标汇总与保留策略维护')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='view_data.sqlite3 路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = subparsers.add_parser('rebuild', help='由小时数据重算日/周汇总')
+    rebuild.add_argument('--start', required=True, help='开始日期 YYYY-MM-DD')
+    rebuild.add_argument('--end', default=datetime.now().strftime('%Y-%m-%d'), help='结束日期（默认今天）')
+
+    compact_parser = subparsers.add_parser('compact', help='压缩超过保留天数的小时数据')
+    compact_parser.add_argument('--keep-days', type=int, default=DEFAULT_KEEP_DAYS,
+                                help=f'保留小时数据的天数（默认 {DEFAULT_KEEP_DAYS}）')
+
+    show = subparsers.add_parser('show', help='查看作品的日/周汇总')
+    show.add_argument('work_id')
+    show.add_argument('--platform', default='bilibili')
+    show.add_argument('--granularity', choices=['day', 'week'], default='day')
+    show.add_argument('--start', default='2000-01-01')
+    show.add_argument('--end', default=datetime.now().strftime('%Y-%m-%d'))
+
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        with MetricsStore(args.db) as store:
+            days = store.rebuild_rollups(args.start, args.end)
+        print(f"✓ 已重算 {days} 天的汇总")
+    elif args.command == 'compact':
+        try:
+            result = compact(args.keep_days, args.db)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"✓ 已压缩 {result['days']} 天的小时数据，删除 {result['deleted']} 行")
+    elif args.command == 'show':
+        with MetricsStore(args.db) as store:
+            rows = store.load_rollup(args.platform, args.work_id, args.start, args.end, args.granularity)
+        if not rows:
+            print("（无记录）")
+        for row in rows:
+            print(f"{row['period']}  播放 {row['view_count']:>10,}  最大增量 {row['view_max_delta']:>8,}  "
+                  f"范围 {row['view_min']:,}-{row['view_max']:,}  采样 {row['samples']}")
+
+
+if __name__ == '__main__':
+    main()
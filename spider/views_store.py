@@ -0,0 +1,720 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投稿指标 SQLite 存储（view_data.sqlite3）
+逐条消费爬取记录并分批写入 work_metrics，导入过程不需要把整个爬取结果加载到内存
+
+路径: spider/views_store.py
+
+表结构与 tools.spider.import_views.ViewsImporter 保持一致（见 doc/spider/B站投稿数据爬虫-实现方案.md）
+
+变化存储（delta=True）:
+    只有任一计数与该作品上一次采样不同时才写入 work_metrics，未变化的采样只更新 work_metrics_latest
+    （最近一次采样时段与计数、上一次采样时段与播放数）。读取时用 load_series 按阶梯函数还原每个时段的数值：
+    某时段的值 = 该时段及之前最近一行的值，一直延续到最近一次采样时段。
+
+汇总（rollups=True，默认）:
+    每次导入时增量维护 work_metrics_daily（按日）与 work_metrics_weekly（按周，周一为周期起点）：
+    最后一次采样的各项计数、周期内播放数的首值/最小/最大值、周期内相邻两次采样播放数的最大增量、采样次数。
+    两级汇总都逐条增量更新，按时间顺序导入时与全量重算（rebuild_rollups）结果一致。
+    compact_raw 把超过保留天数的小时数据压缩为每天最后一次采样（见 spider/views_rollup.py）。
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'view_data.sqlite3')
+
+# 每批写入的记录数（executemany 一次提交给 SQLite 的行数）
+DEFAULT_BATCH_SIZE = 5000
+
+METRIC_FIELDS = (
+    'view_count', 'danmaku_count', 'comment_count', 'like_count',
+    'coin_count', 'favorite_count', 'share_count',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    platform TEXT NOT NULL,
+    work_id TEXT NOT NULL,
+    title TEXT,
+    crawl_date TEXT NOT NULL,
+    crawl_hour TEXT NOT NULL,
+    crawl_time TEXT NOT NULL,
+    view_count INTEGER DEFAULT 0,
+    danmaku_count INTEGER DEFAULT 0,
+    comment_count INTEGER DEFAULT 0,
+    like_count INTEGER DEFAULT 0,
+    coin_count INTEGER DEFAULT 0,
+    favorite_count INTEGER DEFAULT 0,
+    share_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(platform, work_id, crawl_date, crawl_hour)
+);
+
+CREATE TABLE IF NOT EXISTS crawl_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT UNIQUE NOT NULL,
+    crawl_date TEXT NOT NULL,
+    crawl_hour TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    total_count INTEGER DEFAULT 0,
+    success_count INTEGER DEFAULT 0,
+    fail_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS work_metrics_latest (
+    platform TEXT NOT NULL,
+    work_id TEXT NOT NULL,
+    last_seen_date TEXT NOT NULL,
+    last_seen_hour TEXT NOT NULL,
+    view_count INTEGER DEFAULT 0,
+    danmaku_count INTEGER DEFAULT 0,
+    comment_count INTEGER DEFAULT 0,
+    like_count INTEGER DEFAULT 0,
+    coin_count INTEGER DEFAULT 0,
+    favorite_count INTEGER DEFAULT 0,
+    share_count INTEGER DEFAULT 0,
+    prev_seen_date TEXT,
+    prev_seen_hour TEXT,
+    prev_view_count INTEGER,
+    PRIMARY KEY (platform, work_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_work_metrics_platform_work_id ON work_metrics(platform, work_id);
+CREATE INDEX IF NOT EXISTS idx_work_metrics_crawl_date ON work_metrics(crawl_date);
+CREATE INDEX IF NOT EXISTS idx_work_metrics_crawl_hour ON work_metrics(crawl_date, crawl_hour);
+CREATE INDEX IF NOT EXISTS idx_crawl_sessions_date ON crawl_sessions(crawl_date);
+CREATE INDEX IF NOT EXISTS idx_crawl_sessions_hour ON crawl_sessions(crawl_date, crawl_hour);
+"""
+
+# 冲突时原地更新（INSERT OR REPLACE 会先删除再插入，导致 id 变化和索引重写）
+INSERT_METRIC_SQL = """
+INSERT INTO work_metrics (
+    platform, work_id, title, crawl_date, crawl_hour, crawl_time,
+    view_count, danmaku_count, comment_count, like_count,
+    coin_count, favorite_count, share_count
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(platform, work_id, crawl_date, crawl_hour) DO UPDATE SET
+    title = excluded.title,
+    crawl_time = excluded.crawl_time,
+    view_count = excluded.view_count,
+    danmaku_count = excluded.danmaku_count,
+    comment_count = excluded.comment_count,
+    like_count = excluded.like_count,
+    coin_count = excluded.coin_count,
+    favorite_count = excluded.favorite_count,
+    share_count = excluded.share_count
+"""
+
+# 变化存储：每次采样都更新最近状态；只有时段更新时才把原最近采样移入 prev_*（同一时段重复导入不移动）
+UPSERT_LATEST_SQL = """
+INSERT INTO work_metrics_latest (
+    platform, work_id, last_seen_date, last_seen_hour,
+    view_count, danmaku_count, comment_count, like_count,
+    coin_count, favorite_count, share_count
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(platform, work_id) DO UPDATE SET
+    prev_seen_date = CASE WHEN excluded.last_seen_date || excluded.last_seen_hour > last_seen_date || last_seen_hour
+                          THEN last_seen_date ELSE prev_seen_date END,
+    prev_seen_hour = CASE WHEN excluded.last_seen_date || excluded.last_seen_hour > last_seen_date || last_seen_hour
+                          THEN last_seen_hour ELSE prev_seen_hour END,
+    prev_view_count = CASE WHEN excluded.last_seen_date || excluded.last_seen_hour > last_seen_date || last_seen_hour
+                           THEN view_count ELSE prev_view_count END,
+    last_seen_date = excluded.last_seen_date,
+    last_seen_hour = excluded.last_seen_hour,
+    view_count = excluded.view_count,
+    danmaku_count = excluded.danmaku_count,
+    comment_count = excluded.comment_count,
+    like_count = excluded.like_count,
+    coin_count = excluded.coin_count,
+    favorite_count = excluded.favorite_count,
+    share_count = excluded.share_count
+WHERE excluded.last_seen_date || excluded.last_seen_hour >= last_seen_date || last_seen_hour
+"""
+
+# 查询最近状态时每条 SQL 的 work_id 数（低于 SQLite 变量数上限）
+LATEST_LOOKUP_CHUNK = 500
+
+ROLLUP_TABLES = {'day': 'work_metrics_daily', 'week': 'work_metrics_weekly'}
+
+ROLLUP_COLUMNS = """
+    platform TEXT NOT NULL,
+    work_id TEXT NOT NULL,
+    period TEXT NOT NULL,
+    first_slot TEXT NOT NULL,
+    last_slot TEXT NOT NULL,
+    samples INTEGER DEFAULT 0,
+    view_first INTEGER DEFAULT 0,
+    view_min INTEGER DEFAULT 0,
+    view_max INTEGER DEFAULT 0,
+    view_max_delta INTEGER DEFAULT 0,
+    view_count INTEGER DEFAULT 0,
+    danmaku_count INTEGER DEFAULT 0,
+    comment_count INTEGER DEFAULT 0,
+    like_count INTEGER DEFAULT 0,
+    coin_count INTEGER DEFAULT 0,
+    favorite_count INTEGER DEFAULT 0,
+    share_count INTEGER DEFAULT 0,
+    PRIMARY KEY (platform, work_id, period)
+"""
+
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS work_metrics_daily ({ROLLUP_COLUMNS});
+CREATE TABLE IF NOT EXISTS work_metrics_weekly ({ROLLUP_COLUMNS});
+CREATE INDEX IF NOT EXISTS idx_work_metrics_daily_period ON work_metrics_daily(period);
+CREATE INDEX IF NOT EXISTS idx_work_metrics_weekly_period ON work_metrics_weekly(period);
+
+CREATE TABLE IF NOT EXISTS compacted_days (
+    crawl_date TEXT PRIMARY KEY,
+    deleted_rows INTEGER DEFAULT 0,
+    compacted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+ROLLUP_FIELDS = (
+    'first_slot', 'last_slot', 'samples', 'view_first', 'view_min', 'view_max', 'view_max_delta',
+) + METRIC_FIELDS
+
+# 汇总增量更新：SET 中引用的都是更新前的值；时段不晚于已有最后采样时不更新最后值与最大增量
+ROLLUP_UPSERT_SQL = f"""
+INSERT INTO {{table}} (
+    platform, work_id, period, first_slot, last_slot, samples,
+    view_first, view_min, view_max, view_max_delta, {', '.join(METRIC_FIELDS)}
+) VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, 0, {', '.join('?' for _ in METRIC_FIELDS)})
+ON CONFLICT(platform, work_id, period) DO UPDATE SET
+    samples = samples + (excluded.last_slot <> last_slot),
+    view_max_delta = CASE WHEN excluded.last_slot > last_slot
+                          THEN MAX(view_max_delta, excluded.view_count - view_count) ELSE view_max_delta END,
+    view_first = CASE WHEN excluded.first_slot < first_slot THEN excluded.view_first ELSE view_first END,
+    first_slot = MIN(first_slot, excluded.first_slot),
+    view_min = MIN(view_min, excluded.view_min),
+    view_max = MAX(view_max, excluded.view_max),
+    {', '.join(f'{field} = CASE WHEN excluded.last_slot >= last_slot THEN excluded.{field} ELSE {field} END'
+               for field in METRIC_FIELDS)},
+    last_slot = MAX(last_slot, excluded.last_slot)
+"""
+
+
+# 重算汇总时直接写入（周期内旧汇总已先删除）
+ROLLUP_INSERT_SQL = f"""
+INSERT INTO {{table}} (platform, work_id, period, {', '.join(ROLLUP_FIELDS)})
+VALUES (?, ?, ?, {', '.join('?' for _ in ROLLUP_FIELDS)})
+"""
+
+
+def week_start(crawl_date: str) -> str:
+    """日期所在周的周一（YYYY-MM-DD）"""
+    day = datetime.strptime(crawl_date, '%Y-%m-%d')
+    return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+
+
+def _rollup_rows(rows: Iterable[Tuple], period: str) -> List[Tuple]:
+    """work_metrics 行（platform, work_id, title, date, hour, time, 计数...）转换为汇总 upsert 参数"""
+    return [
+        (row[0], row[1], period, row[3] + ' ' + row[4], row[3] + ' ' + row[4], row[6], row[6], row[6]) + tuple(row[6:])
+        for row in rows
+    ]
+
+
+def _rollup_step(state: Optional[List], row_key: Tuple, slot: str, counts: List[int], finished: List[Tuple]) -> List:
+    """把一次采样并入汇总状态；(platform, work_id, period) 变化时把上一条汇总移入 finished"""
+    if state is None or tuple(state[:3]) != row_key:
+        if state is not None:
+            finished.append(tuple(state))
+        view = counts[0]
+        return list(row_key) + [slot, slot, 1, view, view, view, 0] + counts
+    # state: platform, work_id, period, first_slot, last_slot, samples, view_first, view_min, view_max, view_max_delta, 计数...
+    state[9] = max(state[9], counts[0] - state[10])
+    state[4] = slot
+    state[5] += 1
+    state[7] = min(state[7], counts[0])
+    state[8] = max(state[8], counts[0])
+    state[10:] = counts
+    return state
+
+
+def _aggregate_rollups(rows: Iterable[Tuple], week: str) -> Tuple[List[Tuple], List[Tuple]]:
+    """
+    由按 (platform, work_id, 日期, 小时) 排序的一周采样计算日/周汇总（与逐批增量更新的结果一致）
+
+    Args:
+        rows: (platform, work_id, crawl_date, crawl_hour, 计数...) 行
+        week: 周一日期
+
+    Returns:
+        Tuple[list, list]: (日汇总行, 周汇总行)，字段顺序同 ROLLUP_INSERT_SQL
+    """
+    daily: List[Tuple] = []
+    weekly: List[Tuple] = []
+    day_state = week_state = None
+    for platform, work_id, crawl_date, crawl_hour, *counts in rows:
+        slot = crawl_date + ' ' + crawl_hour
+        day_state = _rollup_step(day_state, (platform, work_id, crawl_date), slot, counts, daily)
+        week_state = _rollup_step(week_state, (platform, work_id, week), slot, counts, weekly)
+    if day_state is not None:
+        daily.append(tuple(day_state))
+        weekly.append(tuple(week_state))
+    return daily, weekly
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """将可迭代对象按 size 分批"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _time_part(crawl_time: Optional[str]) -> str:
+    """从 ISO 时间中取 HH:MM:SS"""
+    if not crawl_time:
+        return datetime.now().strftime('%H:%M:%S')
+    # 常见的 YYYY-MM-DDTHH:MM:SS[.ffffff] 直接切片，避免逐条解析
+    if len(crawl_time) >= 19 and crawl_time[10] in 'T ' and crawl_time[13] == ':':
+        return crawl_time[11:19]
+    try:
+        return datetime.fromisoformat(crawl_time).strftime('%H:%M:%S')
+    except ValueError:
+        return str(crawl_time)[-8:]
+
+
+class MetricsStore:
+    """work_metrics 流式写入器"""
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_DB_PATH,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        delta: bool = False,
+        rollups: bool = True
+    ):
+        """
+        Args:
+            db_path: view_data.sqlite3 路径
+            batch_size: 每批写入行数
+            delta: 变化存储，计数与上一次采样相同的记录不写入 work_metrics
+            rollups: 导入时增量维护日/周汇总
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.delta = delta
+        self.rollups = rollups
+        # 变化存储模式下因计数未变化而跳过的记录数
+        self.unchanged_count = 0
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript(ROLLUP_SCHEMA)
+        return self
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def session_exists(self, session_id: str) -> bool:
+        row = self.conn.execute(
+            'SELECT 1 FROM crawl_sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _metric_row(record: Dict[str, Any], crawl_date: str, crawl_hour: str) -> Tuple:
+        return (
+            record.get('platform', 'bilibili'),
+            record['work_id'],
+            record.get('title', ''),
+            crawl_date,
+            crawl_hour,
+            _time_part(record.get('crawl_time')),
+        ) + tuple(int(record.get(field, 0) or 0) for field in METRIC_FIELDS)
+
+    @classmethod
+    def metric_rows(cls, records: Iterable[Dict[str, Any]], crawl_date: str, crawl_hour: str) -> Iterator[Tuple]:
+        """把成功的作品记录转换为 work_metrics 行（回放时在子进程中预先转换）"""
+        return (
+            cls._metric_row(record, crawl_date, crawl_hour)
+            for record in records
+            if record.get('status', 'success') == 'success'
+        )
+
+    def _insert_records(self, records: Iterable[Dict[str, Any]], crawl_date: str, crawl_hour: str) -> int:
+        """在当前事务中分批写入记录，返回处理的记录条数（不提交）"""
+        return self._insert_rows(self.metric_rows(records, crawl_date, crawl_hour), crawl_date)
+
+    def _insert_rows(self, rows: Iterable[Tuple], crawl_date: str) -> int:
+        """在当前事务中分批写入 work_metrics 行，返回写入的行数（不提交）"""
+        imported = 0
+        for batch in chunked(rows, self.batch_size):
+            if self.delta:
+                changed = self._changed_rows(batch)
+                self.conn.executemany(INSERT_METRIC_SQL, changed)
+                self.conn.executemany(UPSERT_LATEST_SQL, [row[:2] + row[3:5] + row[6:] for row in batch])
+                self.unchanged_count += len(batch) - len(changed)
+            else:
+                self.conn.executemany(INSERT_METRIC_SQL, batch)
+            if self.rollups:
+                self._update_rollups(batch, crawl_date)
+            imported += len(batch)
+        return imported
+
+    def _update_rollups(self, batch: List[Tuple], crawl_date: str):
+        """用本批采样增量更新日/周汇总（不提交）"""
+        self.conn.executemany(ROLLUP_UPSERT_SQL.format(table=ROLLUP_TABLES['day']), _rollup_rows(batch, crawl_date))
+        self.conn.executemany(
+            ROLLUP_UPSERT_SQL.format(table=ROLLUP_TABLES['week']), _rollup_rows(batch, week_start(crawl_date))
+        )
+
+    def _changed_rows(self, batch: List[Tuple]) -> List[Tuple]:
+        """
+        筛选需要写入 work_metrics 的行
+
+        没有最近状态、计数有变化，或时段早于最近一次采样（乱序回放，无法判断是否变化）时写入
+        """
+        latest = {}
+        # 按平台分组查询，platform = ? AND work_id IN (...) 走 (platform, work_id) 主键，不扫全表
+        by_platform: Dict[str, set] = {}
+        for row in batch:
+            by_platform.setdefault(row[0], set()).add(row[1])
+        for platform, ids in by_platform.items():
+            work_ids = list(ids)
+            for start in range(0, len(work_ids), LATEST_LOOKUP_CHUNK):
+                part = work_ids[start:start + LATEST_LOOKUP_CHUNK]
+                cursor = self.conn.execute(
+                    f"""SELECT work_id, last_seen_date || last_seen_hour, {', '.join(METRIC_FIELDS)}
+                        FROM work_metrics_latest
+                        WHERE platform = ? AND work_id IN ({', '.join('?' for _ in part)})""",
+                    [platform] + part
+                )
+                for work_id, last_seen, *values in cursor:
+                    latest[(platform, work_id)] = (last_seen, tuple(values))
+
+        changed = []
+        for row in batch:
+            state = latest.get((row[0], row[1]))
+            if state is None or row[3] + row[4] < state[0] or row[6:] != state[1]:
+                changed.append(row)
+        return changed
+
+    def _insert_session(self, summary: Dict[str, Any], crawl_date: str, crawl_hour: str, imported: int):
+        """在当前事务中登记爬取会话（不提交）"""
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO crawl_sessions (
+                session_id, crawl_date, crawl_hour, start_time, end_time,
+                total_count, success_count, fail_count
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                self.session_id_for(summary, crawl_date, crawl_hour), crawl_date, crawl_hour,
+                summary.get('crawl_time'), datetime.now().isoformat(),
+                summary.get('total_count', imported),
+                summary.get('success_count', imported),
+                summary.get('fail_count', 0),
+            )
+        )
+
+    @staticmethod
+    def session_id_for(summary: Dict[str, Any], crawl_date: str, crawl_hour: str) -> str:
+        return summary.get('session_id') or f"import_{crawl_date.replace('-', '')}{crawl_hour}00"
+
+    def write_batch(self, records: Iterable[Dict[str, Any]], crawl_date: str, crawl_hour: str) -> int:
+        """
+        写入一批记录并立即提交（供边爬取边入库的流水线使用）
+
+        Returns:
+            int: 写入条数
+        """
+        with self.conn:
+            return self._insert_records(records, crawl_date, crawl_hour)
+
+    def record_session(self, summary: Dict[str, Any], crawl_date: str, crawl_hour: str, imported: int = 0):
+        """登记爬取会话并提交"""
+        with self.conn:
+            self._insert_session(summary, crawl_date, crawl_hour, imported)
+
+    def import_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        summary: Dict[str, Any],
+        crawl_date: str,
+        crawl_hour: str,
+        force: bool = False
+    ) -> int:
+        """
+        分批导入爬取记录，并登记爬取会话（单个事务）
+
+        Args:
+            records: 作品记录（可为生成器，逐条消费）
+            summary: 会话统计（session_id/crawl_time/total_count 等）
+            crawl_date: 爬取日期 (YYYY-MM-DD)
+            crawl_hour: 爬取小时 (HH)
+            force: 会话已导入时是否强制重新导入
+
+        Returns:
+            int: 导入的记录数；会话已导入且未强制时返回 0
+        """
+        if not force and self.session_exists(self.session_id_for(summary, crawl_date, crawl_hour)):
+            return 0
+
+        with self.conn:
+            imported = self._insert_records(records, crawl_date, crawl_hour)
+            self._insert_session(summary, crawl_date, crawl_hour, imported)
+        return imported
+
+    def import_sessions(
+        self,
+        sessions: Iterable[Tuple[Iterable[Dict[str, Any]], Dict[str, Any], str, str]],
+        force: bool = False
+    ) -> int:
+        """
+        在单个事务中导入多个会话（历史数据回放用，避免每小时一次提交）
+
+        Args:
+            sessions: (records, summary, crawl_date, crawl_hour) 序列
+            force: 会话已导入时是否强制重新导入
+
+        Returns:
+            int: 导入的记录总数
+        """
+        imported = 0
+        with self.conn:
+            for records, summary, crawl_date, crawl_hour in sessions:
+                if not force and self.session_exists(self.session_id_for(summary, crawl_date, crawl_hour)):
+                    continue
+                count = self._insert_records(records, crawl_date, crawl_hour)
+                self._insert_session(summary, crawl_date, crawl_hour, count)
+                imported += count
+        return imported
+
+    def import_row_sessions(
+        self,
+        sessions: Iterable[Tuple[Iterable[Tuple], Dict[str, Any], str, str]],
+        force: bool = False
+    ) -> Tuple[int, int]:
+        """
+        在单个事务中导入已转换为 work_metrics 行（metric_rows）的会话
+
+        Args:
+            sessions: (rows, summary, crawl_date, crawl_hour) 序列
+            force: 会话已导入时是否强制重新导入
+
+        Returns:
+            Tuple[int, int]: (导入的记录数, 因已导入而跳过的会话数)
+        """
+        imported = skipped = 0
+        with self.conn:
+            for rows, summary, crawl_date, crawl_hour in sessions:
+                if not force and self.session_exists(self.session_id_for(summary, crawl_date, crawl_hour)):
+                    skipped += 1
+                    continue
+                count = self._insert_rows(rows, crawl_date)
+                self._insert_session(summary, crawl_date, crawl_hour, count)
+                imported += count
+        return imported, skipped
+
+    def load_series(
+        self,
+        platform: str,
+        work_id: str,
+        start: datetime,
+        end: datetime,
+        step_hours: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        按阶梯函数还原作品在 [start, end] 内每 step_hours 小时的计数
+
+        完整存储与变化存储的数据都适用：每个时段取该时段及之前最近一行的值，
+        序列截止到最近一次采样（work_metrics_latest 或最后一行）；第一次采样之前的时段不返回。
+
+        Returns:
+            list: [{'slot': datetime, 'view_count': ..., ...}]
+        """
+        rows = self.conn.execute(
+            f"""SELECT crawl_date || ' ' || crawl_hour, {', '.join(METRIC_FIELDS)}
+                FROM work_metrics
+                WHERE platform = ? AND work_id = ? AND crawl_date <= ?
+                ORDER BY crawl_date, crawl_hour""",
+            (platform, work_id, end.strftime('%Y-%m-%d'))
+        ).fetchall()
+        if not rows:
+            return []
+
+        last_seen = datetime.strptime(rows[-1][0], '%Y-%m-%d %H')
+        latest = self.conn.execute(
+            "SELECT last_seen_date || ' ' || last_seen_hour FROM work_metrics_latest WHERE platform = ? AND work_id = ?",
+            (platform, work_id)
+        ).fetchone()
+        if latest:
+            last_seen = max(last_seen, datetime.strptime(latest[0], '%Y-%m-%d %H'))
+
+        series = []
+        index = -1
+        slot = start.replace(minute=0, second=0, microsecond=0)
+        stop = min(end, last_seen)
+        while slot <= stop:
+            key = slot.strftime('%Y-%m-%d %H')
+            while index + 1 < len(rows) and rows[index + 1][0] <= key:
+                index += 1
+            if index >= 0:
+                series.append(dict(zip(('slot',) + METRIC_FIELDS, (slot,) + tuple(rows[index][1:]))))
+            slot += timedelta(hours=step_hours)
+        return series
+
+    def load_rollup(
+        self,
+        platform: str,
+        work_id: str,
+        start_date: str,
+        end_date: str,
+        granularity: str = 'day'
+    ) -> List[Dict[str, Any]]:
+        """
+        读取作品在 [start_date, end_date] 内的日/周汇总（长时间范围的图表查询用，不扫描小时数据）
+
+        Args:
+            granularity: day 或 week（周汇总的 period 为周一日期）
+
+        Returns:
+            list: [{'period': 'YYYY-MM-DD', 'view_count': ..., 'view_max_delta': ..., ...}]
+        """
+        table = ROLLUP_TABLES[granularity]
+        if granularity == 'week':
+            start_date = week_start(start_date)
+        cursor = self.conn.execute(
+            f"""SELECT period, {', '.join(ROLLUP_FIELDS)} FROM {table}
+                WHERE platform = ? AND work_id = ? AND period BETWEEN ? AND ?
+                ORDER BY period""",
+            (platform, work_id, start_date, end_date)
+        )
+        return [dict(zip(('period',) + ROLLUP_FIELDS, row)) for row in cursor]
+
+    def _compacted(self, crawl_date: str) -> bool:
+        return self.conn.execute(
+            'SELECT 1 FROM compacted_days WHERE crawl_date = ?', (crawl_date,)
+        ).fetchone() is not None
+
+    def rebuild_rollups(self, start_date: str, end_date: str) -> int:
+        """
+        由小时数据全量重算汇总（升级后回填历史数据用）
+
+        范围扩展到完整的周；包含已压缩日期的周只剩每天最后一次采样，保留其原有汇总不重算。
+        变化存储的数据缺少未变化的采样，重算后的采样次数会少于实际爬取次数。
+
+        Returns:
+            int: 重算的天数
+        """
+        first_week = week_start(start_date)
+        last_day = (datetime.strptime(week_start(end_date), '%Y-%m-%d') + timedelta(days=6)).strftime('%Y-%m-%d')
+        weeks: Dict[str, List[str]] = {}
+        for (crawl_date,) in self.conn.execute(
+            'SELECT DISTINCT crawl_date FROM work_metrics WHERE crawl_date BETWEEN ? AND ? ORDER BY crawl_date',
+            (first_week, last_day)
+        ).fetchall():
+            weeks.setdefault(week_start(crawl_date), []).append(crawl_date)
+
+        rebuilt = 0
+        with self.conn:
+            for week, dates in weeks.items():
+                if any(self._compacted(crawl_date) for crawl_date in dates):
+                    continue
+                week_end = (datetime.strptime(week, '%Y-%m-%d') + timedelta(days=6)).strftime('%Y-%m-%d')
+                self.conn.execute('DELETE FROM work_metrics_weekly WHERE period = ?', (week,))
+                self.conn.execute('DELETE FROM work_metrics_daily WHERE period BETWEEN ? AND ?', (week, week_end))
+                rows = self.conn.execute(
+                    f"""SELECT platform, work_id, crawl_date, crawl_hour, {', '.join(METRIC_FIELDS)}
+                        FROM work_metrics WHERE crawl_date BETWEEN ? AND ?
+                        ORDER BY platform, work_id, crawl_date, crawl_hour""",
+                    (week, week_end)
+                )
+                daily, weekly = _aggregate_rollups(rows, week)
+                self.conn.executemany(ROLLUP_INSERT_SQL.format(table=ROLLUP_TABLES['day']), daily)
+                self.conn.executemany(ROLLUP_INSERT_SQL.format(table=ROLLUP_TABLES['week']), weekly)
+                rebuilt += len(dates)
+        return rebuilt
+
+    def compact_raw(self, keep_days: int, today: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        保留策略：早于 keep_days 天的小时数据压缩为每个作品每天最后一次采样
+
+        压缩前没有日汇总的日期先由小时数据重算所在周的汇总；压缩后的日期登记在 compacted_days，
+        日/周汇总不受影响。load_series 不区分压缩过的日期，仍按阶梯函数还原：当天最后一次采样之前的
+        时段沿用前一天最后的值，按小时的序列在这些日期只有天级精度
+
+        Returns:
+            dict: {'days': 压缩的天数, 'deleted': 删除的行数}
+        """
+        cutoff = ((today or datetime.now()) - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+        dates = [
+            row[0] for row in self.conn.execute(
+                'SELECT DISTINCT crawl_date FROM work_metrics WHERE crawl_date < ? ORDER BY crawl_date', (cutoff,)
+            )
+            if not self._compacted(row[0])
+        ]
+        deleted = sum(self.compact_day(crawl_date) for crawl_date in dates)
+        return {'days': len(dates), 'deleted': deleted}
+
+    def compact_day(self, crawl_date: str) -> int:
+        """
+        把一天的小时数据压缩为每个作品最后一次采样并登记到 compacted_days（已登记时更新登记）
+
+        该日期还没有日汇总时先由小时数据重算所在周的汇总
+
+        Returns:
+            int: 删除的行数
+        """
+        has_rollup = self.conn.execute(
+            'SELECT 1 FROM work_metrics_daily WHERE period = ? LIMIT 1', (crawl_date,)
+        ).fetchone()
+        if not has_rollup:
+            self.rebuild_rollups(crawl_date, crawl_date)
+        with self.conn:
+            cursor = self.conn.execute(
+                """DELETE FROM work_metrics
+                   WHERE crawl_date = ? AND crawl_hour < (
+                       SELECT MAX(m.crawl_hour) FROM work_metrics m
+                       WHERE m.platform = work_metrics.platform AND m.work_id = work_metrics.work_id
+                         AND m.crawl_date = work_metrics.crawl_date)""",
+                (crawl_date,)
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO compacted_days (crawl_date, deleted_rows) VALUES (?, ?)',
+                (crawl_date, cursor.rowcount)
+            )
+        return cursor.rowcount
+
+    def compacted_dates(self, dates: Iterable[str]) -> List[str]:
+        """dates 中已压缩的日期"""
+        return [crawl_date for crawl_date in dates if self._compacted(crawl_date)]
+
+    def release_compacted(self, dates: Iterable[str]):
+        """
+        取消日期的压缩登记（回放重新写入了这些日期的小时数据时使用）
+
+        取消后 rebuild_rollups 按小时数据重算这些日期所在的周，之后应再用 compact_day 重新压缩
+        """
+        with self.conn:
+            self.conn.executemany('DELETE FROM compacted_days WHERE crawl_date = ?', [(d,) for d in dates])
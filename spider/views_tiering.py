@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层作品数据源
+直接从 WorkStatic 按分层逐条产出作品记录，供抓取引擎在内存中消费，
+不再经过 views_hot.json / views_cold.json 的落盘与重读
+
+路径: spider/views_tiering.py
+
+注意: 调用前需要完成 django.setup()
+"""
+
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+# 滚动模式默认分桶数：每小时爬取一个桶，每个作品每 8 小时一次（与每天 3 次的冷数据时段一致）
+DEFAULT_COLD_BUCKETS = 8
+
+
+def tier_queryset(tier, hot_days: Optional[int] = None):
+    """
+    返回指定分层的 WorkStatic 查询集
+
+    Args:
+        tier: WorkTier (HOT/COLD/ALL)
+        hot_days: 热数据天数阈值，默认使用 DEFAULT_HOT_DAYS
+
+    Returns:
+        QuerySet: 按发布时间倒序的作品查询集
+    """
+    from django.db.models import Q
+    from django.utils import timezone
+    from data_analytics.models import WorkStatic
+    from tools.spider.export_tiered import WorkTier, DEFAULT_HOT_DAYS
+
+    if hot_days is None:
+        hot_days = DEFAULT_HOT_DAYS
+    cutoff = timezone.now() - timedelta(days=hot_days)
+
+    queryset = WorkStatic.objects.all()
+    if tier == WorkTier.HOT:
+        queryset = queryset.filter(publish_time__gte=cutoff)
+    elif tier == WorkTier.COLD:
+        queryset = queryset.filter(Q(publish_time__lt=cutoff) | Q(publish_time__isnull=True))
+    return queryset.order_by('-publish_time')
+
+
+# 作品记录需要的 WorkStatic 字段（values() 只取这些列，不构造模型实例）
+WORK_FIELDS = ('platform', 'work_id', 'title', 'author', 'publish_time', 'cover_url', 'is_valid')
+
+
+def work_to_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """将 WorkStatic 的 values() 行转换为 views.json 中 works 的记录格式"""
+    record = dict(row)
+    publish_time = record.get('publish_time')
+    record['publish_time'] = publish_time.isoformat() if publish_time else None
+    return record
+
+
+def iter_tier_works(tier, hot_days: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐条产出指定分层的作品记录（values() + iterator()，不构造模型实例）
+
+    注意: 生成器在消费时才查询数据库，不能在事件循环（asyncio.run）中消费，
+    交给 AsyncViewsFetcher 前请用 load_tier_works 载入列表
+
+    Args:
+        tier: WorkTier (HOT/COLD/ALL)
+        hot_days: 热数据天数阈值
+
+    Yields:
+        dict: 作品记录
+    """
+    for row in tier_queryset(tier, hot_days).values(*WORK_FIELDS).iterator():
+        yield work_to_record(row)
+
+
+def load_tier_works(tier, hot_days: Optional[int] = None) -> List[Dict[str, Any]]:
+    """在调用线程中一次性载入指定分层的作品记录（只含 WORK_FIELDS 列的字典）"""
+    return list(iter_tier_works(tier, hot_days))
+
+
+def work_bucket(work_id: str, buckets: int) -> int:
+    """按 work_id 的 CRC32 将作品稳定地分到 [0, buckets) 中的一个桶"""
+    return zlib.crc32(work_id.encode('utf-8')) % buckets
+
+
+def current_bucket(now: datetime, buckets: int) -> int:
+    """
+    当前小时轮到的桶
+
+    以自纪元起的小时数取模，桶数不整除 24 时跨天依然保持固定间隔
+    """
+    epoch_hours = int(now.replace(minute=0, second=0, microsecond=0).timestamp()) // 3600
+    return epoch_hours % buckets
+
+
+def iter_bucket_works(
+    tier,
+    buckets: int = DEFAULT_COLD_BUCKETS,
+    now: Optional[datetime] = None,
+    hot_days: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    逐条产出指定分层中本小时所在桶的作品记录（滚动爬取）
+
+    Args:
+        tier: WorkTier
+        buckets: 分桶数，每个作品每 buckets 小时爬取一次
+        now: 当前时间（默认 datetime.now()）
+        hot_days: 热数据天数阈值
+
+    Yields:
+        dict: 作品记录
+    """
+    bucket = current_bucket(now or datetime.now(), buckets)
+    for record in iter_tier_works(tier, hot_days):
+        if work_bucket(record['work_id'], buckets) == bucket:
+            yield record
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于播放增速的自适应分层
+根据 work_metrics 中最近的播放量增长速度为每个作品分配爬取间隔（每小时 / 每3小时 / 每天 / 每周），
+把请求预算花在数据还在变化的作品上。
+
+路径: spider/views_velocity.py
+
+规则:
+    - 热数据（发布 DEFAULT_HOT_DAYS 天内）始终每小时爬取
+    - 冷数据按最近两次采样之间的播放增速（次/小时）匹配 CRAWL_LEVELS
+      （变化存储的作品从 work_metrics_latest 取最近两次采样，未变化的采样不在 work_metrics 中）
+    - 没有足够历史数据的作品按 UNKNOWN_INTERVAL_HOURS 爬取
+    - 同一间隔的作品按 work_id 哈希错开到间隔内的不同小时，每小时负载均匀
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from views_store import DEFAULT_DB_PATH
+from views_tiering import current_bucket, iter_tier_works, work_bucket
+
+# (级别, 爬取间隔小时数, 最低播放增速 次/小时)，按增速从高到低匹配
+CRAWL_LEVELS: List[Tuple[str, int, float]] = [
+    ('hourly', 1, 100.0),
+    ('3-hourly', 3, 20.0),
+    ('daily', 24, 1.0),
+    ('weekly', 168, 0.0),
+]
+
+# 查找最近采样的历史窗口，需覆盖最长的爬取间隔，否则每周级作品会因为缺少采样被重新归为未知
+VELOCITY_WINDOW_HOURS = 2 * CRAWL_LEVELS[-1][1]
+
+# 没有增速数据（新导入或只有一次采样）时的爬取间隔
+UNKNOWN_INTERVAL_HOURS = 24
+
+# 每个作品窗口内最近两次采样
+VELOCITY_SQL = """
+SELECT platform, work_id, crawl_date || ' ' || crawl_hour, view_count
+FROM (
+    SELECT platform, work_id, crawl_date, crawl_hour, view_count,
+           ROW_NUMBER() OVER (
+               PARTITION BY platform, work_id ORDER BY crawl_date DESC, crawl_hour DESC
+           ) AS rn
+    FROM work_metrics
+    WHERE crawl_date >= ?
+)
+WHERE rn <= 2
+ORDER BY platform, work_id, rn
+"""
+
+# 变化存储模式下记录的最近两次采样
+LATEST_VELOCITY_SQL = """
+SELECT platform, work_id, last_seen_date || ' ' || last_seen_hour, view_count,
+       prev_seen_date || ' ' || prev_seen_hour, prev_view_count
+FROM work_metrics_latest
+WHERE last_seen_date >= ? AND prev_seen_date IS NOT NULL
+"""
+
+
+def _parse_slot(slot: str) -> datetime:
+    """解析 'YYYY-MM-DD HH' 形式的采样时段"""
+    return datetime.strptime(slot, '%Y-%m-%d %H')
+
+
+def load_view_velocity(
+    db_path: str = DEFAULT_DB_PATH,
+    now: Optional[datetime] = None,
+    window_hours: int = VELOCITY_WINDOW_HOURS
+) -> Dict[Tuple[str, str], float]:
+    """
+    计算每个作品最近两次采样之间的播放增速
+
+    Args:
+        db_path: view_data.sqlite3 路径
+        now: 当前时间（默认 datetime.now()）
+        window_hours: 历史窗口小时数
+
+    Returns:
+        dict: {(platform, work_id): 播放增速（次/小时）}，窗口内不足两次采样的作品不包含在内
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(hours=window_hours)
+    velocities = {}
+    if not os.path.exists(db_path):
+        return velocities
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(VELOCITY_SQL, (cutoff.strftime('%Y-%m-%d'),)).fetchall()
+    except sqlite3.OperationalError:
+        # 数据库尚未初始化（没有 work_metrics 表）
+        rows = []
+    try:
+        latest_rows = conn.execute(LATEST_VELOCITY_SQL, (cutoff.strftime('%Y-%m-%d'),)).fetchall()
+    except sqlite3.OperationalError:
+        # 旧数据库没有 work_metrics_latest 表（从未使用变化存储）
+        latest_rows = []
+    finally:
+        conn.close()
+
+    latest: Dict[Tuple[str, str], Tuple[datetime, int]] = {}
+    for platform, work_id, slot, view_count in rows:
+        key = (platform, work_id)
+        if key not in latest:
+            latest[key] = (_parse_slot(slot), view_count)
+            continue
+        last_time, last_views = latest[key]
+        hours = (last_time - _parse_slot(slot)).total_seconds() / 3600
+        if hours > 0:
+            velocities[key] = max(last_views - view_count, 0) / hours
+
+    # 变化存储：最近状态比 work_metrics 中的最后一行更新时，以它记录的最近两次采样为准
+    for platform, work_id, last_slot, last_views, prev_slot, prev_views in latest_rows:
+        key = (platform, work_id)
+        last_time = _parse_slot(last_slot)
+        if key in latest and latest[key][0] > last_time:
+            continue
+        hours = (last_time - _parse_slot(prev_slot)).total_seconds() / 3600
+        if hours > 0:
+            velocities[key] = max(last_views - (prev_views or 0), 0) / hours
+    return velocities
+
+
+def crawl_interval(views_per_hour: Optional[float]) -> int:
+    """
+    根据播放增速返回爬取间隔（小时）
+
+    Args:
+        views_per_hour: 播放增速，None 表示没有足够历史数据
+
+    Returns:
+        int: 爬取间隔小时数
+    """
+    if views_per_hour is None:
+        return UNKNOWN_INTERVAL_HOURS
+    for _, interval, min_velocity in CRAWL_LEVELS:
+        if views_per_hour >= min_velocity:
+            return interval
+    return CRAWL_LEVELS[-1][1]
+
+
+def level_name(interval: int) -> str:
+    """爬取间隔对应的级别名称"""
+    for name, level_interval, _ in CRAWL_LEVELS:
+        if level_interval == interval:
+            return name
+    return f'{interval}h'
+
+
+def is_due(work_id: str, interval: int, now: datetime) -> bool:
+    """
+    判断作品在当前小时是否需要爬取
+
+    与滚动分桶相同：以 work_id 的哈希分桶，同一级别的作品均匀分布在间隔内的各个小时
+    """
+    if interval <= 1:
+        return True
+    return work_bucket(work_id, interval) == current_bucket(now, interval)
+
+
+def iter_due_works(
+    tier,
+    now: Optional[datetime] = None,
+    db_path: str = DEFAULT_DB_PATH,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    逐条产出指定分层中本小时需要爬取的作品记录
+
+    Args:
+        tier: WorkTier；HOT 分层全部每小时爬取，COLD/ALL 按播放增速分配间隔
+        now: 当前时间（默认 datetime.now()）
+        db_path: view_data.sqlite3 路径
+        stats: 传入字典时累加各级别作品数（{级别: 数量}），用于日志与统计
+
+    Yields:
+        dict: 作品记录
+    """
+    now = now or datetime.now()
+    hot = getattr(tier, 'value', tier) == 'hot'
+    velocities = {} if hot else load_view_velocity(db_path, now)
+
+    for record in iter_tier_works(tier):
+        if hot:
+            interval = 1
+        else:
+            interval = crawl_interval(velocities.get((record['platform'], record['work_id'])))
+        if stats is not None:
+            name = level_name(interval)
+            stats[name] = stats.get(name, 0) + 1
+        if is_due(record['work_id'], interval, now):
+            yield record